@@ -1,13 +1,42 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Request
 from pydantic import BaseModel
 import pickle
 import re
+import hashlib
+import json
 import numpy as np
-from scipy.sparse import hstack
+from scipy.sparse import csr_matrix, hstack
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+import asyncio
+import cProfile
+import functools
+import gc
+import io
+import pstats
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
 import os
 import logging
-from typing import Dict, List, Tuple
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import metrics
+    from domain_suffixes import SuffixMatch, SuffixTrie
+    from domain_tokenizer import scan_domains
+    from keyword_matcher import KeywordMatcher
+    from model_artifacts import (ArrayEnsemble, ArrayTfidfVectorizer, has_model_artifacts,
+                                 load_model_artifacts, prune_vocabulary)
+except ImportError:  # imported as backend.app
+    from . import metrics
+    from .domain_suffixes import SuffixMatch, SuffixTrie
+    from .domain_tokenizer import scan_domains
+    from .keyword_matcher import KeywordMatcher
+    from .model_artifacts import (ArrayEnsemble, ArrayTfidfVectorizer, has_model_artifacts,
+                                  load_model_artifacts, prune_vocabulary)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -17,8 +46,19 @@ logger = logging.getLogger(__name__)
 class EmailInput(BaseModel):
     email: str
 
+class BatchEmailInput(BaseModel):
+    emails: List[str]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bind first and load the models in the background; /ready reports when they are usable
+    start_model_loading()
+    yield
+    INFERENCE_POOL.shutdown()
+    VERDICT_CACHE.save()
+
 # Initialize FastAPI app
-app = FastAPI(title="Enhanced Phishing Email Detection API")
+app = FastAPI(title="Enhanced Phishing Email Detection API", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -41,6 +81,20 @@ SUSPICIOUS_TLDS = {
     '.click', '.download', '.loan', '.work', '.men', '.date', '.racing'
 }
 
+# High-trust institutional TLDs
+INSTITUTIONAL_TLDS = {'.edu', '.gov', '.mil'}
+
+# Score adjustment and reason of each TLD class; a TLD in several sets gets the first class
+TLD_CLASSES = (
+    ('suspicious', SUSPICIOUS_TLDS, -3.0, "Suspicious TLD: {}"),
+    ('institutional', INSTITUTIONAL_TLDS, 3.0, "High-trust institutional TLD: {}"),
+    ('legitimate', LEGITIMATE_TLDS, 1.0, "Standard business TLD: {}"),
+)
+TLD_CLASS_SCORES = {tld_class: (delta, reason) for tld_class, _, delta, reason in TLD_CLASSES}
+
+# Built once: the bundled public suffix list plus the TLD classes above
+SUFFIX_TRIE = SuffixTrie.from_suffix_list((tld_class, tlds) for tld_class, tlds, _, _ in TLD_CLASSES)
+
 # Dynamic legitimacy detection without static lists
 
 # Context-aware legitimate terms that should NOT be flagged
@@ -50,6 +104,7 @@ LEGITIMATE_BUSINESS_TERMS = {
     'reservation', 'membership', 'profile', 'preferences', 'settings', 'support',
     'customer', 'welcome', 'thank you', 'regards', 'sincerely', 'team', 'department'
 }
+LEGITIMATE_TERM_MATCHER = KeywordMatcher(sorted(LEGITIMATE_BUSINESS_TERMS))
 
 # Enhanced phishing patterns with context awareness
 PHISHING_URGENT_PATTERNS = [
@@ -84,38 +139,530 @@ SUSPICIOUS_URL_PATTERNS = [
     r'[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}'  # IP addresses
 ]
 
-def extract_domain_from_email(email_text: str) -> List[str]:
-    """Extract domains from email content"""
-    # Look for From: headers, email domains, URLs, and plain domain mentions
-    domain_patterns = [
-        r'from[:\s]+[^@\s]*@([^\s<>\[\]]+)',  # From header
-        r'@([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',  # Any email domain
-        r'https?://(?:www\.)?([^/\s<>\[\]]+)',  # URL domains
-        r'\b([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})\b',  # Plain domain mentions (like Claude.ai)
-        r'visit\s+([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',  # "visit domain.com"
-        r'go\s+to\s+([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',  # "go to domain.com"
-        r'log\s+in(?:to)?\s+([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',  # "log in to domain.com"
-    ]
-    
-    domains = set()
-    email_lower = email_text.lower()
-    
-    for pattern in domain_patterns:
-        matches = re.findall(pattern, email_lower, re.IGNORECASE)
-        for match in matches:
-            domain = match.strip('.,;!?')
-            # Filter out obvious non-domains
-            if ('.' in domain and 
-                len(domain) > 3 and 
-                not domain.startswith('.') and 
-                not domain.endswith('.') and
-                not re.search(r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}', domain)):  # Skip IP addresses for now
-                domains.add(domain)
-    
-    return list(domains)
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+def _literal_prefixes(items, max_len: int = 16, max_count: int = 64) -> Tuple[List[str], bool]:
+    """Literal strings one of which every match of a parsed pattern must start with.
+
+    Returns the prefixes and whether they spell out the whole (sub)pattern, so the
+    caller can keep appending whatever follows it.
+    """
+    prefixes = ['']
+    for op, av in items:
+        if op is sre_parse.AT:
+            continue  # \b and friends are zero-width
+        if op is sre_parse.LITERAL:
+            alternatives, complete = [chr(av)], True
+        elif op is sre_parse.IN and all(o in (sre_parse.LITERAL, sre_parse.RANGE) for o, _ in av):
+            chars = []
+            for o, a in av:
+                chars.extend([chr(a)] if o is sre_parse.LITERAL else [chr(c) for c in range(a[0], a[1] + 1)])
+            alternatives, complete = chars, True
+        elif op is sre_parse.SUBPATTERN:
+            alternatives, complete = _literal_prefixes(av[-1], max_len, max_count)
+        elif op is sre_parse.BRANCH:
+            alternatives, complete = [], True
+            for branch in av[1]:
+                branch_prefixes, branch_complete = _literal_prefixes(branch, max_len, max_count)
+                alternatives.extend(branch_prefixes)
+                complete = complete and branch_complete
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            alternatives, _ = _literal_prefixes(av[2], max_len, max_count)
+            complete = False
+        else:
+            return prefixes, False
+
+        combined = [p + a for p in prefixes for a in alternatives]
+        if not alternatives or len(combined) > max_count:
+            return prefixes, False
+        prefixes = combined
+        if not complete or any(len(p) >= max_len for p in prefixes):
+            return prefixes, False
+    return prefixes, True
+
+_CATEGORY_ESCAPES = {
+    sre_parse.CATEGORY_DIGIT: r'\d', sre_parse.CATEGORY_NOT_DIGIT: r'\D',
+    sre_parse.CATEGORY_SPACE: r'\s', sre_parse.CATEGORY_NOT_SPACE: r'\S',
+    sre_parse.CATEGORY_WORD: r'\w', sre_parse.CATEGORY_NOT_WORD: r'\W',
+}
+_AT_ESCAPES = {
+    sre_parse.AT_BOUNDARY: r'\b', sre_parse.AT_NON_BOUNDARY: r'\B',
+    sre_parse.AT_BEGINNING: '^', sre_parse.AT_END: '$',
+    sre_parse.AT_BEGINNING_STRING: r'\A', sre_parse.AT_END_STRING: r'\Z',
+}
+
+def _unparse(items) -> str:
+    """Regex source for a parsed (sub)pattern; raises ValueError for unsupported constructs"""
+    source = []
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            source.append(re.escape(chr(av)))
+        elif op is sre_parse.NOT_LITERAL:
+            source.append('[^' + re.escape(chr(av)) + ']')
+        elif op is sre_parse.ANY:
+            source.append('.')
+        elif op is sre_parse.IN:
+            members = []
+            for o, a in av:
+                if o is sre_parse.NEGATE:
+                    members.append('^')
+                elif o is sre_parse.LITERAL:
+                    members.append(re.escape(chr(a)))
+                elif o is sre_parse.RANGE:
+                    members.append(re.escape(chr(a[0])) + '-' + re.escape(chr(a[1])))
+                elif o is sre_parse.CATEGORY:
+                    members.append(_CATEGORY_ESCAPES[a])
+                else:
+                    raise ValueError(f"Unsupported set member {o}")
+            source.append('[' + ''.join(members) + ']')
+        elif op is sre_parse.AT:
+            source.append(_AT_ESCAPES[av])
+        elif op is sre_parse.SUBPATTERN and not av[1] and not av[2]:
+            source.append('(?:' + _unparse(av[-1]) + ')')
+        elif op is sre_parse.BRANCH:
+            source.append('(?:' + '|'.join(_unparse(branch) for branch in av[1]) + ')')
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            upper = '' if av[1] >= sre_parse.MAXREPEAT else av[1]
+            lazy = '?' if op is sre_parse.MIN_REPEAT else ''
+            source.append(f'(?:{_unparse(av[2])}){{{av[0]},{upper}}}{lazy}')
+        else:
+            raise ValueError(f"Unsupported regex construct {op}")
+    return ''.join(source)
+
+_SINGLE_CHAR_OPS = (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.ANY, sre_parse.IN)
+
+def _viable_prefix(items, min_length: int = 0) -> str:
+    """Regex source matching every prefix of every match of a parsed (sub)pattern (and more)
+
+    Only prefixes longer than ``min_length`` need to match, so leading items that end
+    within that many characters are required in full rather than as nested optional
+    groups, which keeps the regex cheap. Zero-width assertions are dropped, which only
+    lets it match more.
+    """
+    if not items:
+        return ''
+    (op, av), rest = items[0], items[1:]
+    if op is sre_parse.AT:
+        return _viable_prefix(rest, min_length)
+    width = items[:1].getwidth()[1]
+    if width < min_length:
+        return _unparse(items[:1]) + _viable_prefix(rest, min_length - width)
+    if op in _SINGLE_CHAR_OPS:
+        return f'(?:{_unparse([(op, av)])}{_viable_prefix(rest)})?'
+    if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[2].getwidth() == (1, 1):
+        # Letting the rest follow before the minimum count only matches more, and spares
+        # the regex an alternative that backtracks over the whole run
+        upper = '' if av[1] >= sre_parse.MAXREPEAT else av[1]
+        return f'(?:{_unparse(av[2])}){{0,{upper}}}{_viable_prefix(rest)}'
+    if op is sre_parse.SUBPATTERN:
+        first = _viable_prefix(av[-1])
+    elif op is sre_parse.BRANCH:
+        first = '(?:' + '|'.join(_viable_prefix(branch) for branch in av[1]) + ')'
+    elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+        upper = '' if av[1] >= sre_parse.MAXREPEAT else av[1]
+        first = f'(?:{_unparse(av[2])}){{0,{upper}}}{_viable_prefix(av[2])}'
+    else:
+        first = f'(?:{_unparse([(op, av)])})?'
+    if not rest:
+        return first
+    return f'(?:{first}|{_unparse([(op, av)])}{_viable_prefix(rest)})'
+
+# Budgeted scanners first try unbounded patterns this many characters past their candidate
+SCAN_MAX_MATCH_CHARS = 256
+
+class MultiPatternScanner:
+    """Counts matches of several regex families in a single walk over the text.
+
+    A trigger regex built from the literal prefixes of every pattern walks the text
+    once to find candidate positions; each pattern is then tried only at those
+    positions. Patterns that can start at any character, or whose prefixes are single
+    characters (which would make most of the text a candidate), are counted with
+    ``findall`` instead. Counts are identical to summing ``len(re.findall(p, text, flags))``
+    over each family.
+    """
+
+    def __init__(self, families: Dict[str, List[str]], flags: int = 0):
+        self.families = list(families)
+        self.patterns = []
+        self.pattern_family = []
+        # Per triggered pattern whose matches have no length bound: a regex matching every
+        # prefix of its matches (see _windowed_match), else None
+        self.viable_prefix = []
+        self.findall_patterns = []
+        triggers = set()
+        for family, patterns in families.items():
+            for pattern in patterns:
+                parsed = sre_parse.parse(pattern, flags)
+                prefixes, _ = _literal_prefixes(parsed)
+                compiled = re.compile(pattern, flags)
+                if max(map(len, prefixes)) < 2:
+                    self.findall_patterns.append((compiled, family))
+                    continue
+                self.patterns.append(compiled)
+                self.pattern_family.append(family)
+                viable_prefix = None
+                if parsed.getwidth()[1] >= sre_parse.MAXREPEAT:
+                    try:
+                        viable_prefix = re.compile(_viable_prefix(parsed, SCAN_MAX_MATCH_CHARS), flags)
+                    except ValueError:
+                        viable_prefix = re.compile('(?s:.*)')  # any window may be a prefix
+                self.viable_prefix.append(viable_prefix)
+                triggers.update(prefixes)
+
+        if triggers:
+            alternation = '|'.join(re.escape(t) for t in sorted(triggers, key=lambda t: (-len(t), t)))
+            self.trigger = re.compile(alternation, flags)
+        else:
+            self.trigger = None
+
+    def scan(self, text: str, budget: Optional['ScanBudget'] = None,
+             stage: Optional[str] = None) -> Dict[str, int]:
+        """Return the number of non-overlapping matches per family
+
+        With a time-limited ``budget``, patterns without a length bound are first tried
+        within SCAN_MAX_MATCH_CHARS characters of their candidate, and the window is
+        doubled while the text past it could change the outcome (bounded patterns cannot
+        read further than their width anyway). The budget is checked every
+        SCAN_BUDGET_CHECK_INTERVAL candidates; once its time is spent, the counts found so
+        far are returned and ``stage`` is recorded as cut short.
+        """
+        counts = dict.fromkeys(self.families, 0)
+        budgeted = budget is not None and budget.time_budget is not None
+        for pattern, family in self.findall_patterns:
+            if budgeted and budget.exhausted(stage):
+                return counts
+            counts[family] += len(pattern.findall(text))
+        if self.trigger is None:
+            return counts
+
+        # Emulate findall: each pattern resumes searching where its last match ended
+        next_start = [0] * len(self.patterns)
+        candidates = 0
+        candidate = self.trigger.search(text)
+        while candidate:
+            pos = candidate.start()
+            candidates += 1
+            if budgeted and candidates % SCAN_BUDGET_CHECK_INTERVAL == 0 and budget.exhausted(stage):
+                break
+            for i, pattern in enumerate(self.patterns):
+                if pos < next_start[i]:
+                    continue
+                if budgeted and self.viable_prefix[i] is not None:
+                    match = self._windowed_match(i, text, pos, budget, stage)
+                else:
+                    match = pattern.match(text, pos)
+                if match:
+                    counts[self.pattern_family[i]] += 1
+                    next_start[i] = match.end() if match.end() > pos else pos + 1
+            # Restart one character on so overlapping candidates are not skipped
+            candidate = self.trigger.search(text, pos + 1)
+        return counts
+
+    def _windowed_match(self, i: int, text: str, pos: int, budget: 'ScanBudget',
+                        stage: Optional[str]) -> Optional[re.Match]:
+        """``self.patterns[i].match(text, pos)``, widening the window from SCAN_MAX_MATCH_CHARS
+
+        Some patterns backtrack quadratically over long runs, so a match is tried within
+        a growing window and the widening stops when the budget is spent. More text can
+        only change a match ending at the window's edge, or a failure where the whole
+        window is the start of a possible match; anything else is final.
+        """
+        pattern = self.patterns[i]
+        window = SCAN_MAX_MATCH_CHARS
+        while True:
+            endpos = pos + window
+            match = pattern.match(text, pos, endpos)
+            if endpos >= len(text) or (match and match.end() < endpos):
+                return match
+            if not match and not self.viable_prefix[i].fullmatch(text, pos, endpos):
+                return None
+            if budget.exhausted(stage):
+                return match
+            window *= 2
+
+# Precompiled scanners used by the feature extractor. URL patterns run case-insensitively
+# on the raw text, the phishing language patterns on the lowercased text.
+PHISHING_LANGUAGE_FAMILIES = {
+    'urgency': PHISHING_URGENT_PATTERNS,
+    'money': PHISHING_MONEY_PATTERNS,
+    'credential': PHISHING_CREDENTIAL_PATTERNS,
+}
+PHISHING_LANGUAGE_SCANNER = MultiPatternScanner(PHISHING_LANGUAGE_FAMILIES)
+# Profiled requests scan each family on its own, so every family gets its own timing span
+PHISHING_FAMILY_SCANNERS = {family: MultiPatternScanner({family: patterns})
+                            for family, patterns in PHISHING_LANGUAGE_FAMILIES.items()}
+SUSPICIOUS_URL_SCANNER = MultiPatternScanner({'suspicious_url': SUSPICIOUS_URL_PATTERNS}, re.IGNORECASE)
+
+# Budgeted scanning bounds the work spent on one email, so a huge or hostile input cannot
+# stall a worker: SCAN_MAX_BYTES caps the text every stage sees, SCAN_MAX_TOKEN_CHARS caps
+# runs of non-whitespace (domains are matched word by word and the scanners backtrack
+# over long runs), and after SCAN_TIME_BUDGET_MS of CPU time the remaining regex work on
+# the email is skipped.
+# Responses that hit a budget are flagged "degraded". BUDGETED_SCANNING=0 scans everything.
+BUDGETED_SCANNING = os.environ.get("BUDGETED_SCANNING", "1") != "0"
+SCAN_MAX_BYTES = int(os.environ.get("SCAN_MAX_BYTES", 256 * 1024))
+SCAN_MAX_TOKEN_CHARS = int(os.environ.get("SCAN_MAX_TOKEN_CHARS", 1024))
+SCAN_TIME_BUDGET_MS = float(os.environ.get("SCAN_TIME_BUDGET_MS", 50))
+# Budgeted scanners check the time budget once every SCAN_BUDGET_CHECK_INTERVAL candidates
+SCAN_BUDGET_CHECK_INTERVAL = 32
+
+# A garbage collection pause is charged to whichever email happens to be running, so the
+# budget clock leaves collections out: gc callbacks add each pause to a per-thread total
+_gc_pauses = threading.local()
+
+def _track_gc_pause(phase: str, info: Dict):
+    if phase == "start":
+        _gc_pauses.started = time.thread_time()
+    elif getattr(_gc_pauses, "started", None) is not None:
+        _gc_pauses.total = getattr(_gc_pauses, "total", 0.0) + time.thread_time() - _gc_pauses.started
+        _gc_pauses.started = None
+
+gc.callbacks.append(_track_gc_pause)
+
+def _budget_clock() -> float:
+    """CPU time of the calling thread, less the time it spent collecting garbage"""
+    return time.thread_time() - getattr(_gc_pauses, "total", 0.0)
+
+class ScanBudget:
+    """Byte, token and CPU-time budget for scanning one email
+
+    Work on the email is charged to the budget inside ``with budget:`` blocks, which
+    may be entered several times (e.g. once per stage of a batch). Budgeted stages call
+    ``exhausted(stage)`` before each unit of work and stop once it returns True.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, max_token_chars: Optional[int] = None,
+                 time_budget_ms: Optional[float] = None):
+        self.max_bytes = max_bytes or None
+        self.max_token_chars = max_token_chars or None
+        self.time_budget = time_budget_ms / 1000 if time_budget_ms else None
+        self.used = 0.0
+        self._entered_at = None
+        self.exceeded: List[str] = []  # 'bytes', 'tokens', 'time'
+        self.cut_short: List[str] = []
+
+    def __enter__(self):
+        self._entered_at = _budget_clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.used += _budget_clock() - self._entered_at
+        self._entered_at = None
+
+    def limit(self, email_text: str) -> str:
+        """The part of ``email_text`` within the byte and token budgets"""
+        if self.max_bytes is not None and len(email_text) * 4 > self.max_bytes:
+            encoded = email_text.encode('utf-8', 'surrogatepass')
+            if len(encoded) > self.max_bytes:
+                email_text = encoded[:self.max_bytes].decode('utf-8', 'ignore')
+                self.exceeded.append('bytes')
+        if self.max_token_chars is not None:
+            # Anchored at the start of each run, so the substitution stays linear
+            long_token = re.compile(r'(?<!\S)(\S{%d})\S+' % self.max_token_chars)
+            capped = long_token.sub(r'\1', email_text)
+            if len(capped) != len(email_text):
+                email_text = capped
+                self.exceeded.append('tokens')
+        return email_text
+
+    def exhausted(self, stage: str) -> bool:
+        """Whether the time budget is spent; records ``stage`` as cut short if so"""
+        if self.time_budget is None:
+            return False
+        used = self.used
+        if self._entered_at is not None:
+            used += _budget_clock() - self._entered_at
+        if used < self.time_budget:
+            return False
+        if 'time' not in self.exceeded:
+            self.exceeded.append('time')
+        if stage not in self.cut_short:
+            self.cut_short.append(stage)
+        return True
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.exceeded)
+
+    def degraded_reasons(self) -> List[str]:
+        reasons = []
+        if 'bytes' in self.exceeded:
+            reasons.append(f"Only the first {self.max_bytes} bytes were scanned")
+        if 'tokens' in self.exceeded:
+            reasons.append(f"Tokens longer than {self.max_token_chars} characters were cut")
+        if 'time' in self.exceeded:
+            reasons.append(f"Time budget of {self.time_budget * 1000:g} ms exhausted; "
+                           f"cut short: {', '.join(self.cut_short)}")
+        return reasons
+
+def new_scan_budget() -> ScanBudget:
+    """The budget for one email under the configured limits (unlimited when disabled)"""
+    if not BUDGETED_SCANNING:
+        return ScanBudget()
+    return ScanBudget(SCAN_MAX_BYTES, SCAN_MAX_TOKEN_CHARS, SCAN_TIME_BUDGET_MS)
+
+def extract_domain_from_email(email_text: str, budget: Optional[ScanBudget] = None) -> List[str]:
+    """Extract domains from email content, in order of first appearance
+
+    With a ``budget``, the scan stops once its time is spent and the domains found
+    so far are returned.
+    """
+    return list(scan_domains(email_text, budget))
+
+# Per-request profiling: while a request runs under run_profiled(), profile_span()
+# blocks on its thread are timed into the request's profile; otherwise they do nothing
+_request_profile = threading.local()
+
+class _ProfileSpan:
+    __slots__ = ('spans', 'stage', 'details', 'started')
+
+    def __init__(self, spans: List[Dict], stage: str, details: Dict):
+        self.spans = spans
+        self.stage = stage
+        self.details = details
+
+    def note(self, **details):
+        self.details.update(details)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        finished = time.perf_counter()
+        self.spans.append({
+            "stage": self.stage,
+            "start_ms": round((self.started - _request_profile.started) * 1000, 3),
+            "ms": round((finished - self.started) * 1000, 3),
+            **self.details,
+        })
+
+class _NoProfileSpan:
+    def note(self, **details):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+_NO_PROFILE_SPAN = _NoProfileSpan()
+
+def profile_span(stage: str, **details):
+    """Time a block into the current request profile, if one is being recorded"""
+    spans = getattr(_request_profile, 'spans', None)
+    if spans is None:
+        return _NO_PROFILE_SPAN
+    return _ProfileSpan(spans, stage, details)
+
+def profiling() -> bool:
+    """Whether the current thread is recording a request profile"""
+    return getattr(_request_profile, 'spans', None) is not None
+
+class LRUCache:
+    """Size-bounded, thread-safe least-recently-used cache with hit/miss/eviction counters
+
+    With ``ttl`` set, entries older than that many seconds are treated as missing.
+    """
+
+    def __init__(self, capacity: int, ttl: Optional[float] = None):
+        self.capacity = max(int(capacity), 0)
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, expires_at: Optional[float] = None):
+        if self.capacity == 0:
+            return
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def items(self) -> List[Tuple]:
+        """Snapshot of (key, expires_at, value), least recently used first"""
+        with self._lock:
+            return [(key, expires_at, value) for key, (expires_at, value) in self._data.items()]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "capacity": self.capacity,
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+# Business terms that raise a domain's legitimacy score when its main label contains one
+DOMAIN_BUSINESS_TERMS = [
+    'corp', 'inc', 'ltd', 'company', 'group', 'team', 'studio', 'tech', 'digital', 'online',
+    'service', 'services', 'app', 'apps', 'cloud', 'net', 'web', 'media', 'solutions',
+    'platform', 'systems', 'software', 'ai', 'labs', 'hub', 'center', 'store', 'shop'
+]
+DOMAIN_TERM_MATCHER = KeywordMatcher(DOMAIN_BUSINESS_TERMS)
+
+# Domains repeat heavily across emails, so their scores are memoized
+DOMAIN_SCORE_CACHE = LRUCache(int(os.environ.get("DOMAIN_SCORE_CACHE_SIZE", 10000)))
 
 def calculate_domain_legitimacy_score(domain: str) -> Tuple[float, List[str]]:
-    """Calculate a legitimacy score for a domain based on multiple dynamic factors"""
+    """Calculate a legitimacy score for a domain based on multiple dynamic factors
+
+    Results are served from DOMAIN_SCORE_CACHE when the domain was scored before.
+    """
+    with profile_span("calculate_domain_legitimacy_score", domain=domain) as span:
+        cached = DOMAIN_SCORE_CACHE.get(domain)
+        span.note(cached=cached is not None)
+        if cached is None:
+            cached = _score_domain_legitimacy(domain)
+            DOMAIN_SCORE_CACHE.put(domain, (cached[0], tuple(cached[1])))
+            return cached
+        return cached[0], list(cached[1])
+
+def _score_domain_legitimacy(domain: str) -> Tuple[float, List[str]]:
+    """Uncached domain legitimacy scoring"""
     score = 4.0  # Start with slightly positive bias for legitimate detection
     reasons = []
     
@@ -124,26 +671,16 @@ def calculate_domain_legitimacy_score(domain: str) -> Tuple[float, List[str]]:
     
     domain_lower = domain.lower()
     
-    # 1. TLD analysis (trust indicators)
-    domain_parts = domain_lower.split('.')
-    if len(domain_parts) >= 2:
-        tld = '.' + '.'.join(domain_parts[-2:]) if len(domain_parts) >= 3 and domain_parts[-2] in ['co', 'com', 'org'] else '.' + domain_parts[-1]
-        
-        # Highly suspicious TLDs
-        if tld in SUSPICIOUS_TLDS:
-            score -= 3.0
-            reasons.append(f"Suspicious TLD: {tld}")
-        # High-trust TLDs
-        elif tld in ['.edu', '.gov', '.mil']:
-            score += 3.0
-            reasons.append(f"High-trust institutional TLD: {tld}")
-        # Standard business TLDs
-        elif tld in LEGITIMATE_TLDS:
-            score += 1.0
-            reasons.append(f"Standard business TLD: {tld}")
+    # 1. TLD analysis (trust indicators): suspicious, high-trust institutional or
+    # standard business TLDs, classified by the suffix trie
+    suffix_match = SUFFIX_TRIE.lookup(domain_lower)
+    delta, reason = _tld_class(suffix_match)
+    if reason is not None:
+        score += delta
+        reasons.append(reason)
     
     # 2. Domain structure analysis
-    main_domain = domain_parts[-2] if len(domain_parts) >= 2 else domain_parts[0]
+    main_domain = suffix_match.main_label
     
     # Professional domain length (not too short, not too long)
     if 4 <= len(main_domain) <= 15:
@@ -203,14 +740,10 @@ def calculate_domain_legitimacy_score(domain: str) -> Tuple[float, List[str]]:
         reasons.append("Clean, established domain pattern")
     
     # 7. Check for common business terms and service indicators (positive indicators)
-    business_terms = ['corp', 'inc', 'ltd', 'company', 'group', 'team', 'studio', 'tech', 'digital', 'online', 
-                     'service', 'services', 'app', 'apps', 'cloud', 'net', 'web', 'media', 'solutions',
-                     'platform', 'systems', 'software', 'ai', 'labs', 'hub', 'center', 'store', 'shop']
-    for term in business_terms:
-        if term in main_domain:
-            score += 1.0  # Increased from 0.5
-            reasons.append(f"Contains business term: {term}")
-            break
+    term_index = DOMAIN_TERM_MATCHER.first_index(main_domain)
+    if term_index >= 0:
+        score += 1.0  # Increased from 0.5
+        reasons.append(f"Contains business term: {DOMAIN_BUSINESS_TERMS[term_index]}")
     
     # 8. Look for common legitimate service patterns
     service_patterns = [
@@ -233,122 +766,317 @@ def calculate_domain_legitimacy_score(domain: str) -> Tuple[float, List[str]]:
     
     return min(max(score, 0.0), 10.0), reasons
 
-def is_legitimate_sender(email_text: str) -> Tuple[bool, str]:
+# The checks of _score_domain_legitimacy, each precompiled into a single pattern for
+# score_domains(); a search for an alternation matches wherever any of the originals does
+_LEGITIMATE_SUBDOMAIN_RE = re.compile(
+    r'^(?:noreply|no-reply|support|help|customer|notifications?|alerts?|mail|email|news|updates?'
+    r'|newsletter|accounts?|login|auth|api|app|mobile|www|web|secure|safe|marketing|promo)\.')
+_PROFESSIONAL_STRUCTURE_RE = re.compile(r'^[a-zA-Z][a-zA-Z0-9-]*[a-zA-Z0-9]\.[a-zA-Z]{2,}$')
+_SUSPICIOUS_LABEL_RE = re.compile(
+    r'\d{3,}|^\d+[a-z]+\d+$|(secure|verify|account|login|update|confirm)-[^.]*$'
+    r'|-?(secure|verify|account|login|update|confirm)$|[0-9]+\.')
+_CLEAN_DOMAIN_RE = re.compile(r'^[a-z]{3,12}\.(com|org|net)$')
+_SERVICE_SUBDOMAIN_RE = re.compile(
+    r'(?:play|drive|docs|accounts?|auth|login|cdn|static|assets?|blog|news|help|support'
+    r'|api|app|mobile)\.')
+_IP_ADDRESS_RE = re.compile(r'^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$')
+
+def _tld_class(match: SuffixMatch) -> Tuple[float, Optional[str]]:
+    """Score adjustment and reason for the TLD of a suffix trie lookup"""
+    if match.tld_class is None:
+        return 0.0, None
+    delta, reason = TLD_CLASS_SCORES[match.tld_class]
+    return delta, reason.format(match.tld)
+
+def score_domains(domains: List[str]) -> Tuple[np.ndarray, List[List[str]]]:
+    """Legitimacy scores and reasons for a batch of domains, computed column by column
+
+    Returns a float array of scores and a list of reasons per domain, identical to
+    calling _score_domain_legitimacy on each domain: every check runs once over the
+    whole batch as a precompiled pattern or a vectorized comparison, the score
+    adjustments are summed as arrays, and the reasons are appended check by check.
+    """
+    scores = np.zeros(len(domains))
+    reasons = [[] if domain and '.' in domain else ["Invalid domain"] for domain in domains]
+    rows = [i for i, domain_reasons in enumerate(reasons) if not domain_reasons]
+    if not rows:
+        return scores, reasons
+
+    valid = [domains[i] for i in rows]
+    lower = [domain.lower() for domain in valid]
+    row_reasons = [reasons[i] for i in rows]
+    count = len(rows)
+    total = np.full(count, 4.0)
+
+    def add(mask: np.ndarray, delta: float, reason: str):
+        total[mask] += delta
+        for row in np.flatnonzero(mask):
+            row_reasons[row].append(reason)
+
+    def column(check, values) -> np.ndarray:
+        return np.fromiter(map(bool, map(check, values)), dtype=bool, count=count)
+
+    # 1. TLD class, one suffix trie walk per distinct tail of the batch: the last two
+    # labels, with the dot before them if there is one, classify as the whole domain
+    # and hold its main label
+    tails = [domain[max(domain.rfind('.', 0, domain.rfind('.')), 0):] for domain in lower]
+    matches = {tail: SUFFIX_TRIE.lookup(tail) for tail in set(tails)}
+    tld_classes = {tail: _tld_class(match) for tail, match in matches.items()}
+    for row, tail in enumerate(tails):
+        delta, reason = tld_classes[tail]
+        if reason is not None:
+            total[row] += delta
+            row_reasons[row].append(reason)
+
+    # 2. Main label length
+    main_labels = [matches[tail].main_label for tail in tails]
+    lengths = np.fromiter(map(len, main_labels), dtype=np.int64, count=count)
+    add((lengths >= 4) & (lengths <= 15), 1.5, "Professional domain length")
+    add(lengths > 25, -2.0, "Unusually long domain name")
+    add(lengths <= 3, -1.0, "Very short domain name")
+
+    # 3-6. Prefix, structure, digit-run and suffix checks
+    add(column(_LEGITIMATE_SUBDOMAIN_RE.search, lower), 2.0, "Legitimate business communication subdomain")
+    add(column(_PROFESSIONAL_STRUCTURE_RE.search, lower), 1.0, "Professional domain structure")
+    add(column(_SUSPICIOUS_LABEL_RE.search, main_labels), -2.0, "Suspicious domain pattern detected")
+    add(column(_CLEAN_DOMAIN_RE.search, lower), 1.0, "Clean, established domain pattern")
+
+    # 7. Business terms; the reason names the term, so it is appended per row
+    terms = np.fromiter(map(DOMAIN_TERM_MATCHER.first_index, main_labels), dtype=np.int64, count=count)
+    for row in np.flatnonzero(terms >= 0):
+        total[row] += 1.0
+        row_reasons[row].append(f"Contains business term: {DOMAIN_BUSINESS_TERMS[terms[row]]}")
+
+    # 8. Service subdomains and IP addresses
+    add(column(_SERVICE_SUBDOMAIN_RE.search, lower), 1.5, "Common service subdomain pattern")
+    add(column(_IP_ADDRESS_RE.match, valid), -5.0, "IP address instead of domain name")
+
+    scores[rows] = np.clip(total, 0.0, 10.0)
+    return scores, reasons
+
+def calculate_domain_legitimacy_scores(domains: List[str]) -> Dict[str, Tuple[float, List[str]]]:
+    """Score and reasons of each distinct domain in ``domains``
+
+    Served from DOMAIN_SCORE_CACHE where possible; the rest are scored together by
+    score_domains() and cached.
+    """
+    scored: Dict[str, Tuple[float, List[str]]] = {}
+    misses = []
+    for domain in dict.fromkeys(domains):
+        cached = DOMAIN_SCORE_CACHE.get(domain)
+        if cached is None:
+            misses.append(domain)
+        else:
+            scored[domain] = cached[0], list(cached[1])
+    with profile_span("calculate_domain_legitimacy_scores", domains=len(misses)):
+        if misses:
+            scores, reasons = score_domains(misses)
+            for domain, score, domain_reasons in zip(misses, scores.tolist(), reasons):
+                DOMAIN_SCORE_CACHE.put(domain, (score, tuple(domain_reasons)))
+                scored[domain] = score, domain_reasons
+    return scored
+
+class EmailAnalysis:
+    """Domain analysis of one email, computed once and shared by every stage of a request.
+
+    Holds the extracted domains in order of first appearance with the contexts each
+    was seen in (sender, link, mention), the legitimacy score and reasons of each
+    domain, and the sender legitimacy verdict.
+    """
+
+    def __init__(self, email_text: str, budget: Optional[ScanBudget] = None,
+                 domain_contexts: Optional[Dict[str, List[str]]] = None,
+                 scored_domains: Optional[Dict[str, Tuple[float, List[str]]]] = None):
+        # analyze_batch() passes the domains and scores it computed for the whole batch
+        self.email_text = email_text
+        # Unlimited unless the caller passes the email's budget; feature extraction charges it too
+        self.budget = budget if budget is not None else ScanBudget()
+        with self.budget:
+            if domain_contexts is None:
+                with profile_span("extract_domain_from_email"):
+                    domain_contexts = scan_domains(email_text, self.budget)
+            self.domain_contexts = domain_contexts
+            self.domains = list(domain_contexts)
+            self.domain_scores: Dict[str, Tuple[float, List[str]]] = {}
+            for domain in self.domains:
+                if self.budget.exhausted("calculate_domain_legitimacy_score"):
+                    break
+                if scored_domains is None:
+                    self.domain_scores[domain] = calculate_domain_legitimacy_score(domain)
+                else:
+                    score, reasons = scored_domains[domain]
+                    self.domain_scores[domain] = score, list(reasons)
+        self.max_domain_score = max([score for score, _ in self.domain_scores.values()] + [0.0])
+        self.is_legitimate, self.legitimacy_reason = self._legitimacy_verdict()
+
+    @classmethod
+    def analyze_batch(cls, email_texts: List[str], budgets: List[ScanBudget]) -> List['EmailAnalysis']:
+        """Analyses of a batch of emails, scoring the distinct domains of the whole batch at once"""
+        batch_contexts = []
+        for email_text, budget in zip(email_texts, budgets):
+            with budget, profile_span("extract_domain_from_email"):
+                batch_contexts.append(scan_domains(email_text, budget))
+        scored_domains = calculate_domain_legitimacy_scores(
+            [domain for domain_contexts in batch_contexts for domain in domain_contexts])
+        return [cls(email_text, budget, domain_contexts, scored_domains)
+                for email_text, budget, domain_contexts in zip(email_texts, budgets, batch_contexts)]
+
+    def _legitimacy_verdict(self) -> Tuple[bool, str]:
+        """Pick the best-scoring domain and apply the legitimacy threshold"""
+        if not self.domains:
+            return False, "No domains found"
+        
+        max_score = 0.0
+        best_reasons = []
+        best_domain = None
+        
+        for domain, (score, reasons) in self.domain_scores.items():
+            if score > max_score:
+                max_score = score
+                best_reasons = reasons
+                best_domain = domain
+        
+        # Consider legitimate if score is above threshold (lowered for better coverage)
+        is_legitimate = max_score >= 4.0
+        
+        reason = f"Domain: {best_domain}, Score: {max_score:.1f}/10, Reasons: {'; '.join(best_reasons)}"
+        
+        return is_legitimate, reason
+
+def is_legitimate_sender(email_text: str, analysis: Optional[EmailAnalysis] = None) -> Tuple[bool, str]:
     """Dynamic legitimacy check based on multiple factors"""
-    domains = extract_domain_from_email(email_text)
+    if analysis is None:
+        analysis = EmailAnalysis(email_text)
+    return analysis.is_legitimate, analysis.legitimacy_reason
+
+# Enhanced features, one column each, in the order the model sees them
+ENHANCED_FEATURES = ('suspicious_links', 'urgency', 'money', 'credential_harvesting', 'sender_legitimacy')
+
+# The trees compare features as float32, so float32 gives the same predictions in half
+# the memory; FEATURE_DTYPE=float64 keeps the exact values. Batches are processed in
+# chunks of FEATURE_CHUNK_SIZE emails, analysing only one chunk's emails at a time.
+FEATURE_DTYPE = np.dtype(os.environ.get("FEATURE_DTYPE", "float32"))
+FEATURE_CHUNK_SIZE = int(os.environ.get("FEATURE_CHUNK_SIZE", 256))
+
+def _enhanced_feature_row(email_text: str, analysis: EmailAnalysis) -> Tuple[float, float, float, float, float]:
+    """The ENHANCED_FEATURES of one email"""
+    budget = analysis.budget
+    email_lower = email_text.lower()
+    # Urgency, money and credential patterns are matched in one pass, or one pass per family
+    # with a span each when profiling
+    if profiling():
+        pattern_counts = {}
+        for family, scanner in PHISHING_FAMILY_SCANNERS.items():
+            with budget, profile_span(f"{family}_patterns"):
+                pattern_counts.update(scanner.scan(email_lower, budget, "phishing_language_patterns"))
+    else:
+        with budget:
+            pattern_counts = PHISHING_LANGUAGE_SCANNER.scan(email_lower, budget, "phishing_language_patterns")
     
-    if not domains:
-        return False, "No domains found"
+    # 1. Suspicious links (excluding legitimate domains)
+    with budget, profile_span("suspicious_url_patterns"):
+        suspicious_link_count = SUSPICIOUS_URL_SCANNER.scan(email_text, budget, "suspicious_url_patterns")['suspicious_url']
     
-    max_score = 0.0
-    best_reasons = []
-    best_domain = None
+    # Don't count links from legitimate domains as suspicious
+    for domain_score, _ in analysis.domain_scores.values():
+        if domain_score >= 4.0:  # Match new legitimacy threshold
+            suspicious_link_count = max(0, suspicious_link_count - 1)  # Reduce penalty for each legitimate domain
     
-    for domain in domains:
-        score, reasons = calculate_domain_legitimacy_score(domain)
-        if score > max_score:
-            max_score = score
-            best_reasons = reasons
-            best_domain = domain
+    suspicious_links = min(suspicious_link_count, 10)
     
-    # Consider legitimate if score is above threshold (lowered for better coverage)
-    is_legitimate = max_score >= 4.0
+    # 2. Phishing urgency patterns
+    urgency_score = pattern_counts['urgency']
     
-    reason = f"Domain: {best_domain}, Score: {max_score:.1f}/10, Reasons: {'; '.join(best_reasons)}"
+    # Reduce urgency score for legitimate business communications
+    legitimacy_score = analysis.max_domain_score
+    if legitimacy_score >= 4.0:  # Match new legitimacy threshold
+        urgency_score = max(0, urgency_score * (1 - legitimacy_score/15.0))  # Reduce based on legitimacy score
     
-    return is_legitimate, reason
-
-def extract_enhanced_email_features(emails: List[str]) -> np.ndarray:
-    """Enhanced feature extraction with legitimate email awareness"""
-    num_emails = len(emails)
+    urgency_score = min(urgency_score, 10)
     
-    # Initialize feature arrays
-    num_suspicious_links = np.zeros((num_emails, 1))
-    phishing_urgency_score = np.zeros((num_emails, 1))
-    phishing_money_score = np.zeros((num_emails, 1))
-    credential_harvesting_score = np.zeros((num_emails, 1))
-    sender_legitimacy_score = np.zeros((num_emails, 1))
+    # 3. Money/prize related phishing
+    money_score = pattern_counts['money'] * 2  # Weight these heavily
     
-    for i, email in enumerate(emails):
-        email_lower = email.lower()
-        
-        # 1. Suspicious links (excluding legitimate domains)
-        suspicious_link_count = 0
-        for pattern in SUSPICIOUS_URL_PATTERNS:
-            matches = re.findall(pattern, email, re.IGNORECASE)
-            suspicious_link_count += len(matches)
-        
-        # Don't count links from legitimate domains as suspicious
-        domains_in_email = extract_domain_from_email(email)
-        for domain in domains_in_email:
-            domain_score, _ = calculate_domain_legitimacy_score(domain)
-            if domain_score >= 4.0:  # Match new legitimacy threshold
-                suspicious_link_count = max(0, suspicious_link_count - 1)  # Reduce penalty for each legitimate domain
-        
-        num_suspicious_links[i] = min(suspicious_link_count, 10)
-        
-        # 2. Phishing urgency patterns
-        urgency_score = 0
-        for pattern in PHISHING_URGENT_PATTERNS:
-            matches = re.findall(pattern, email_lower)
-            urgency_score += len(matches)
-        
-        # Reduce urgency score for legitimate business communications
-        legitimacy_score = max([calculate_domain_legitimacy_score(d)[0] for d in extract_domain_from_email(email)] + [0.0])
-        if legitimacy_score >= 4.0:  # Match new legitimacy threshold
-            urgency_score = max(0, urgency_score * (1 - legitimacy_score/15.0))  # Reduce based on legitimacy score
-        
-        phishing_urgency_score[i] = min(urgency_score, 10)
-        
-        # 3. Money/prize related phishing
-        money_score = 0
-        for pattern in PHISHING_MONEY_PATTERNS:
-            matches = re.findall(pattern, email_lower)
-            money_score += len(matches) * 2  # Weight these heavily
-        
-        phishing_money_score[i] = min(money_score, 10)
-        
-        # 4. Credential harvesting attempts
-        cred_score = 0
-        for pattern in PHISHING_CREDENTIAL_PATTERNS:
-            matches = re.findall(pattern, email_lower)
-            cred_score += len(matches) * 2
-        
-        # Don't penalize legitimate password reset emails
-        if legitimacy_score >= 4.0 and ('password' in email_lower or 'account' in email_lower):  # Match new legitimacy threshold
-            cred_score = max(0, cred_score * (1 - legitimacy_score/12.0))
-        
-        credential_harvesting_score[i] = min(cred_score, 10)
-        
-        # 5. Sender legitimacy (higher score = more legitimate)
-        domains_in_email = extract_domain_from_email(email)
-        if domains_in_email:
-            max_domain_score = max([calculate_domain_legitimacy_score(d)[0] for d in domains_in_email])
-            sender_legitimacy_score[i] = max_domain_score
+    money_score = min(money_score, 10)
+    
+    # 4. Credential harvesting attempts
+    cred_score = pattern_counts['credential'] * 2
+    
+    # Don't penalize legitimate password reset emails
+    if legitimacy_score >= 4.0 and ('password' in email_lower or 'account' in email_lower):  # Match new legitimacy threshold
+        cred_score = max(0, cred_score * (1 - legitimacy_score/12.0))
+    
+    cred_score = min(cred_score, 10)
+    
+    # 5. Sender legitimacy (higher score = more legitimate)
+    if analysis.domains:
+        sender_legitimacy = analysis.max_domain_score
+    else:
+        # Check for business-like characteristics if no domains found
+        with budget, profile_span("business_term_patterns"):
+            business_indicators = 0 if budget.exhausted("business_term_patterns") else len(
+                LEGITIMATE_TERM_MATCHER.words_in(email_lower))
+        sender_legitimacy = min(business_indicators * 0.5, 3.0)  # Lower max score for domain-less emails
+
+    return suspicious_links, urgency_score, money_score, cred_score, sender_legitimacy
+
+class FeatureEngine:
+    """Enhanced feature extraction into one preallocated ``(n, len(ENHANCED_FEATURES))`` matrix
+
+    Rows are computed a chunk at a time and written into the matrix one chunk at a
+    time. With ``reuse_row`` a single-email call writes into a row buffer of the
+    calling thread (each inference worker has its own) instead of a new matrix; the
+    result then stays valid only until that thread's next such call.
+    """
+
+    def __init__(self, dtype=FEATURE_DTYPE, chunk_size: int = FEATURE_CHUNK_SIZE):
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = max(1, chunk_size)
+        self._local = threading.local()
+
+    def _row_buffer(self) -> np.ndarray:
+        buffer = getattr(self._local, "row", None)
+        if buffer is None:
+            buffer = self._local.row = np.zeros((1, len(ENHANCED_FEATURES)), dtype=self.dtype)
+        return buffer
+
+    def extract(self, emails: List[str], analyses: Optional[List[EmailAnalysis]] = None,
+                reuse_row: bool = False) -> np.ndarray:
+        num_emails = len(emails)
+        if num_emails == 1 and reuse_row:
+            features = self._row_buffer()
         else:
-            # Check for business-like characteristics if no domains found
-            business_indicators = sum([
-                1 for term in LEGITIMATE_BUSINESS_TERMS 
-                if re.search(r'\b' + re.escape(term) + r'\b', email_lower)
-            ])
-            sender_legitimacy_score[i] = min(business_indicators * 0.5, 3.0)  # Lower max score for domain-less emails
-    
-    # Combine features
-    features = np.hstack([
-        num_suspicious_links,
-        phishing_urgency_score,
-        phishing_money_score,
-        credential_harvesting_score,
-        sender_legitimacy_score
-    ])
-    
-    logger.info(f"Enhanced feature extraction completed. Shape: {features.shape}")
-    return features
+            features = np.empty((num_emails, len(ENHANCED_FEATURES)), dtype=self.dtype)
+        for start in range(0, num_emails, self.chunk_size):
+            chunk = emails[start:start + self.chunk_size]
+            if analyses is not None:
+                chunk_analyses = analyses[start:start + len(chunk)]
+            else:
+                chunk_analyses = EmailAnalysis.analyze_batch(chunk, [ScanBudget() for _ in chunk])
+            features[start:start + len(chunk)] = [
+                _enhanced_feature_row(email_text, analysis) for email_text, analysis in zip(chunk, chunk_analyses)
+            ]
+        return features
+
+FEATURE_ENGINE = FeatureEngine()
+
+def extract_enhanced_email_features(emails: List[str], analyses: Optional[List[EmailAnalysis]] = None,
+                                    reuse_row: bool = False) -> np.ndarray:
+    """Enhanced feature extraction with legitimate email awareness
+
+    ``analyses`` may carry a precomputed EmailAnalysis per email so domains are not
+    extracted and scored again. This is the one entry point for the API, the bulk
+    scanner and training; see FeatureEngine for the layout of the result. The result
+    is a new array unless ``reuse_row`` is set, which only the scoring path does as
+    it consumes a single email's row right away.
+    """
+    return FEATURE_ENGINE.extract(emails, analyses, reuse_row)
 
 def calculate_confidence_with_context(features: np.ndarray, prediction_proba: np.ndarray, 
-                                     email_text: str) -> Tuple[float, List[str]]:
+                                     email_text: str,
+                                     analysis: Optional[EmailAnalysis] = None) -> Tuple[float, List[str]]:
     """Calculate confidence with contextual adjustments"""
-    is_legit, legit_reason = is_legitimate_sender(email_text)
+    is_legit, legit_reason = is_legitimate_sender(email_text, analysis)
     phishing_prob = float(prediction_proba[1])
     safe_prob = float(prediction_proba[0])
     
@@ -365,6 +1093,16 @@ def calculate_confidence_with_context(features: np.ndarray, prediction_proba: np
         reasons.append("Sender is from a trusted domain")
     
     # Generate detailed reasoning
+    reasons.extend(feature_reasons(features))
+    
+    if not reasons and phishing_prob < 0.3:
+        reasons.append("No significant suspicious patterns detected")
+    
+    return adjusted_confidence, reasons
+
+def feature_reasons(features: np.ndarray) -> List[str]:
+    """Human-readable reasons derived from the enhanced features of one email"""
+    reasons = []
     email_features = features[0] if len(features.shape) > 1 else features
     
     if email_features[0] > 2:  # suspicious links
@@ -378,81 +1116,405 @@ def calculate_confidence_with_context(features: np.ndarray, prediction_proba: np
     if email_features[4] > 5:  # legitimacy
         reasons.append("Shows characteristics of legitimate business communication")
     
-    if not reasons and phishing_prob < 0.3:
-        reasons.append("No significant suspicious patterns detected")
-    
-    return adjusted_confidence, reasons
+    return reasons
 
-# Load models (keeping original structure but with enhanced processing)
-print("Loading models and preprocessing components...")
+# Models are loaded by load_models(): in a background thread once the server is up
+# (see lifespan), or up front by the pre-fork supervisor and by offline scripts.
+# Until loading and warmup finish, model-backed endpoints answer 503 and /ready
+# reports progress.
+model = None
+vectorizer = None
+model_manifest = None
+use_advanced_model = False
+MODEL_FINGERPRINT = None
 
-try:
-    # Try to load advanced model
+MODEL_STATE = {
+    "status": "not_loaded",  # not_loaded -> loading -> warming -> ready, or failed
+    "error": None,
+    "load_seconds": None,
+    "warmup_seconds": None,
+}
+MODELS_READY = threading.Event()
+_model_load_lock = threading.Lock()
+
+def model_fingerprint(*paths: str) -> str:
+    """Content hash of the model artifacts, used to invalidate cached verdicts"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as artifact_file:
+            for chunk in iter(lambda: artifact_file.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def _load_model_files():
+    """Load the model and vectorizer into the module globals"""
+    global model, vectorizer, model_manifest, use_advanced_model, MODEL_FINGERPRINT
+    
+    # Load models (keeping original structure but with enhanced processing)
+    print("Loading models and preprocessing components...")
+    
+    # Exported artifacts (see model_artifacts.py) are memory-mapped and need neither pickle
+    # nor scikit-learn, so they are preferred when present
+    artifact_dir = os.environ.get("MODEL_ARTIFACT_DIR") or (
+        'backend/model_artifacts' if os.path.exists('backend/model_artifacts') else 'model_artifacts'
+    )
+    if has_model_artifacts(artifact_dir):
+        try:
+            loaded_model, loaded_vectorizer, manifest = load_model_artifacts(
+                artifact_dir, verify=os.environ.get("MODEL_ARTIFACT_VERIFY", "1") != "0"
+            )
+            print(f"Model artifacts (format v{manifest['format_version']}) loaded from {artifact_dir}")
+            model, vectorizer, model_manifest = loaded_model, loaded_vectorizer, manifest
+            use_advanced_model = True
+            MODEL_FINGERPRINT = manifest['checksum'][:16]
+            return
+        except Exception as e:
+            print(f"Error loading model artifacts from {artifact_dir}: {e}")
+    
     try:
-        model_path = 'backend/model.pkl' if os.path.exists('backend/model.pkl') else 'model.pkl'
-        vectorizer_path = 'backend/vectorizer.pkl' if os.path.exists('backend/vectorizer.pkl') else 'vectorizer.pkl'
+        # Try to load advanced model
+        try:
+            model_path = 'backend/model.pkl' if os.path.exists('backend/model.pkl') else 'model.pkl'
+            vectorizer_path = 'backend/vectorizer.pkl' if os.path.exists('backend/vectorizer.pkl') else 'vectorizer.pkl'
         
-        with open(model_path, 'rb') as model_file:
-            model = pickle.load(model_file)
+            with open(model_path, 'rb') as model_file:
+                loaded_model = pickle.load(model_file)
         
-        with open(vectorizer_path, 'rb') as vectorizer_file:
-            vectorizer = pickle.load(vectorizer_file)
+            with open(vectorizer_path, 'rb') as vectorizer_file:
+                loaded_vectorizer = pickle.load(vectorizer_file)
         
-        print(f"Enhanced model loaded successfully from {model_path}")
-        use_advanced_model = True
-    except FileNotFoundError:
-        # Try default model
-        default_model_path = 'backend/default_model.pkl' if os.path.exists('backend/default_model.pkl') else 'default_model.pkl'
+            print(f"Enhanced model loaded successfully from {model_path}")
+            use_advanced_model = True
+        except FileNotFoundError:
+            # Try default model
+            model_path = 'backend/default_model.pkl' if os.path.exists('backend/default_model.pkl') else 'default_model.pkl'
         
-        with open(default_model_path, 'rb') as model_file:
-            model = pickle.load(model_file)
+            with open(model_path, 'rb') as model_file:
+                loaded_model = pickle.load(model_file)
         
-        with open(vectorizer_path, 'rb') as vectorizer_file:
-            vectorizer = pickle.load(vectorizer_file)
+            with open(vectorizer_path, 'rb') as vectorizer_file:
+                loaded_vectorizer = pickle.load(vectorizer_file)
         
-        print(f"Default model loaded from {default_model_path}")
-        use_advanced_model = False
+            print(f"Default model loaded from {model_path}")
+            use_advanced_model = False
 
-except Exception as e:
-    print(f"Error loading models: {e}")
-    raise RuntimeError("Failed to load any model. Please train the model first.")
+    except Exception as e:
+        print(f"Error loading models: {e}")
+        raise RuntimeError("Failed to load any model. Please train the model first.")
+    
+    # Pickled gradient-boosting models are served through the same array evaluator and
+    # vocabulary-pruned vectorizer as exported artifacts (ARRAY_EVALUATOR=0 keeps the
+    # scikit-learn objects)
+    if os.environ.get("ARRAY_EVALUATOR", "1") != "0":
+        try:
+            array_model = ArrayEnsemble.from_model(loaded_model)
+            array_vectorizer = ArrayTfidfVectorizer.from_vectorizer(loaded_vectorizer)
+            loaded_model, loaded_vectorizer = prune_vocabulary(array_model, array_vectorizer)
+            print(f"Serving {loaded_vectorizer.n_columns} of {len(loaded_vectorizer.idf_)} "
+                  f"TF-IDF columns through the array evaluator")
+        except (ValueError, AttributeError) as e:
+            print(f"Serving {type(loaded_model).__name__} without the array evaluator: {e}")
+    
+    model, vectorizer, model_manifest = loaded_model, loaded_vectorizer, None
+    MODEL_FINGERPRINT = model_fingerprint(model_path, vectorizer_path)
 
-def process_email_enhanced(email_text: str):
-    """Enhanced email processing with contextual awareness"""
+def load_models(warmup_rounds: Optional[int] = None):
+    """Load the models (once), warm them up and mark the service ready (blocking)
+
+    Safe to call from several threads; later calls return once the first one has
+    finished. Raises RuntimeError when no model can be loaded.
+    """
+    with _model_load_lock:
+        if MODELS_READY.is_set():
+            return
+        MODEL_STATE.update(status="loading", error=None)
+        started = time.perf_counter()
+        try:
+            _load_model_files()
+        except Exception as e:
+            MODEL_STATE.update(status="failed", error=str(e))
+            raise
+        MODEL_STATE["load_seconds"] = round(time.perf_counter() - started, 3)
+        
+        # Cached verdicts are only valid for the model that produced them
+        VERDICT_CACHE.set_fingerprint(MODEL_FINGERPRINT)
+        VERDICT_CACHE.load()
+        
+        MODEL_STATE["status"] = "warming"
+        if warmup_rounds is None:
+            warmup_rounds = MODEL_WARMUP_ROUNDS
+        started = time.perf_counter()
+        try:
+            warm_up_models(warmup_rounds)
+        except Exception as e:
+            # A failed warmup only costs latency; the models themselves are usable
+            logger.warning(f"Model warmup failed: {e}")
+        MODEL_STATE["warmup_seconds"] = round(time.perf_counter() - started, 3)
+        
+        MODEL_STATE["status"] = "ready"
+        MODELS_READY.set()
+        logger.info(f"Models ready: loaded in {MODEL_STATE['load_seconds']}s, "
+                    f"warmed up in {MODEL_STATE['warmup_seconds']}s")
+
+def start_model_loading() -> Optional[threading.Thread]:
+    """Load the models in a background thread unless they are already loaded or loading"""
+    if MODELS_READY.is_set() or MODEL_STATE["status"] in ("loading", "warming"):
+        return None
+    
+    def run():
+        try:
+            load_models()
+        except Exception as e:
+            logger.error(f"Model loading failed: {e}")
+    
+    thread = threading.Thread(target=run, name="model-loader", daemon=True)
+    thread.start()
+    return thread
+
+def model_not_ready_response() -> JSONResponse:
+    return JSONResponse(status_code=503, content={
+        "error": f"Model not ready ({MODEL_STATE['status']})",
+        "model_status": MODEL_STATE["status"],
+        "model_error": MODEL_STATE["error"],
+    })
+
+class VerdictCache(LRUCache):
+    """Server-side cache of /predict results keyed by a normalized content hash.
+
+    Keys include the model fingerprint, so a new model never serves verdicts
+    computed by the old one. The cache can be persisted to a JSON file and
+    reloaded across restarts; a file written for another model is ignored.
+    """
+
+    def __init__(self, capacity: int, ttl: Optional[float], fingerprint: Optional[str],
+                 path: Optional[str] = None):
+        super().__init__(capacity, ttl)
+        self.fingerprint = fingerprint
+        self.path = path
+
+    @staticmethod
+    def normalize(email_text: str) -> str:
+        # Only normalizations that cannot change any feature: line endings and
+        # surrounding whitespace
+        return email_text.replace('\r\n', '\n').strip()
+
+    def key(self, email_text: str) -> str:
+        content = self.normalize(email_text).encode('utf-8', 'surrogatepass')
+        return f"{self.fingerprint}:{hashlib.sha256(content).hexdigest()}"
+
+    def get_verdict(self, email_text: str) -> Optional[Dict]:
+        verdict = self.get(self.key(email_text))
+        if verdict is None:
+            return None
+        return {**verdict, "reasons": list(verdict["reasons"])}
+
+    def put_verdict(self, email_text: str, verdict: Dict):
+        # A degraded verdict may depend on how busy the worker was; score the email again next time
+        if "error" not in verdict and not verdict.get("degraded"):
+            self.put(self.key(email_text), {**verdict, "reasons": list(verdict["reasons"])})
+
+    def set_fingerprint(self, fingerprint: str):
+        """Switch to a new model, dropping every verdict of the previous one"""
+        if fingerprint != self.fingerprint:
+            self.fingerprint = fingerprint
+            self.clear()
+
+    def save(self):
+        if not self.path or self.fingerprint is None:
+            return
+        now = time.time()
+        entries = [[key, expires_at, value] for key, expires_at, value in self.items()
+                   if expires_at is None or expires_at > now]
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as cache_file:
+            json.dump({"fingerprint": self.fingerprint, "entries": entries}, cache_file)
+        os.replace(tmp_path, self.path)
+        logger.info(f"Saved {len(entries)} cached verdicts to {self.path}")
+
+    def load(self):
+        if not self.path or self.fingerprint is None or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as cache_file:
+                saved = json.load(cache_file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable verdict cache {self.path}: {e}")
+            return
+        if saved.get("fingerprint") != self.fingerprint:
+            logger.info(f"Ignoring verdict cache {self.path} written for another model")
+            return
+        now = time.time()
+        loaded = 0
+        for key, expires_at, value in saved.get("entries", []):
+            if expires_at is None or expires_at > now:
+                self.put(key, value, expires_at)
+                loaded += 1
+        logger.info(f"Loaded {loaded} cached verdicts from {self.path}")
+
+# VERDICT_CACHE_TTL=0 keeps verdicts until evicted; VERDICT_CACHE_PATH enables persistence
+VERDICT_CACHE = VerdictCache(
+    capacity=int(os.environ.get("VERDICT_CACHE_SIZE", 50000)),
+    ttl=float(os.environ.get("VERDICT_CACHE_TTL", 3600)) or None,
+    fingerprint=MODEL_FINGERPRINT,
+    path=os.environ.get("VERDICT_CACHE_PATH"),
+)
+
+# Pipeline metrics, exposed on /metrics. Stage timings are recorded once per call, so a
+# batch call is a single observation.
+STAGE_SECONDS = metrics.Histogram(
+    "phishing_stage_seconds", "Time spent in each stage of the prediction pipeline per call", ["stage"])
+REQUEST_SECONDS = metrics.Histogram(
+    "phishing_request_seconds", "Latency of the scoring endpoints", ["endpoint"])
+REQUESTS_IN_FLIGHT = metrics.Gauge(
+    "phishing_requests_in_flight", "Requests currently being handled, per endpoint", ["endpoint"])
+VERDICTS = metrics.Counter(
+    "phishing_verdicts", "Emails scored, by verdict and whether the legitimate-sender override applied",
+    ["endpoint", "verdict", "legitimacy_override"])
+REQUEST_ERRORS = metrics.Counter(
+    "phishing_request_errors", "Scoring requests answered with an error", ["endpoint", "status"])
+metrics.Gauge("phishing_inference_in_flight",
+              "Calls running or queued in the inference pool").set_function(lambda: INFERENCE_POOL.in_flight)
+metrics.Gauge("phishing_model_ready",
+              "1 once the models are loaded and warmed up").set_function(lambda: float(MODELS_READY.is_set()))
+
+SCAN_BUDGET_EXCEEDED = metrics.Counter(
+    "phishing_scan_budget_exceeded", "Emails whose scan hit a budget, by budget (bytes, tokens or time)",
+    ["budget"])
+
+def flag_degraded(result: Dict, budget: ScanBudget) -> Dict:
+    """Mark ``result`` as degraded when scanning its email hit a budget"""
+    if budget.degraded:
+        result["degraded"] = True
+        result["degraded_reasons"] = budget.degraded_reasons()
+        for exceeded in budget.exceeded:
+            SCAN_BUDGET_EXCEEDED.labels(exceeded).inc()
+    return result
+
+def count_verdicts(endpoint: str, results: List[Dict]):
+    for result in results:
+        if "prediction" in result:
+            VERDICTS.labels(endpoint, "phishing" if result["prediction"] == "Phishing Email" else "safe",
+                            "true" if result["is_legitimate_sender"] else "false").inc()
+
+def instrumented(endpoint: str):
+    """Record latency, in-flight count, errors and verdicts of a scoring endpoint"""
+    in_flight = REQUESTS_IN_FLIGHT.labels(endpoint)
+    latency = REQUEST_SECONDS.labels(endpoint)
+    
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            with in_flight.track_inprogress(), latency.time():
+                response = await handler(*args, **kwargs)
+            if isinstance(response, JSONResponse):
+                if response.status_code >= 400:
+                    REQUEST_ERRORS.labels(endpoint, response.status_code).inc()
+            elif "error" in response:
+                REQUEST_ERRORS.labels(endpoint, 200).inc()
+            else:
+                count_verdicts(endpoint, response.get("results", [response]))
+            return response
+        return wrapper
+    return decorator
+
+def process_emails_enhanced(email_texts: List[str], analyses: Optional[List[EmailAnalysis]] = None,
+                            reuse_row: bool = False):
+    """Enhanced processing of a batch of emails into one combined feature matrix"""
     try:
         # TF-IDF vectorization
-        email_vector = vectorizer.transform([email_text])
+        with STAGE_SECONDS.labels("tfidf").time(), profile_span("tfidf_transform"):
+            email_vectors = vectorizer.transform(email_texts)
         
         # Enhanced feature extraction
-        additional_features = extract_enhanced_email_features([email_text])
+        with STAGE_SECONDS.labels("regex_features").time(), profile_span("extract_enhanced_email_features"):
+            additional_features = extract_enhanced_email_features(email_texts, analyses, reuse_row)
         
         # Combine features
-        combined_features = hstack([email_vector, additional_features])
+        combined_features = hstack([email_vectors, additional_features]).tocsr()
         
         return combined_features, additional_features
         
     except Exception as e:
         logger.error(f"Error in enhanced email processing: {e}")
-        # Fallback to basic processing
-        return vectorizer.transform([email_text]), None
+        # Fallback to basic processing; the enhanced feature columns the model still
+        # expects are left at zero
+        email_vectors = vectorizer.transform(email_texts)
+        missing_columns = model.n_features_in_ - email_vectors.shape[1]
+        if missing_columns > 0:
+            email_vectors = hstack([email_vectors, csr_matrix((email_vectors.shape[0], missing_columns))]).tocsr()
+        return email_vectors, None
 
-@app.post("/predict")
-async def predict_enhanced(email: EmailInput):
-    """Enhanced prediction endpoint with improved accuracy for legitimate emails"""
-    email_text = email.email
-    
+def fast_path_features(email_texts: List[str], analyses: List[EmailAnalysis]) -> Optional[np.ndarray]:
+    """Enhanced features of emails that skip the model, or None when extraction fails
+
+    As in process_emails_enhanced, a failure only costs the feature-based reasons. A
+    single email's row is the thread's reused row buffer, so it must be consumed
+    before the next call.
+    """
     try:
-        # Process email with enhanced features
-        features, additional_features = process_email_enhanced(email_text)
-        
-        # Make prediction
-        prediction = model.predict(features)[0]
-        prediction_proba = model.predict_proba(features)[0]
-        
-        # Enhanced confidence calculation with context
+        with STAGE_SECONDS.labels("regex_features").time(), profile_span("extract_enhanced_email_features"):
+            return extract_enhanced_email_features(email_texts, analyses, reuse_row=True)
+    except Exception as e:
+        logger.error(f"Error in enhanced email processing: {e}")
+        return None
+
+def process_email_enhanced(email_text: str, analysis: Optional[EmailAnalysis] = None, reuse_row: bool = False):
+    """Enhanced email processing with contextual awareness"""
+    return process_emails_enhanced([email_text], [analysis] if analysis is not None else None, reuse_row)
+
+def predict_labels_and_proba(features, labels_only: bool = False):
+    """Evaluate the ensemble once and derive both class labels and probabilities
+
+    ``model.predict`` and ``model.predict_proba`` each traverse every tree; here the
+    raw decision values are computed once and turned into labels with the same rule
+    ``predict`` uses. With ``labels_only`` the probabilities are skipped and None is
+    returned in their place.
+    """
+    if hasattr(model, "proba_from_decision"):  # ArrayEnsemble from exported artifacts
+        decision_to_proba = model.proba_from_decision
+    elif hasattr(model, "decision_function") and hasattr(getattr(model, "_loss", None), "predict_proba"):
+        # Private loss object of scikit-learn's gradient boosting (1.1 and later; requirements.txt
+        # pins the tested version)
+        decision_to_proba = model._loss.predict_proba
+    elif hasattr(model, "decision_function") and hasattr(model, "loss"):
+        # A scikit-learn without that object: the public predict_proba traverses the trees again
+        decision_to_proba = lambda raw_predictions: model.predict_proba(features)
+    else:
+        # Not a gradient-boosting model: labels follow from the probabilities
+        prediction_proba = model.predict_proba(features)
+        return model.classes_[np.argmax(prediction_proba, axis=1)], prediction_proba
+    
+    raw_predictions = model.decision_function(features)
+    if raw_predictions.ndim == 1:  # binary problem, decision_function squeezed it
+        encoded_classes = (raw_predictions >= 0).astype(int)
+    else:
+        encoded_classes = np.argmax(raw_predictions, axis=1)
+    labels = model.classes_[encoded_classes]
+    if labels_only:
+        return labels, None
+    return labels, decision_to_proba(raw_predictions)
+
+def build_prediction_response(email_text: str, analysis: EmailAnalysis, prediction: int,
+                              prediction_proba: np.ndarray,
+                              additional_features: Optional[np.ndarray]) -> Dict:
+    """Turn the model output for one email into the /predict response body
+
+    ``additional_features`` is the single feature row of this email, or None when
+    enhanced processing failed. ``prediction_proba`` is None when the model was
+    skipped because the sender is legitimate (see score_email).
+    """
+    # Enhanced confidence calculation with context
+    if prediction_proba is None:
+        # The legitimacy override below replaces the model output entirely, so the
+        # reasons are the ones calculate_confidence_with_context gives legit senders
+        reasons = [analysis.legitimacy_reason, "Sender is from a trusted domain"]
+        if additional_features is not None:
+            reasons.extend(feature_reasons(additional_features))
+        phishing_confidence = safe_confidence = None
+    else:
         if additional_features is not None:
             confidence, reasons = calculate_confidence_with_context(
-                additional_features, prediction_proba, email_text
+                additional_features, prediction_proba, email_text, analysis
             )
         else:
             confidence = float(max(prediction_proba))
@@ -461,53 +1523,531 @@ async def predict_enhanced(email: EmailInput):
         # Determine final prediction label
         phishing_confidence = float(prediction_proba[1])
         safe_confidence = float(prediction_proba[0])
+    
+    # Check if it's from a legitimate sender
+    is_legit, legit_reason = is_legitimate_sender(email_text, analysis)
+    
+    # Override prediction for clearly legitimate emails
+    if is_legit:  # Always override for legitimate senders
+        prediction = 0  # Mark as safe
+        # Force very low phishing confidence for legitimate senders
+        max_domain_score = analysis.max_domain_score
         
-        # Check if it's from a legitimate sender
-        is_legit, legit_reason = is_legitimate_sender(email_text)
+        if max_domain_score >= 6.0:  # High legitimacy score
+            phishing_confidence = 0.05  # 5% risk
+            safe_confidence = 0.95
+        elif max_domain_score >= 4.0:  # Medium legitimacy score (matches threshold)
+            phishing_confidence = 0.10  # 10% risk
+            safe_confidence = 0.90
+        else:  # Still legitimate but lower score
+            phishing_confidence = 0.12  # 12% risk
+            safe_confidence = 0.88
+    
+    prediction_label = "Phishing Email" if prediction == 1 else "Safe Email"
+    # Always return phishing confidence as the main confidence metric for clarity
+    final_confidence = phishing_confidence
+    
+    return {
+        "prediction": prediction_label,
+        "confidence": round(final_confidence, 3),
+        "phishing_confidence": round(phishing_confidence, 3),
+        "safe_confidence": round(safe_confidence, 3),
+        "reasons": reasons,
+        "is_legitimate_sender": is_legit,
+        "model_type": "Enhanced ML with Legitimate Email Detection"
+    }
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference pool already holds as many requests as it may queue"""
+
+class InferencePool:
+    """Runs blocking scoring work off the event loop in a thread or process pool.
+
+    At most ``workers + queue_size`` calls may be running or waiting at once; further
+    calls are rejected with InferenceQueueFull instead of piling up.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 4, queue_size: int = 64):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown inference executor: {kind}")
+        self.kind = kind
+        self.workers = max(workers, 1)
+        self.queue_size = max(queue_size, 0)
+        self.in_flight = 0
+        self._executor = None
+        self._process_executor = None
+
+    def _get_executor(self):
+        # Worker processes must fork with the models already loaded, so until they are
+        # ready a process pool runs calls (which can then only be model-free ones, like
+        # /check_sender) in threads
+        if self.kind == "process" and MODELS_READY.is_set():
+            if self._process_executor is None:
+                self._process_executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._process_executor
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix="inference")
+        return self._executor
+
+    async def run(self, fn, *args):
+        if self.in_flight >= self.workers + self.queue_size:
+            raise InferenceQueueFull(
+                f"Inference queue full ({self.in_flight} requests in flight)"
+            )
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            if executor is not self._process_executor:
+                return await loop.run_in_executor(executor, fn, *args)
+            # Metrics recorded in a worker process are sent back and recorded here
+            result, samples = await loop.run_in_executor(executor, metrics.run_captured, fn, *args)
+            metrics.replay(samples)
+            return result
+        finally:
+            self.in_flight -= 1
+
+    def shutdown(self):
+        for executor in (self._executor, self._process_executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._process_executor = None
+
+INFERENCE_POOL = InferencePool(
+    kind=os.environ.get("INFERENCE_EXECUTOR", "thread"),
+    workers=int(os.environ.get("INFERENCE_WORKERS", os.cpu_count() or 1)),
+    queue_size=int(os.environ.get("INFERENCE_QUEUE_SIZE", 64)),
+)
+
+def queue_full_response(e: InferenceQueueFull) -> JSONResponse:
+    logger.warning(str(e))
+    return JSONResponse(status_code=503, content={"error": str(e)})
+
+# ?profile=true (or an X-Profile: true header) on /predict and /check_sender adds a timing
+# breakdown to the response; ?profile=cprofile adds a cProfile summary as well, but only when
+# PROFILE_CPROFILE=1. REQUEST_PROFILING=0 ignores profiling requests altogether.
+REQUEST_PROFILING = os.environ.get("REQUEST_PROFILING", "1") != "0"
+PROFILE_CPROFILE = os.environ.get("PROFILE_CPROFILE", "0") == "1"
+PROFILE_CPROFILE_LINES = int(os.environ.get("PROFILE_CPROFILE_LINES", 30))
+# cProfile slows the profiled request down considerably; profile one request at a time
+_cprofile_lock = threading.Lock()
+
+def requested_profile(query_flag: Optional[str], header_flag: Optional[str]) -> Optional[str]:
+    """'timings', 'cprofile' or None, from the profile query parameter or X-Profile header"""
+    flag = (query_flag or header_flag or '').strip().lower()
+    if not REQUEST_PROFILING or flag in ('', '0', 'false', 'no', 'off'):
+        return None
+    return 'cprofile' if flag == 'cprofile' else 'timings'
+
+def run_profiled(fn, email_text: str, mode: str) -> Tuple[Dict, Dict]:
+    """Run ``fn(email_text)`` while recording its profile spans (blocking)
+
+    Returns the result and the profile: total time, the spans in completion order
+    and, in 'cprofile' mode when allowed, a cProfile summary.
+    """
+    profile: Dict = {}
+    profiler = None
+    if mode == 'cprofile':
+        if not PROFILE_CPROFILE:
+            profile["cprofile_error"] = "cProfile summaries are disabled (PROFILE_CPROFILE=0)"
+        elif not _cprofile_lock.acquire(blocking=False):
+            profile["cprofile_error"] = "Another request is being profiled with cProfile"
+        else:
+            profiler = cProfile.Profile()
+    
+    spans: List[Dict] = []
+    _request_profile.spans = spans
+    _request_profile.started = started = time.perf_counter()
+    try:
+        if profiler is not None:
+            profiler.enable()
+        result = fn(email_text)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _cprofile_lock.release()
+        _request_profile.spans = None
+    
+    profile["total_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    profile["spans"] = spans
+    if profiler is not None:
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(PROFILE_CPROFILE_LINES)
+        profile["cprofile"] = summary.getvalue()
+    return result, profile
+
+# Skip TF-IDF and the model for emails whose legitimacy override would discard their output
+LEGITIMACY_FAST_PATH = os.environ.get("LEGITIMACY_FAST_PATH", "1") != "0"
+
+def score_email(email_text: str) -> Dict:
+    """Run the full prediction pipeline for one email (blocking)"""
+    budget = new_scan_budget()
+    email_text = budget.limit(email_text)
+    # Extract and score domains once for every stage below
+    with STAGE_SECONDS.labels("domain_scoring").time():
+        analysis = EmailAnalysis(email_text, budget)
+    
+    if LEGITIMACY_FAST_PATH and analysis.is_legitimate:
+        # Tier 1: the cheap domain check already decides the verdict
+        additional_features = fast_path_features([email_text], [analysis])
+        result = build_prediction_response(email_text, analysis, 0, None, additional_features)
+    else:
+        # Process email with enhanced features
+        features, additional_features = process_email_enhanced(email_text, analysis, reuse_row=True)
         
-        # Override prediction for clearly legitimate emails
-        if is_legit:  # Always override for legitimate senders
-            prediction = 0  # Mark as safe
-            # Force very low phishing confidence for legitimate senders
-            domains = extract_domain_from_email(email_text)
-            max_domain_score = max([calculate_domain_legitimacy_score(d)[0] for d in domains] + [0.0])
-            
-            if max_domain_score >= 6.0:  # High legitimacy score
-                phishing_confidence = 0.05  # 5% risk
-                safe_confidence = 0.95
-            elif max_domain_score >= 4.0:  # Medium legitimacy score (matches threshold)
-                phishing_confidence = 0.10  # 10% risk
-                safe_confidence = 0.90
-            else:  # Still legitimate but lower score
-                phishing_confidence = 0.12  # 12% risk
-                safe_confidence = 0.88
+        # Make prediction
+        with STAGE_SECONDS.labels("ensemble").time(), profile_span("model_inference"):
+            predictions, prediction_probas = predict_labels_and_proba(features)
         
-        prediction_label = "Phishing Email" if prediction == 1 else "Safe Email"
-        # Always return phishing confidence as the main confidence metric for clarity
-        final_confidence = phishing_confidence
+        result = build_prediction_response(
+            email_text, analysis, predictions[0], prediction_probas[0], additional_features
+        )
+    
+    # Debug logging
+    logger.info(f"Email from legitimate sender: {result['is_legitimate_sender']}")
+    logger.info(f"Prediction: {result['prediction']}, Phishing: {result['phishing_confidence']:.3f}, "
+                f"Safe: {result['safe_confidence']:.3f}")
+    
+    return flag_degraded(result, budget)
+
+def label_only_response(result: Dict) -> Dict:
+    """Reduce a full /predict result to what labels-only batch mode returns"""
+    return {
+        "prediction": result["prediction"],
+        "is_legitimate_sender": result["is_legitimate_sender"]
+    }
+
+def score_emails(email_texts: List[str], labels_only: bool = False) -> List[Dict]:
+    """Score a batch of emails with one vectorizer transform and one model pass (blocking)
+
+    Only emails that need the model are vectorized and scored; the rest take the
+    legitimate-sender fast path. With ``labels_only`` only the final label and the
+    legitimate-sender flag are returned per email, and class probabilities are
+    never computed.
+    """
+    budgets = [new_scan_budget() for _ in email_texts]
+    email_texts = [budget.limit(email_text) for budget, email_text in zip(budgets, email_texts)]
+    with STAGE_SECONDS.labels("domain_scoring").time():
+        analyses = EmailAnalysis.analyze_batch(email_texts, budgets)
+    results: List[Optional[Dict]] = [None] * len(email_texts)
+    
+    model_rows = [i for i, analysis in enumerate(analyses)
+                  if not (LEGITIMACY_FAST_PATH and analysis.is_legitimate)]
+    if model_rows:
+        features, additional_features = process_emails_enhanced(
+            [email_texts[i] for i in model_rows], [analyses[i] for i in model_rows]
+        )
+        with STAGE_SECONDS.labels("ensemble").time():
+            predictions, prediction_probas = predict_labels_and_proba(features, labels_only)
+        
+        for row, i in enumerate(model_rows):
+            if labels_only:
+                results[i] = {
+                    # Legitimate senders are always overridden to safe
+                    "prediction": "Safe Email" if analyses[i].is_legitimate or predictions[row] != 1 else "Phishing Email",
+                    "is_legitimate_sender": analyses[i].is_legitimate
+                }
+            else:
+                results[i] = build_prediction_response(
+                    email_texts[i], analyses[i], predictions[row], prediction_probas[row],
+                    additional_features[row:row + 1] if additional_features is not None else None
+                )
+    
+    fast_rows = [i for i, result in enumerate(results) if result is None]
+    if fast_rows and labels_only:
+        for i in fast_rows:
+            results[i] = {"prediction": "Safe Email", "is_legitimate_sender": True}
+    elif fast_rows:
+        additional_features = fast_path_features([email_texts[i] for i in fast_rows],
+                                                 [analyses[i] for i in fast_rows])
+        for row, i in enumerate(fast_rows):
+            results[i] = build_prediction_response(
+                email_texts[i], analyses[i], 0, None,
+                additional_features[row:row + 1] if additional_features is not None else None
+            )
+    
+    for result, budget in zip(results, budgets):
+        flag_degraded(result, budget)
+    
+    phishing_count = sum(1 for r in results if r["prediction"] == "Phishing Email")
+    logger.info(f"Batch prediction: {len(results)} emails, {phishing_count} flagged as phishing, "
+                f"{len(fast_rows)} decided by sender legitimacy alone")
+    
+    return results
+
+def check_sender(email_text: str) -> Dict:
+    """Sender legitimacy report for one email (blocking)"""
+    budget = new_scan_budget()
+    with STAGE_SECONDS.labels("domain_scoring").time():
+        analysis = EmailAnalysis(budget.limit(email_text), budget)
+    
+    return flag_degraded({
+        "is_legitimate": analysis.is_legitimate,
+        "reason": analysis.legitimacy_reason,
+        "extracted_domains": analysis.domains,
+        "domain_contexts": analysis.domain_contexts,
+        "domain_scores": {d: score for d, (score, _) in analysis.domain_scores.items()},
+        "domain_analysis": {d: reasons for d, (_, reasons) in analysis.domain_scores.items()}
+    }, budget)
+
+# Synthetic traffic for warm_up_models(), covering the model path and the legitimate-sender path
+WARMUP_EMAILS = [
+    "From: security@account-verify.tk\nURGENT: your account has been suspended. Verify your password "
+    "at http://secure-login.account-verify.tk/confirm within 24 hours to claim your $1,000 refund.",
+    "From: orders@amazon.com\nThank you for your order. Your invoice and receipt are attached. "
+    "Best regards, Amazon customer support team",
+    "Hi, are we still on for lunch tomorrow? Let me know what time works for you.",
+]
+# MODEL_WARMUP_ROUNDS=0 disables warmup
+MODEL_WARMUP_ROUNDS = int(os.environ.get("MODEL_WARMUP_ROUNDS", 3))
+
+def warm_up_models(rounds: int):
+    """Push synthetic emails through the single and batch scoring paths (blocking)
+
+    Pays first-call costs (regex compilation, allocator growth, lazily initialized
+    vectorizer and model state) before the service is marked ready. Stage metrics
+    of the synthetic traffic are discarded.
+    """
+    for round_number in range(1, rounds + 1):
+        started = time.perf_counter()
+        with metrics.capture():
+            for email_text in WARMUP_EMAILS:
+                process_email_enhanced(email_text)
+                score_email(email_text)
+            score_emails(WARMUP_EMAILS)
+            score_emails(WARMUP_EMAILS, labels_only=True)
+        logger.info(f"Warmup round {round_number}/{rounds}: "
+                    f"{(time.perf_counter() - started) * 1000:.1f} ms")
+    
+    # Keep synthetic domains out of the cache and its hit-rate statistics
+    DOMAIN_SCORE_CACHE.clear()
+    DOMAIN_SCORE_CACHE.reset_stats()
+
+@app.post("/predict")
+@instrumented("/predict")
+async def predict_enhanced(email: EmailInput, profile: Optional[str] = None,
+                           x_profile: Optional[str] = Header(None)):
+    """Enhanced prediction endpoint with improved accuracy for legitimate emails
+
+    With ``?profile=true`` the response carries a ``profile`` timing breakdown, and
+    the verdict cache is bypassed so the profile reflects a real computation.
+    """
+    if not MODELS_READY.is_set():
+        return model_not_ready_response()
+    profile_mode = requested_profile(profile, x_profile)
+    if profile_mode is None:
+        cached = VERDICT_CACHE.get_verdict(email.email)
+        if cached is not None:
+            return cached
+    
+    try:
+        if profile_mode is not None:
+            result, request_profile = await INFERENCE_POOL.run(run_profiled, score_email,
+                                                               email.email, profile_mode)
+            VERDICT_CACHE.put_verdict(email.email, result)
+            return {**result, "profile": request_profile}
         
-        # Debug logging
-        logger.info(f"Email from legitimate sender: {is_legit}")
-        logger.info(f"Prediction: {prediction}, Phishing: {phishing_confidence:.3f}, Safe: {safe_confidence:.3f}")
+        result = await INFERENCE_POOL.run(score_email, email.email)
+        VERDICT_CACHE.put_verdict(email.email, result)
+        return result
         
+    except InferenceQueueFull as e:
+        return queue_full_response(e)
+    except Exception as e:
+        import traceback
+        logger.error(f"Prediction failed: {str(e)}")
         return {
-            "prediction": prediction_label,
-            "confidence": round(final_confidence, 3),
-            "phishing_confidence": round(phishing_confidence, 3),
-            "safe_confidence": round(safe_confidence, 3),
-            "reasons": reasons,
-            "is_legitimate_sender": is_legit,
-            "model_type": "Enhanced ML with Legitimate Email Detection"
+            "error": f"Prediction failed: {str(e)}",
+            "traceback": traceback.format_exc()
         }
+
+# Upper bound on the number of emails accepted by a single /predict_batch call
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 1000))
+
+@app.post("/predict_batch")
+@instrumented("/predict_batch")
+async def predict_batch(batch: BatchEmailInput, labels_only: bool = False):
+    """Score many emails with one vectorizer transform and one pass of the model
+
+    Returns one result per email, in input order, shaped like the /predict response.
+    With ``?labels_only=true`` each result holds only the label and the
+    legitimate-sender flag, and class probabilities are not computed. Batches of more
+    than MAX_BATCH_SIZE emails are rejected with 413.
+    """
+    if not MODELS_READY.is_set():
+        return model_not_ready_response()
+    email_texts = batch.emails
+    if len(email_texts) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413,
+                            detail=f"Batch too large: {len(email_texts)} emails (limit {MAX_BATCH_SIZE})")
+    if not email_texts:
+        return {"results": []}
+    
+    try:
+        results = [VERDICT_CACHE.get_verdict(email_text) for email_text in email_texts]
+        if labels_only:
+            results = [label_only_response(r) if r is not None else None for r in results]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            scored = await INFERENCE_POOL.run(score_emails, [email_texts[i] for i in missing], labels_only)
+            for i, result in zip(missing, scored):
+                if not labels_only:
+                    VERDICT_CACHE.put_verdict(email_texts[i], result)
+                results[i] = result
+        return {"results": results}
         
+    except InferenceQueueFull as e:
+        return queue_full_response(e)
     except Exception as e:
         import traceback
-        logger.error(f"Prediction failed: {str(e)}")
+        logger.error(f"Batch prediction failed: {str(e)}")
         return {
-            "error": f"Prediction failed: {str(e)}",
+            "error": f"Batch prediction failed: {str(e)}",
             "traceback": traceback.format_exc()
         }
 
+# /predict_stream scores lines in micro-batches of up to STREAM_BATCH_SIZE emails, flushing a
+# partial batch once no new line has arrived for STREAM_FLUSH_INTERVAL seconds
+STREAM_BATCH_SIZE = int(os.environ.get("STREAM_BATCH_SIZE", 32))
+STREAM_FLUSH_INTERVAL = float(os.environ.get("STREAM_FLUSH_INTERVAL", 0.05))
+MAX_STREAM_LINE_BYTES = int(os.environ.get("MAX_STREAM_LINE_BYTES", 1 << 20))
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse that streams while the request body is still being read
+
+    StreamingResponse normally reads the request channel to notice disconnects,
+    which would swallow body chunks the response generator has not read yet. Here
+    the generator reads the body itself and sees a disconnect there.
+    """
+
+    async def listen_for_disconnect(self, receive):
+        # Cancelled once the response has been streamed
+        await asyncio.Event().wait()
+
+async def read_ndjson_lines(request: Request, lines: asyncio.Queue):
+    """Split the request body into lines and queue them; None marks the end of the body
+
+    Waits while the queue is full, so the body is only read as fast as it is scored.
+    Lines longer than MAX_STREAM_LINE_BYTES are replaced by an error marker.
+    """
+    try:
+        buffer = bytearray()
+        oversized = False
+        async for chunk in request.stream():
+            start = 0
+            while True:
+                end = chunk.find(b'\n', start)
+                if end < 0:
+                    break
+                if oversized or len(buffer) + end - start > MAX_STREAM_LINE_BYTES:
+                    await lines.put(ValueError(f"Line longer than {MAX_STREAM_LINE_BYTES} bytes"))
+                else:
+                    buffer += chunk[start:end]
+                    if buffer.strip():
+                        await lines.put(bytes(buffer))
+                buffer.clear()
+                oversized = False
+                start = end + 1
+            if not oversized:
+                buffer += chunk[start:]
+                if len(buffer) > MAX_STREAM_LINE_BYTES:
+                    oversized = True
+                    buffer.clear()
+        if oversized:
+            await lines.put(ValueError(f"Line longer than {MAX_STREAM_LINE_BYTES} bytes"))
+        elif buffer.strip():
+            await lines.put(bytes(buffer))
+    except Exception as e:
+        # e.g. the client disconnected; end the stream after what was read so far
+        await lines.put(ValueError(f"Request body failed: {e}"))
+    await lines.put(None)
+
+async def score_stream_batch(lines: List) -> List[Dict]:
+    """Score one micro-batch of NDJSON lines, one result per line in order"""
+    results: List[Optional[Dict]] = [None] * len(lines)
+    ids: List[Optional[object]] = [None] * len(lines)
+    texts: Dict[int, str] = {}
+    for i, line in enumerate(lines):
+        try:
+            if isinstance(line, Exception):
+                raise line
+            item = json.loads(line)
+            if not isinstance(item, dict):
+                raise ValueError("Expected a JSON object with an \"email\" field")
+            ids[i] = item.get("id")
+            email_text = EmailInput(email=item.get("email")).email
+        except ValueError as e:
+            results[i] = {"error": f"Invalid line: {e}"}
+            continue
+        cached = VERDICT_CACHE.get_verdict(email_text)
+        if cached is not None:
+            results[i] = cached
+        else:
+            texts[i] = email_text
+    
+    if texts:
+        while True:
+            try:
+                scored = await INFERENCE_POOL.run(score_emails, list(texts.values()))
+                break
+            except InferenceQueueFull:
+                # The stream is already throttled by its reader; wait for capacity instead of failing
+                await asyncio.sleep(STREAM_FLUSH_INTERVAL)
+        for i, result in zip(texts, scored):
+            VERDICT_CACHE.put_verdict(texts[i], result)
+            results[i] = result
+    
+    return [{"id": item_id, **result} if item_id is not None else result
+            for item_id, result in zip(ids, results)]
+
+@app.post("/predict_stream")
+async def predict_stream(request: Request):
+    """Score a stream of emails sent as NDJSON and stream the verdicts back as NDJSON
+
+    Each request line is a JSON object ``{"email": "...", "id": ...}`` (``id`` is
+    optional and echoed back). Each response line is the /predict result for the
+    matching request line, in order, or ``{"error": ...}`` for a line that could not
+    be parsed. Lines are scored in micro-batches; at most a few batches of the body
+    are buffered, however long the stream.
+    """
+    if not MODELS_READY.is_set():
+        return model_not_ready_response()
+    
+    async def verdict_lines():
+        lines = asyncio.Queue(maxsize=2 * STREAM_BATCH_SIZE)
+        reader = asyncio.create_task(read_ndjson_lines(request, lines))
+        REQUESTS_IN_FLIGHT.labels("/predict_stream").inc()
+        try:
+            finished = False
+            while not finished:
+                line = await lines.get()
+                if line is None:
+                    break
+                batch = [line]
+                while len(batch) < STREAM_BATCH_SIZE:
+                    try:
+                        line = await asyncio.wait_for(lines.get(), STREAM_FLUSH_INTERVAL)
+                    except asyncio.TimeoutError:
+                        break
+                    if line is None:
+                        finished = True
+                        break
+                    batch.append(line)
+                
+                results = await score_stream_batch(batch)
+                count_verdicts("/predict_stream", results)
+                yield ''.join(json.dumps(result) + '\n' for result in results)
+            await reader
+        except Exception as e:
+            logger.error(f"Stream prediction failed: {str(e)}")
+            yield json.dumps({"error": f"Stream prediction failed: {str(e)}"}) + '\n'
+        finally:
+            REQUESTS_IN_FLIGHT.labels("/predict_stream").dec()
+            reader.cancel()
+    
+    return DuplexStreamingResponse(verdict_lines(), media_type="application/x-ndjson")
+
 @app.get("/")
 async def root():
     return {
@@ -522,8 +2062,23 @@ async def root():
         ]
     }
 
+@app.get("/health")
+async def health():
+    """Liveness: the process is up and serving, whether or not the models are loaded"""
+    return {"status": "alive"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once the models are loaded and warmed up, 503 until then"""
+    content = {**MODEL_STATE, "model_fingerprint": MODEL_FINGERPRINT}
+    if not MODELS_READY.is_set():
+        return JSONResponse(status_code=503, content=content)
+    return content
+
 @app.get("/model_info")
 async def model_info():
+    if not MODELS_READY.is_set():
+        return model_not_ready_response()
     return {
         "model_type": type(model).__name__,
         "features": [
@@ -537,24 +2092,165 @@ async def model_info():
         "scoring_factors": ["TLD analysis", "Domain structure", "Business subdomains", "Professional patterns", "Phishing patterns"]
     }
 
+@app.get("/cache_stats")
+async def cache_stats():
+    """Hit-rate statistics of the in-process caches"""
+    return {
+        "domain_score_cache": DOMAIN_SCORE_CACHE.stats(),
+        "verdict_cache": {**VERDICT_CACHE.stats(), "model_fingerprint": VERDICT_CACHE.fingerprint}
+    }
+
 @app.post("/check_sender")
-async def check_sender_legitimacy(email: EmailInput):
+@instrumented("/check_sender")
+async def check_sender_legitimacy(email: EmailInput, profile: Optional[str] = None,
+                                  x_profile: Optional[str] = Header(None)):
     """Endpoint to specifically check if an email sender is legitimate"""
-    is_legit, reason = is_legitimate_sender(email.email)
-    domains = extract_domain_from_email(email.email)
-    
+    try:
+        profile_mode = requested_profile(profile, x_profile)
+        if profile_mode is not None:
+            result, request_profile = await INFERENCE_POOL.run(run_profiled, check_sender,
+                                                               email.email, profile_mode)
+            return {**result, "profile": request_profile}
+        return await INFERENCE_POOL.run(check_sender, email.email)
+    except InferenceQueueFull as e:
+        return queue_full_response(e)
+
+# PID of the pre-fork supervisor when running under serve_prefork, else None
+PREFORK_SUPERVISOR_PID = None
+
+def process_memory_kb(pid: int) -> Dict[str, int]:
+    """Resident, proportional and shared memory of a process in kB (Linux /proc only)"""
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/status") as status_file:
+            for line in status_file:
+                if line.startswith("VmRSS:"):
+                    usage["rss_kb"] = int(line.split()[1])
+        with open(f"/proc/{pid}/smaps_rollup") as smaps_file:
+            shared = 0
+            for line in smaps_file:
+                field, _, value = line.partition(":")
+                if field == "Pss":
+                    usage["pss_kb"] = int(value.split()[0])
+                elif field in ("Shared_Clean", "Shared_Dirty"):
+                    shared += int(value.split()[0])
+            usage["shared_kb"] = shared
+    except (OSError, ValueError):
+        pass
+    return usage
+
+def prefork_worker_pids() -> List[int]:
+    """PIDs of all workers forked by the supervisor, or just this process"""
+    if PREFORK_SUPERVISOR_PID is None:
+        return [os.getpid()]
+    try:
+        path = f"/proc/{PREFORK_SUPERVISOR_PID}/task/{PREFORK_SUPERVISOR_PID}/children"
+        with open(path) as children_file:
+            return sorted(int(pid) for pid in children_file.read().split())
+    except OSError:
+        return [os.getpid()]
+
+def serve_prefork(host: str, port: int, workers: int, report_interval: float = 60.0):
+    """Serve the app from several forked workers that share the loaded models.
+
+    The parent loads and warms up the models before forking, so workers start
+    ready and never load them themselves. It then binds the listening socket, freezes the garbage collector
+    so inherited objects are not written to, and forks ``workers`` uvicorn servers
+    that accept on the shared socket. Model pages stay shared copy-on-write. Dead
+    workers are restarted, and per-worker memory is logged every
+    ``report_interval`` seconds.
+    """
+    import signal
+    import socket
+    import uvicorn
+    global PREFORK_SUPERVISOR_PID
+
+    load_models()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    PREFORK_SUPERVISOR_PID = os.getpid()
+    gc.collect()
+    gc.freeze()
+
+    def spawn_worker() -> int:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            server = uvicorn.Server(uvicorn.Config(app, log_level="info"))
+            server.run(sockets=[sock])
+            os._exit(0)
+        return pid
+
+    children = set(spawn_worker() for _ in range(workers))
+    logger.info(f"Pre-fork supervisor {os.getpid()} started workers {sorted(children)}")
+
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    next_report = time.monotonic() + report_interval
+    while not stopping:
+        time.sleep(0.5)
+        for pid in list(children):
+            done_pid, status = os.waitpid(pid, os.WNOHANG)
+            if done_pid and not stopping:
+                children.discard(pid)
+                new_pid = spawn_worker()
+                children.add(new_pid)
+                logger.warning(f"Worker {pid} exited with status {status}; started {new_pid}")
+        if report_interval > 0 and time.monotonic() >= next_report:
+            next_report = time.monotonic() + report_interval
+            for pid in sorted(children):
+                logger.info(f"Worker {pid} memory: {process_memory_kb(pid)}")
+
+    logger.info("Stopping pre-fork workers")
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in children:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    sock.close()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Pipeline metrics of this process in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/workers")
+async def worker_stats():
+    """Memory usage of every server worker, to check that model pages stay shared"""
     return {
-        "is_legitimate": is_legit,
-        "reason": reason,
-        "extracted_domains": domains,
-        "domain_scores": {d: calculate_domain_legitimacy_score(d)[0] for d in domains},
-        "domain_analysis": {d: calculate_domain_legitimacy_score(d)[1] for d in domains}
+        "supervisor_pid": PREFORK_SUPERVISOR_PID,
+        "current_pid": os.getpid(),
+        "workers": {pid: process_memory_kb(pid) for pid in prefork_worker_pids()}
     }
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
     host = "0.0.0.0" if os.environ.get("RENDER") else "127.0.0.1"
+    # Same variable uvicorn and gunicorn use for their worker count
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
     
     print(f"Starting Enhanced Phishing Detection Server on {host}:{port}")
-    uvicorn.run("app:app", host=host, port=port, reload=False)
+    if workers > 1:
+        serve_prefork(host, port, workers,
+                      report_interval=float(os.environ.get("WORKER_MEMORY_REPORT_INTERVAL", 60)))
+    else:
+        uvicorn.run(app, host=host, port=port, reload=False)
@@ -0,0 +1,245 @@
+"""
+Bulk scanner for mail archives.
+
+Streams messages out of mbox files and directories of ``.eml`` files, scores them
+in fixed-size batches with the same pipeline the API serves (``score_emails`` in
+app.py) across worker processes, and writes one JSON result per message as soon as
+its batch is done. Only a bounded number of batches is in flight at any time, so
+memory stays flat however large the archive is.
+
+    python backend/bulk_scan.py archive.mbox maildir/ --out results.ndjson
+"""
+
+import argparse
+import contextlib
+import email
+import email.policy
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import app
+except ImportError:  # imported as backend.bulk_scan
+    from . import app
+
+logger = logging.getLogger(__name__)
+
+# Files treated as single messages; everything else given or found is read as mbox
+EML_SUFFIXES = ('.eml',)
+MBOX_SUFFIXES = ('.mbox', '.mbx')
+
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+HTML_SKIP_RE = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+
+
+def iter_mbox(path: str) -> Iterator[Tuple[str, bytes]]:
+    """Yield ``(source, raw message)`` from an mbox file, reading it line by line"""
+    index = 0
+    lines: List[bytes] = []
+    previous_blank = True
+    with open(path, 'rb') as mbox_file:
+        for line in mbox_file:
+            # A "From " line after a blank line (or at the start) begins the next message
+            if line.startswith(b'From ') and previous_blank:
+                if lines:
+                    yield f"{path}:{index}", b''.join(lines)
+                    index += 1
+                lines = []
+            else:
+                # mboxrd quoting: ">From " and ">>From " lose one level of ">"
+                if line.startswith(b'>') and line.lstrip(b'>').startswith(b'From '):
+                    line = line[1:]
+                lines.append(line)
+            previous_blank = line in (b'\n', b'\r\n')
+    if lines:
+        yield f"{path}:{index}", b''.join(lines)
+
+
+def iter_messages(paths: Iterable[str]) -> Iterator[Tuple[str, bytes]]:
+    """Yield ``(source, raw message)`` for every message under ``paths``
+
+    Directories are walked in sorted order; inside them only ``.eml`` and mbox
+    (``.mbox``/``.mbx``) files are read. Files given explicitly are read as a single
+    message if they end in ``.eml`` and as mbox otherwise.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    if name.lower().endswith(EML_SUFFIXES):
+                        with open(file_path, 'rb') as eml_file:
+                            yield file_path, eml_file.read()
+                    elif name.lower().endswith(MBOX_SUFFIXES):
+                        yield from iter_mbox(file_path)
+        elif path.lower().endswith(EML_SUFFIXES):
+            with open(path, 'rb') as eml_file:
+                yield path, eml_file.read()
+        else:
+            yield from iter_mbox(path)
+
+
+def iter_batches(messages: Iterable, batch_size: int) -> Iterator[List]:
+    batch = []
+    for message in messages:
+        batch.append(message)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def html_to_text(html: str) -> str:
+    return HTML_TAG_RE.sub(' ', HTML_SKIP_RE.sub(' ', html))
+
+
+def message_to_text(raw: bytes) -> Tuple[Dict[str, Optional[str]], str]:
+    """Header fields for the result and the text the model scores
+
+    The text is the sender and subject lines followed by the plain-text body (or
+    the HTML body with tags removed), which is what the browser extension submits
+    for a rendered message.
+    """
+    message = email.message_from_bytes(raw, policy=email.policy.default)
+    headers = {name: str(message[field]) if message[field] is not None else None
+               for name, field in (("message_id", 'Message-ID'), ("from", 'From'),
+                                   ("subject", 'Subject'))}
+
+    body = message.get_body(preferencelist=('plain', 'html'))
+    content = ''
+    if body is not None:
+        try:
+            content = body.get_content()
+        except (LookupError, UnicodeError):
+            # Unknown or wrong charset: decode the payload leniently instead
+            content = (body.get_payload(decode=True) or b'').decode('utf-8', 'replace')
+        if body.get_content_type() == 'text/html':
+            content = html_to_text(content)
+
+    text = f"From: {headers['from'] or ''}\nSubject: {headers['subject'] or ''}\n\n{content}"
+    return headers, text
+
+
+def load_models():
+    # Model loading reports progress with print(); keep stdout clean for NDJSON output
+    with contextlib.redirect_stdout(sys.stderr):
+        app.load_models(warmup_rounds=0)
+
+
+def scan_batch(batch: List[Tuple[str, bytes]]) -> List[Dict]:
+    """Parse and score one batch of raw messages (runs in a worker process)"""
+    load_models()
+
+    results: List[Optional[Dict]] = [None] * len(batch)
+    parsed, texts = [], []
+    for i, (source, raw) in enumerate(batch):
+        try:
+            headers, text = message_to_text(raw)
+        except Exception as e:
+            results[i] = {"source": source, "error": f"Unparseable message: {e}"}
+            continue
+        parsed.append((i, source, headers))
+        texts.append(text)
+
+    if texts:
+        for (i, source, headers), result in zip(parsed, app.score_emails(texts)):
+            results[i] = {"source": source, **headers, **result}
+    return results
+
+
+class ScanProgress:
+    """Counts scanned messages and logs throughput at most every ``interval`` seconds"""
+
+    def __init__(self, interval: float = 10.0):
+        self.interval = interval
+        self.started = time.monotonic()
+        self.last_report = self.started
+        self.scanned = 0
+        self.phishing = 0
+        self.errors = 0
+
+    def update(self, results: List[Dict]):
+        self.scanned += len(results)
+        self.phishing += sum(1 for r in results if r.get("prediction") == "Phishing Email")
+        self.errors += sum(1 for r in results if "error" in r)
+        now = time.monotonic()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            logger.info(self.summary())
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.scanned / elapsed if elapsed > 0 else 0.0
+        return (f"{self.scanned} messages in {elapsed:.1f}s ({rate:.1f} msg/s), "
+                f"{self.phishing} phishing, {self.errors} errors")
+
+
+def scan_archives(paths: List[str], out, workers: int = 1, batch_size: int = 64,
+                  progress_interval: float = 10.0) -> ScanProgress:
+    """Scan every message under ``paths`` and write NDJSON results to ``out`` in input order
+
+    At most ``2 * workers`` batches are queued or running at once.
+    """
+    load_models()
+    progress = ScanProgress(progress_interval)
+    batches = iter_batches(iter_messages(paths), batch_size)
+
+    def write(results: List[Dict]):
+        for result in results:
+            out.write(json.dumps(result, ensure_ascii=False) + '\n')
+        out.flush()
+        progress.update(results)
+
+    if workers <= 1:
+        for batch in batches:
+            write(scan_batch(batch))
+        return progress
+
+    # Workers fork after the models are loaded, so they share the model pages
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(scan_batch, batch))
+            if len(pending) >= 2 * workers:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+    return progress
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Scan mbox files and .eml directories for phishing")
+    parser.add_argument('paths', nargs='+', help="mbox files, .eml files or directories")
+    parser.add_argument('--out', default='-', help="NDJSON output file (default: stdout)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--progress-interval', type=float, default=10.0,
+                        help="seconds between progress reports on stderr")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    # Per-batch logging of the API is noise for a bulk run
+    logging.getLogger(app.__name__).setLevel(logging.WARNING)
+
+    out = sys.stdout if args.out == '-' else open(args.out, 'w', encoding='utf-8')
+    try:
+        progress = scan_archives(args.paths, out, workers=args.workers,
+                                 batch_size=args.batch_size,
+                                 progress_interval=args.progress_interval)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    logger.info(f"Done: {progress.summary()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Suffix trie for classifying the TLD of a domain and finding its registrable domain.
+
+The trie is keyed by domain labels from the right (``uk`` -> ``co`` -> ...). It is
+built once from the bundled offline public suffix list (public_suffixes.dat, in the
+format of https://publicsuffix.org/list/, including ``*`` wildcard and ``!``
+exception rules) and from the TLD sets the legitimacy score classifies by. A
+single walk from the last label to the first returns:
+
+    tld                 the suffix the legitimacy score classifies: the last label, or
+                        the last two when the second-level label is co, com or org
+                        and another label precedes it (".co.uk", ".com.tk")
+    tld_class           the class of that suffix, or None if it is not classified
+    main_label          the label before the last one, or the whole domain if it has a
+                        single label (the name the legitimacy score inspects)
+    public_suffix       the longest public suffix rule matching the domain
+    registrable_domain  the public suffix plus the label before it, or None
+"""
+
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+PUBLIC_SUFFIX_LIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'public_suffixes.dat')
+
+# Second-level labels that make the last two labels one classified suffix
+SECOND_LEVEL_LABELS = ('co', 'com', 'org')
+
+
+class SuffixMatch(NamedTuple):
+    tld: str
+    tld_class: Optional[str]
+    main_label: str
+    public_suffix: str
+    registrable_domain: Optional[str]
+
+
+class _Node:
+    __slots__ = ('children', 'public', 'exception', 'tld_class')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.public = False
+        self.exception = False
+        self.tld_class: Optional[str] = None
+
+    def child(self, label: str) -> '_Node':
+        node = self.children.get(label)
+        if node is None:
+            node = self.children[label] = _Node()
+        return node
+
+
+def read_suffix_list(path: str = PUBLIC_SUFFIX_LIST_PATH) -> List[str]:
+    """The rules of a public suffix list file, lowercased, without comments and blank lines"""
+    rules = []
+    with open(path, encoding='utf-8') as suffix_file:
+        for line in suffix_file:
+            rule = line.split(None, 1)[0] if line.strip() else ''
+            if rule and not rule.startswith('//'):
+                rules.append(rule.lower())
+    return rules
+
+
+class SuffixTrie:
+    """Public suffix rules and classified TLDs, looked up in one reverse walk over the labels"""
+
+    def __init__(self, rules: Iterable[str], tld_classes: Iterable[Tuple[str, Iterable[str]]]):
+        """``tld_classes`` are ``(class, suffixes)`` pairs such as ``('suspicious', {'.tk'})``;
+        a suffix listed under several classes gets the first one"""
+        self.root = _Node()
+        for rule in rules:
+            exception = rule.startswith('!')
+            node = self.root
+            for label in reversed(rule.lstrip('!').split('.')):
+                node = node.child(label)
+            if exception:
+                node.exception = True
+            else:
+                node.public = True
+
+        classified = set()
+        for tld_class, suffixes in tld_classes:
+            for suffix in suffixes:
+                suffix = suffix.lower().lstrip('.')
+                if suffix in classified:
+                    continue
+                classified.add(suffix)
+                node = self.root
+                for label in reversed(suffix.split('.')):
+                    node = node.child(label)
+                node.tld_class = tld_class
+
+    @classmethod
+    def from_suffix_list(cls, tld_classes: Iterable[Tuple[str, Iterable[str]]],
+                         path: str = PUBLIC_SUFFIX_LIST_PATH) -> 'SuffixTrie':
+        return cls(read_suffix_list(path), tld_classes)
+
+    def lookup(self, domain: str) -> SuffixMatch:
+        """Classified TLD, main label, public suffix and registrable domain of a lowercase ``domain``"""
+        node = self.root
+        end = len(domain)
+        depth = 0
+        tld = tld_class = None
+        main_label = domain
+        suffix_start = exception_start = None
+        # Past the TLD (and the second-level label, for the classified suffix) only
+        # labels that continue a path of the trie matter
+        while node is not None or depth < 2:
+            dot = domain.rfind('.', 0, end)
+            start = dot + 1
+            label = domain[start:end]
+            depth += 1
+            child = wildcard = None
+            if node is not None:
+                child = node.children.get(label)
+                wildcard = node.children.get('*')
+            if depth == 1:
+                tld = '.' + label
+                tld_class = child.tld_class if child is not None else None
+                suffix_start = start  # the implicit "*" rule
+            elif depth == 2:
+                main_label = label
+                if dot >= 0 and label in SECOND_LEVEL_LABELS:
+                    tld = '.' + domain[start:]
+                    tld_class = child.tld_class if child is not None else None
+            if child is not None and child.exception:
+                exception_start = end + 1  # the rule minus its leftmost label
+            elif (child is not None and child.public) or (wildcard is not None and wildcard.public):
+                suffix_start = start
+            if dot < 0:
+                break
+            node = child if child is not None else wildcard
+            end = dot
+        if exception_start is not None:
+            suffix_start = exception_start
+        registrable_domain = None
+        if suffix_start > 0:
+            registrable_domain = domain[domain.rfind('.', 0, suffix_start - 1) + 1:]
+        return SuffixMatch(tld, tld_class, main_label, domain[suffix_start:], registrable_domain)
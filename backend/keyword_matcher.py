@@ -0,0 +1,111 @@
+"""
+Dictionary matching of many keywords against a text, built once per dictionary.
+
+KeywordMatcher answers the two questions the scoring code asks of its term lists
+without a regex or an ``in`` scan per term:
+
+    words_in(text)     the terms occurring as whole words, as ``\\bterm\\b`` would find
+                       them; the text is split into words once and the words are
+                       looked up by hash
+    first_index(text)  the earliest listed term occurring anywhere in the text, as a
+                       loop of ``term in text`` over the list would find it; an
+                       Aho-Corasick automaton reads the text once, one transition
+                       per character
+
+The work per text depends on the text, not on the number of terms, so the
+dictionaries can grow to thousands of entries.
+"""
+
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+_WORD_RE = re.compile(r'\w+')
+
+
+class KeywordMatcher:
+    """Whole-word and substring lookups of a fixed list of terms"""
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms: List[str] = list(dict.fromkeys(terms))
+
+        # A term that is one word is found in the set of words of the text. Any other
+        # term is only searched for when each of its words is a word of the text: a
+        # \b-bounded occurrence never starts or ends inside a word of the text. Such
+        # phrases are indexed by their first word, so only the phrases starting with
+        # a word of the text are looked at; phrases without words are always searched.
+        self.word_terms: Dict[str, int] = {}
+        self.phrase_terms: Dict[str, List[Tuple[int, Tuple[str, ...], re.Pattern]]] = {}
+        self.wordless_terms: List[Tuple[int, re.Pattern]] = []
+        for rank, term in enumerate(self.terms):
+            words = _WORD_RE.findall(term)
+            pattern = re.compile(r'\b' + re.escape(term) + r'\b')
+            if len(words) == 1 and words[0] == term:
+                self.word_terms[term] = rank
+            elif words:
+                self.phrase_terms.setdefault(words[0], []).append((rank, tuple(words[1:]), pattern))
+            else:
+                self.wordless_terms.append((rank, pattern))
+        self._phrase_first_words = frozenset(self.phrase_terms)
+
+        self._build_automaton()
+
+    def _build_automaton(self):
+        """Aho-Corasick automaton over the characters of the terms
+
+        ``transitions[state]`` maps a character to the next state, omitting the
+        characters that lead back to the root; ``first[state]`` is the lowest rank of
+        the terms that end at ``state``, itself or through its failure links.
+        """
+        missing = len(self.terms)
+        goto: List[Dict[str, int]] = [{}]
+        first = [missing]
+        for rank, term in enumerate(self.terms):
+            state = 0
+            for char in term:
+                if char not in goto[state]:
+                    goto[state][char] = len(goto)
+                    goto.append({})
+                    first.append(missing)
+                state = goto[state][char]
+            first[state] = min(first[state], rank)
+
+        # Breadth first, so a state's failure target is complete before the state
+        fail = [0] * len(goto)
+        transitions: List[Dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            first[state] = min(first[state], first[fail[state]])
+            fallback = transitions[fail[state]]
+            for char, child in goto[state].items():
+                fail[child] = fallback.get(char, 0)
+                queue.append(child)
+            transitions[state] = {**fallback, **goto[state]}
+
+        self.transitions = transitions
+        self.first = first
+
+    def words_in(self, text: str) -> List[str]:
+        """Terms found in ``text`` as whole words, in list order"""
+        words = set(_WORD_RE.findall(text))
+        ranks = [self.word_terms[word] for word in words if word in self.word_terms]
+        for first_word in words & self._phrase_first_words:
+            for rank, other_words, pattern in self.phrase_terms[first_word]:
+                if all(word in words for word in other_words) and pattern.search(text):
+                    ranks.append(rank)
+        for rank, pattern in self.wordless_terms:
+            if pattern.search(text):
+                ranks.append(rank)
+        return [self.terms[rank] for rank in sorted(ranks)]
+
+    def first_index(self, text: str) -> int:
+        """Index of the earliest listed term contained in ``text``, or -1"""
+        transitions, first = self.transitions, self.first
+        best = first[0]  # the empty term is contained in every text
+        state = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            if first[state] < best:
+                best = first[state]
+        return best if best < len(self.terms) else -1
@@ -0,0 +1,256 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Counters, gauges and histograms are plain Python objects: recording a value is a
+dictionary lookup, a lock and an addition, and nothing is formatted until
+``render()`` is called by a scrape. Metrics are per process; every pre-fork worker
+exposes its own.
+
+Work that runs in another process (the process inference pool) can record into a
+capture buffer with ``capture()`` and have its observations replayed in the server
+process with ``replay()``.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; spans sub-millisecond regex passes up to multi-second batches
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY: Dict[str, 'Metric'] = {}
+
+_capture = threading.local()
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        if name in REGISTRY:
+            raise ValueError(f"Duplicate metric: {name}")
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        REGISTRY[name] = self
+
+    def labels(self, *labelvalues):
+        key = tuple(str(value) for value in labelvalues)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child(key))
+        return child
+
+    def _new_child(self, labelvalues: Tuple[str, ...]):
+        raise NotImplementedError
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class _CounterChild:
+    def __init__(self, metric: 'Counter', labelvalues: Tuple[str, ...]):
+        self._metric = metric
+        self._labelvalues = labelvalues
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        captured = getattr(_capture, 'samples', None)
+        if captured is not None:
+            captured.append((self._metric.name, self._labelvalues, amount))
+            return
+        with self._lock:
+            self.value += amount
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def _new_child(self, labelvalues):
+        return _CounterChild(self, labelvalues)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def samples(self):
+        return [f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+                for key, child in sorted(self._children.items())]
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from ``function`` at scrape time"""
+        self._function = function
+
+    @contextmanager
+    def track_inprogress(self):
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    @property
+    def value(self) -> float:
+        return self._function() if self._function is not None else self._value
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def _new_child(self, labelvalues):
+        return _GaugeChild()
+
+    def set_function(self, function: Callable[[], float]):
+        self.labels().set_function(function)
+
+    def samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+                for key, child in sorted(self._children.items())]
+
+
+class _HistogramChild:
+    def __init__(self, metric: 'Histogram', labelvalues: Tuple[str, ...]):
+        self._metric = metric
+        self._labelvalues = labelvalues
+        self._lock = threading.Lock()
+        # Per-bucket (not cumulative) counts; the last one is the +Inf bucket
+        self.bucket_counts = [0] * (len(metric.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        captured = getattr(_capture, 'samples', None)
+        if captured is not None:
+            captured.append((self._metric.name, self._labelvalues, value))
+            return
+        index = bisect_left(self._metric.buckets, value)
+        with self._lock:
+            self.bucket_counts[index] += 1
+            self.sum += value
+
+    def time(self) -> '_Timer':
+        return _Timer(self)
+
+
+class _Timer:
+    """Context manager observing its own duration; a class is cheaper than @contextmanager"""
+
+    __slots__ = ('_histogram', '_started')
+
+    def __init__(self, histogram: _HistogramChild):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._started)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self, labelvalues):
+        return _HistogramChild(self, labelvalues)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def samples(self):
+        lines = []
+        for key, child in sorted(self._children.items()):
+            with child._lock:
+                bucket_counts = list(child.bucket_counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), bucket_counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+@contextmanager
+def capture():
+    """Collect counter increments and histogram observations of this thread instead of recording them
+
+    Yields the list of ``(metric name, label values, value)`` samples, for ``replay``
+    in another process or to be discarded.
+    """
+    previous = getattr(_capture, 'samples', None)
+    _capture.samples = []
+    try:
+        yield _capture.samples
+    finally:
+        _capture.samples = previous
+
+
+def replay(samples: List[Tuple[str, Tuple[str, ...], float]]):
+    for name, labelvalues, value in samples:
+        child = REGISTRY[name].labels(*labelvalues)
+        if isinstance(child, _HistogramChild):
+            child.observe(value)
+        else:
+            child.inc(value)
+
+
+def run_captured(fn, *args):
+    """Call ``fn`` and return ``(result, captured samples)``; used in worker processes"""
+    with capture() as samples:
+        return fn(*args), samples
+
+
+def render() -> str:
+    return '\n'.join(metric.render() for metric in REGISTRY.values()) + '\n'
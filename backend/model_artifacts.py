@@ -0,0 +1,511 @@
+"""
+Memory-mappable export format for the served model and TF-IDF vectorizer.
+
+An artifact directory holds the gradient-boosted trees as flat node arrays and the
+IDF weights as raw ``.npy`` files that are opened with ``mmap_mode='r'``, the
+vocabulary as one newline-separated UTF-8 file ordered by column, and a
+``manifest.json`` with the format version, model parameters and a SHA-256 checksum
+of every file. Loading needs neither pickle nor scikit-learn, so workers start
+quickly and share the array pages through the OS page cache.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix, issparse
+from scipy.special import logit
+from scipy.stats import gmean
+
+# Version 2 added the optional term_columns.npy of vocabulary-pruned exports
+FORMAT_VERSION = 2
+SUPPORTED_FORMAT_VERSIONS = (1, 2)
+MANIFEST_NAME = 'manifest.json'
+VOCABULARY_NAME = 'vocabulary.txt'
+TERM_COLUMNS_NAME = 'term_columns.npy'
+
+# Flat per-node arrays of the ensemble, in the order trees are evaluated
+ENSEMBLE_ARRAYS = ('node_column', 'threshold', 'left', 'right', 'value',
+                   'tree_roots', 'tree_depth', 'tree_class', 'used_features', 'init_raw')
+
+
+class ArrayEnsemble:
+    """Gradient-boosted tree ensemble evaluated from flat node arrays.
+
+    Trees are stored back to back: node ``i`` splits on input column
+    ``used_features[node_column[i]]`` at ``threshold[i]`` and continues at ``left[i]``
+    or ``right[i]``. Leaves point to themselves, so all trees are walked together,
+    one level per step, for the depth of the deepest tree. A single row costs a
+    handful of NumPy calls instead of one Python-level dispatch per tree. Decisions
+    and probabilities match scikit-learn's GradientBoostingClassifier exactly.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], learning_rate: float,
+                 classes: List, n_features: int):
+        for name in ENSEMBLE_ARRAYS:
+            # Plain ndarray views index much faster than np.memmap objects
+            setattr(self, name, np.asarray(arrays[name]))
+        self.max_depth = int(self.tree_depth.max()) if len(self.tree_depth) else 0
+        self.learning_rate = learning_rate
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = n_features
+        self.n_trees_per_iteration_ = len(self.init_raw)
+
+        # Derived lookup tables: children[2 * i + (x <= threshold[i])] is the next node,
+        # and column_position maps an input column to its used_features index (or -1)
+        self._children = np.empty(2 * len(self.left), dtype=np.intp)
+        self._children[0::2] = self.right
+        self._children[1::2] = self.left
+        self._node_column = self.node_column.astype(np.intp)
+        self._tree_roots = self.tree_roots.astype(np.intp)
+        self._column_position = np.full(n_features, -1, dtype=np.intp)
+        self._column_position[self.used_features] = np.arange(len(self.used_features))
+
+    @classmethod
+    def from_model(cls, model) -> 'ArrayEnsemble':
+        """Flatten a fitted GradientBoostingClassifier in memory"""
+        return cls(flatten_ensemble(model), float(model.learning_rate),
+                   model.classes_.tolist(), int(model.n_features_in_))
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in ENSEMBLE_ARRAYS}
+
+    def _used_columns(self, X) -> np.ndarray:
+        """Dense float32 matrix of only the columns the trees split on"""
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the model expects {self.n_features_in_}")
+        # scikit-learn compares float32 inputs against float64 thresholds
+        if not issparse(X):
+            return np.asarray(X)[:, self.used_features].astype(np.float32)
+
+        # Scatter the stored entries of the used columns straight out of the CSR arrays
+        X = X.tocsr()
+        if not X.has_canonical_format:
+            X = X.copy()
+            X.sum_duplicates()
+        n_samples = X.shape[0]
+        X_used = np.zeros((n_samples, len(self.used_features)), dtype=np.float32)
+        position = self._column_position[X.indices]
+        keep = position >= 0
+        rows = np.repeat(np.arange(n_samples), np.diff(X.indptr))
+        X_used[rows[keep], position[keep]] = X.data[keep]
+        return X_used
+
+    def decision_function(self, X) -> np.ndarray:
+        X_used = self._used_columns(X)
+        n_samples, n_used = X_used.shape
+        flat_X = X_used.ravel()
+        row_offsets = (np.arange(n_samples, dtype=np.intp) * n_used)[:, None]
+
+        # node[i, t] is the current node of sample i in tree t
+        node = np.tile(self._tree_roots, (n_samples, 1))
+        for _ in range(self.max_depth):
+            go_left = flat_X[row_offsets + self._node_column[node]] <= self.threshold[node]
+            node = self._children[2 * node + go_left]
+        leaf_values = self.value[node]
+
+        raw = np.empty((n_samples, self.n_trees_per_iteration_))
+        for k, init in enumerate(self.init_raw):
+            stages = leaf_values if self.n_trees_per_iteration_ == 1 else leaf_values[:, self.tree_class == k]
+            # Add stages one after another, in the order scikit-learn accumulates them
+            terms = np.empty((n_samples, stages.shape[1] + 1))
+            terms[:, 0] = init
+            np.multiply(stages, self.learning_rate, out=terms[:, 1:])
+            raw[:, k] = np.cumsum(terms, axis=1)[:, -1]
+        return raw.ravel() if raw.shape[1] == 1 else raw
+
+    def proba_from_decision(self, raw: np.ndarray) -> np.ndarray:
+        if raw.ndim == 1:
+            from scipy.special import expit
+            proba = np.empty((raw.shape[0], 2), dtype=raw.dtype)
+            proba[:, 1] = expit(raw)
+            proba[:, 0] = 1 - proba[:, 1]
+            return proba
+        proba = raw - np.max(raw, axis=1).reshape((-1, 1))
+        np.exp(proba, proba)
+        proba /= np.sum(proba, axis=1).reshape((-1, 1))
+        return proba
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.proba_from_decision(self.decision_function(X))
+
+    def predict(self, X) -> np.ndarray:
+        raw = self.decision_function(X)
+        encoded_classes = (raw >= 0).astype(int) if raw.ndim == 1 else np.argmax(raw, axis=1)
+        return self.classes_[encoded_classes]
+
+
+class ArrayTfidfVectorizer:
+    """TF-IDF transform over a fixed vocabulary, equivalent to a fitted TfidfVectorizer.
+
+    Supports the word analyzer with unigrams, which is what train_model.py fits.
+    With ``term_columns`` (see prune_vocabulary) term ``i`` is written to output
+    column ``term_columns[i]``, and terms mapped to -1 only count towards the row
+    norm, so the remaining columns keep exactly the values of the full transform.
+    """
+
+    # Rows with at most this many distinct terms are normalized together in one padded matrix
+    NORM_BLOCK_WIDTH = 64
+
+    def __init__(self, terms: List[str], idf: np.ndarray, lowercase: bool = True,
+                 token_pattern: str = r'(?u)\b\w\w+\b', binary: bool = False,
+                 sublinear_tf: bool = False, norm: Optional[str] = 'l2',
+                 term_columns: Optional[np.ndarray] = None):
+        self._term_index = {term: i for i, term in enumerate(terms)}
+        self.idf_ = idf
+        self.lowercase = lowercase
+        self.token_pattern = token_pattern
+        self.binary = binary
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+        self._token_re = re.compile(token_pattern)
+        if term_columns is None:
+            self.term_columns = None
+            self.n_columns = len(terms)
+        else:
+            self.term_columns = np.asarray(term_columns)
+            self.n_columns = int(np.count_nonzero(self.term_columns >= 0))
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer) -> 'ArrayTfidfVectorizer':
+        """Copy the vocabulary and IDF weights of a fitted TfidfVectorizer"""
+        params = _vectorizer_params(vectorizer)
+        terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+        return cls(terms, np.asarray(vectorizer.idf_, dtype=np.float64), **params)
+
+    @property
+    def terms(self) -> List[str]:
+        return list(self._term_index)
+
+    @property
+    def vocabulary_(self) -> Dict[str, int]:
+        """Term to output column, for the terms that have one"""
+        if self.term_columns is None:
+            return dict(self._term_index)
+        return {term: int(self.term_columns[i]) for term, i in self._term_index.items()
+                if self.term_columns[i] >= 0}
+
+    def _counts(self, raw_documents: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Row, term index and count of every distinct known term, sorted by row then term"""
+        term_ids, row_lengths = [], []
+        lookup = self._term_index.get
+        for doc in raw_documents:
+            if self.lowercase:
+                doc = doc.lower()
+            tokens = self._token_re.findall(doc)
+            term_ids.extend(map(lookup, tokens, repeat(-1, len(tokens))))
+            row_lengths.append(len(tokens))
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        rows = np.repeat(np.arange(len(row_lengths), dtype=np.int64), row_lengths)
+        known = term_ids >= 0
+        # One sort over (row, term) keys counts every document at once
+        keys, counts = np.unique(rows[known] * len(self._term_index) + term_ids[known],
+                                 return_counts=True)
+        rows, term_ids = np.divmod(keys, len(self._term_index))
+        return rows, term_ids, counts
+
+    def _row_norms(self, data: np.ndarray, rows: np.ndarray, indptr: np.ndarray) -> np.ndarray:
+        """Norm of every row, summed sequentially in column order like scikit-learn's normalizer"""
+        values = data * data if self.norm == 'l2' else np.abs(data)
+        lengths = np.diff(indptr)
+        sums = np.zeros(len(lengths))
+
+        # Short rows: pad with zeros into one matrix and accumulate along each row;
+        # adding the trailing zeros leaves each running sum unchanged
+        short = lengths <= self.NORM_BLOCK_WIDTH
+        in_short_row = short[rows]
+        if in_short_row.any():
+            short_rows = rows[in_short_row]
+            positions = np.arange(len(rows))[in_short_row] - indptr[short_rows]
+            padded = np.zeros((len(lengths), int(lengths[short].max())))
+            padded[short_rows, positions] = values[in_short_row]
+            sums[short] = np.cumsum(padded[short], axis=1)[:, -1]
+        for row in np.flatnonzero(~short):
+            sums[row] = np.cumsum(values[indptr[row]:indptr[row + 1]])[-1]
+
+        norms = np.sqrt(sums) if self.norm == 'l2' else sums
+        norms[norms == 0.0] = 1.0
+        return norms
+
+    def transform(self, raw_documents: List[str]) -> csr_matrix:
+        if isinstance(raw_documents, str):
+            raise ValueError("Iterable over raw text documents expected, string object received.")
+        n_samples = len(raw_documents)
+        rows, term_ids, counts = self._counts(raw_documents)
+        data = counts.astype(np.float64)
+
+        if self.binary:
+            data.fill(1)
+        if self.sublinear_tf:
+            np.log(data, data)
+            data += 1.0
+        data *= self.idf_[term_ids]
+
+        indptr = np.zeros(n_samples + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_samples), out=indptr[1:])
+        if self.norm is not None and len(data):
+            data /= self._row_norms(data, rows, indptr)[rows]
+
+        if self.term_columns is not None:
+            columns = self.term_columns[term_ids]
+            kept = columns >= 0
+            rows, term_ids, data = rows[kept], columns[kept], data[kept]
+            indptr = np.zeros(n_samples + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows, minlength=n_samples), out=indptr[1:])
+
+        return csr_matrix((data, term_ids.astype(np.int32), indptr.astype(np.int32)),
+                          shape=(n_samples, self.n_columns))
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as artifact_file:
+        for chunk in iter(lambda: artifact_file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _init_raw_predictions(model, n_features: int) -> np.ndarray:
+    """Raw prediction of ``model`` before its first stage, one value per tree of a stage
+
+    ``_raw_predict_init`` is private to scikit-learn; without it the same values are
+    derived from the public ``init_`` estimator, as the log loss link defines them.
+    """
+    X = np.zeros((1, n_features), dtype=np.float32)
+    if hasattr(model, '_raw_predict_init'):
+        return model._raw_predict_init(X)[0]
+    n_trees_per_iteration = len(model.estimators_[0])
+    if isinstance(model.init_, str):  # 'zero'
+        return np.zeros(n_trees_per_iteration)
+    eps = np.finfo(np.float32).eps
+    proba = np.clip(model.init_.predict_proba(X), eps, 1 - eps, dtype=np.float64)
+    if n_trees_per_iteration == 1:
+        return logit(proba[:, 1])
+    return np.log(proba / gmean(proba, axis=1)[:, np.newaxis])[0]
+
+
+def flatten_ensemble(model) -> Dict[str, np.ndarray]:
+    """Flatten a fitted GradientBoostingClassifier into the ArrayEnsemble node arrays"""
+    if getattr(model, 'loss', None) != 'log_loss' or not hasattr(model, 'estimators_'):
+        raise ValueError(f"Unsupported model for array export: {type(model).__name__}")
+
+    n_features = model.n_features_in_
+    trees, tree_class = [], []
+    for stage in model.estimators_:
+        for k, estimator in enumerate(stage):
+            trees.append(estimator.tree_)
+            tree_class.append(k)
+
+    used_features = np.unique(np.concatenate([tree.feature[tree.feature >= 0] for tree in trees]))
+    left, right, node_column, threshold, value = [], [], [], [], []
+    tree_roots, tree_depth = [], []
+    offset = 0
+    for tree in trees:
+        own_index = np.arange(tree.node_count) + offset
+        is_leaf = tree.children_left == -1
+        left.append(np.where(is_leaf, own_index, tree.children_left + offset))
+        right.append(np.where(is_leaf, own_index, tree.children_right + offset))
+        node_column.append(np.where(is_leaf, 0, np.searchsorted(used_features, tree.feature)))
+        threshold.append(tree.threshold)
+        value.append(tree.value[:, 0, 0])
+        tree_roots.append(offset)
+        tree_depth.append(tree.max_depth)
+        offset += tree.node_count
+
+    init_raw = _init_raw_predictions(model, n_features)
+    return {
+        'node_column': np.concatenate(node_column).astype(np.int32),
+        'threshold': np.concatenate(threshold).astype(np.float64),
+        'left': np.concatenate(left).astype(np.int32),
+        'right': np.concatenate(right).astype(np.int32),
+        'value': np.concatenate(value).astype(np.float64),
+        'tree_roots': np.asarray(tree_roots, dtype=np.int32),
+        'tree_depth': np.asarray(tree_depth, dtype=np.int32),
+        'tree_class': np.asarray(tree_class, dtype=np.int32),
+        'used_features': used_features.astype(np.int32),
+        'init_raw': np.asarray(init_raw, dtype=np.float64),
+    }
+
+
+def _vectorizer_params(vectorizer) -> Dict:
+    """Transform settings of a fitted TfidfVectorizer that ArrayTfidfVectorizer supports"""
+    params = vectorizer.get_params()
+    unsupported = []
+    if params['analyzer'] != 'word' or tuple(params['ngram_range']) != (1, 1):
+        unsupported.append('only the word analyzer with unigrams is supported')
+    if params['tokenizer'] is not None or params['preprocessor'] is not None:
+        unsupported.append('custom tokenizers and preprocessors are not supported')
+    if params['strip_accents'] is not None or params['input'] != 'content':
+        unsupported.append('strip_accents and non-content input are not supported')
+    if not params['use_idf'] or params['norm'] not in ('l1', 'l2', None):
+        unsupported.append('idf weighting with l1/l2/no norm is required')
+    if np.dtype(params['dtype']) != np.float64:
+        unsupported.append('only float64 output is supported')
+    # Stop words are dropped before counting; that is a no-op only if none made it into the vocabulary
+    stop_words = vectorizer.get_stop_words() or ()
+    if any(word in vectorizer.vocabulary_ for word in stop_words):
+        unsupported.append('the vocabulary contains stop words')
+    if unsupported:
+        raise ValueError(f"Unsupported vectorizer for array export: {'; '.join(unsupported)}")
+
+    return {
+        'lowercase': params['lowercase'],
+        'token_pattern': params['token_pattern'],
+        'binary': params['binary'],
+        'sublinear_tf': params['sublinear_tf'],
+        'norm': params['norm'],
+    }
+
+
+def prune_vocabulary(model: ArrayEnsemble, vectorizer: ArrayTfidfVectorizer
+                     ) -> Tuple[ArrayEnsemble, ArrayTfidfVectorizer]:
+    """Drop the TF-IDF output columns that no tree splits on
+
+    The model input is the vectorizer output followed by extra dense features. The
+    returned vectorizer still counts every term towards the row norm but only emits
+    the used columns, and the returned model reads its inputs from the narrower
+    matrix; predictions are identical.
+    """
+    n_text_columns = vectorizer.n_columns
+    n_extra_features = model.n_features_in_ - n_text_columns
+    text_features = model.used_features[model.used_features < n_text_columns]
+
+    # Kept columns stay in their original order, so rows remain sorted by column
+    new_column = np.full(n_text_columns, -1, dtype=np.int64)
+    new_column[text_features] = np.arange(len(text_features))
+    old_columns = (vectorizer.term_columns if vectorizer.term_columns is not None
+                   else np.arange(n_text_columns))
+    term_columns = np.where(old_columns >= 0, new_column[old_columns], -1).astype(np.int32)
+
+    used_features = model.used_features - n_text_columns + len(text_features)
+    is_text = model.used_features < n_text_columns
+    used_features[is_text] = new_column[model.used_features[is_text]]
+    arrays = model.to_arrays()
+    arrays['used_features'] = used_features.astype(np.int32)
+    pruned_model = ArrayEnsemble(arrays, model.learning_rate, model.classes_.tolist(),
+                                 len(text_features) + n_extra_features)
+    pruned_vectorizer = ArrayTfidfVectorizer(
+        vectorizer.terms, vectorizer.idf_, lowercase=vectorizer.lowercase,
+        token_pattern=vectorizer.token_pattern, binary=vectorizer.binary,
+        sublinear_tf=vectorizer.sublinear_tf, norm=vectorizer.norm, term_columns=term_columns,
+    )
+    return pruned_model, pruned_vectorizer
+
+
+def export_model_artifacts(model, vectorizer, out_dir: str, prune: bool = True) -> Dict:
+    """Write ``model`` and ``vectorizer`` to ``out_dir`` in the memory-mappable format
+
+    With ``prune`` the vocabulary is restricted to the columns the trees use (see
+    prune_vocabulary). The directory is written next to ``out_dir`` and swapped in
+    when complete, so a reader never sees a half-written export. Returns the manifest.
+    """
+    ensemble = ArrayEnsemble.from_model(model)
+    array_vectorizer = ArrayTfidfVectorizer.from_vectorizer(vectorizer)
+    if prune:
+        ensemble, array_vectorizer = prune_vocabulary(ensemble, array_vectorizer)
+    arrays = ensemble.to_arrays()
+    vectorizer_params = _vectorizer_params(vectorizer)
+    terms = array_vectorizer.terms
+    if any('\n' in term for term in terms):
+        raise ValueError("Vocabulary terms must not contain newlines")
+
+    tmp_dir = f"{out_dir.rstrip(os.sep)}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    arrays['idf'] = array_vectorizer.idf_
+    if array_vectorizer.term_columns is not None:
+        arrays['term_columns'] = array_vectorizer.term_columns
+    files = {}
+    for name, array in arrays.items():
+        file_name = f"{name}.npy"
+        np.save(os.path.join(tmp_dir, file_name), np.ascontiguousarray(array))
+        files[file_name] = _file_sha256(os.path.join(tmp_dir, file_name))
+    with open(os.path.join(tmp_dir, VOCABULARY_NAME), 'w', encoding='utf-8', newline='\n') as vocab_file:
+        vocab_file.write('\n'.join(terms))
+    files[VOCABULARY_NAME] = _file_sha256(os.path.join(tmp_dir, VOCABULARY_NAME))
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'model_type': type(model).__name__,
+        'learning_rate': float(model.learning_rate),
+        'classes': model.classes_.tolist(),
+        'n_features': int(ensemble.n_features_in_),
+        'n_trees': int(len(arrays['tree_roots'])),
+        'vocabulary_size': len(terms),
+        'output_terms': array_vectorizer.n_columns,
+        'vectorizer': vectorizer_params,
+        'files': files,
+        'checksum': hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest(),
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return manifest
+
+
+def has_model_artifacts(artifact_dir: str) -> bool:
+    return os.path.isfile(os.path.join(artifact_dir, MANIFEST_NAME))
+
+
+def load_model_artifacts(artifact_dir: str, verify: bool = True
+                         ) -> Tuple[ArrayEnsemble, ArrayTfidfVectorizer, Dict]:
+    """Open an exported artifact directory with its arrays memory-mapped
+
+    With ``verify`` every file is checked against the manifest checksums first.
+    Raises ValueError for unknown format versions and corrupted files.
+    """
+    with open(os.path.join(artifact_dir, MANIFEST_NAME)) as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest.get('format_version') not in SUPPORTED_FORMAT_VERSIONS:
+        raise ValueError(f"Unsupported artifact format version: {manifest.get('format_version')}")
+
+    if verify:
+        for file_name, expected in manifest['files'].items():
+            if _file_sha256(os.path.join(artifact_dir, file_name)) != expected:
+                raise ValueError(f"Checksum mismatch for {file_name} in {artifact_dir}")
+
+    arrays = {
+        name: np.load(os.path.join(artifact_dir, f"{name}.npy"), mmap_mode='r')
+        for name in ENSEMBLE_ARRAYS + ('idf',)
+    }
+    model = ArrayEnsemble(arrays, manifest['learning_rate'], manifest['classes'], manifest['n_features'])
+
+    with open(os.path.join(artifact_dir, VOCABULARY_NAME), encoding='utf-8', newline='\n') as vocab_file:
+        terms = vocab_file.read().split('\n')
+    term_columns = None
+    if TERM_COLUMNS_NAME in manifest['files']:
+        term_columns = np.load(os.path.join(artifact_dir, TERM_COLUMNS_NAME), mmap_mode='r')
+    vectorizer = ArrayTfidfVectorizer(terms, arrays['idf'], term_columns=term_columns,
+                                      **manifest['vectorizer'])
+    return model, vectorizer, manifest
+
+
+if __name__ == '__main__':
+    import argparse
+    import pickle
+
+    parser = argparse.ArgumentParser(description="Export pickled models to the memory-mappable artifact format")
+    parser.add_argument('--model', default='backend/model.pkl')
+    parser.add_argument('--vectorizer', default='backend/vectorizer.pkl')
+    parser.add_argument('--out', default='backend/model_artifacts')
+    parser.add_argument('--no-prune', action='store_true',
+                        help="keep TF-IDF columns that no tree splits on")
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as model_file:
+        model = pickle.load(model_file)
+    with open(args.vectorizer, 'rb') as vectorizer_file:
+        vectorizer = pickle.load(vectorizer_file)
+
+    manifest = export_model_artifacts(model, vectorizer, args.out, prune=not args.no_prune)
+    print(f"Exported {manifest['n_trees']} trees and {manifest['vocabulary_size']} terms "
+          f"({manifest['output_terms']} used by the model) to {args.out}")
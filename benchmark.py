@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmarks for the scoring pipeline
+
+Micro-benchmarks time the pipeline stages one call at a time, and the end-to-end
+benchmark posts to /predict through an in-process ASGI client. Every benchmark
+runs over corpora generated by create_dataset.generate_comprehensive_dataset with
+a fixed seed, at each of the requested sizes. Results are written as JSON, with
+throughput and p50/p95/p99 latency per benchmark and corpus size, so two builds
+can be compared with --compare.
+
+    python benchmark.py --sizes 100 1000 --out bench.json
+    python benchmark.py --compare bench.json
+
+The domain score and verdict caches are disabled while timing unless --warm-caches
+is given, so the numbers measure the computation rather than cache hits.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.append(BACKEND_DIR)
+
+import app
+from create_dataset import generate_comprehensive_dataset
+
+BENCHMARKS = ('extract_domain_from_email', 'calculate_domain_legitimacy_score', 'score_domains',
+              'extract_enhanced_email_features', 'process_email_enhanced', 'predict_endpoint')
+
+
+def build_corpus(size: int, seed: int) -> List[str]:
+    """``size`` generated emails, identical for the same size and seed"""
+    random.seed(seed)
+    np.random.seed(seed)
+    cwd = os.getcwd()
+    # The generator writes data/emails.csv and prints samples; keep both out of the way
+    with tempfile.TemporaryDirectory() as scratch, contextlib.redirect_stdout(io.StringIO()):
+        os.chdir(scratch)
+        try:
+            df = generate_comprehensive_dataset(num_samples=size)
+        finally:
+            os.chdir(cwd)
+    return df['Email Text'].tolist()
+
+
+def latency_summary(latencies: List[float], items: int) -> Dict[str, float]:
+    """Throughput in items per second and per-call latency percentiles in milliseconds"""
+    latencies_ms = np.asarray(latencies) * 1000
+    total = float(np.sum(latencies))
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "calls": len(latencies),
+        "items": items,
+        "total_seconds": round(total, 6),
+        "throughput_per_second": round(items / total, 2) if total > 0 else None,
+        "mean_ms": round(float(np.mean(latencies_ms)), 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "max_ms": round(float(np.max(latencies_ms)), 4),
+    }
+
+
+def time_calls(fn: Callable, inputs: Iterable, repeat: int) -> List[float]:
+    """Per-call wall times of ``fn`` over ``inputs``, ``repeat`` times over"""
+    latencies = []
+    for _ in range(repeat):
+        for value in inputs:
+            started = time.perf_counter()
+            fn(value)
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+@contextlib.contextmanager
+def caches_disabled():
+    """Make every domain score and verdict cache lookup a miss"""
+    caches = (app.DOMAIN_SCORE_CACHE, app.VERDICT_CACHE)
+    capacities = [cache.capacity for cache in caches]
+    for cache in caches:
+        cache.clear()
+        cache.capacity = 0
+    try:
+        yield
+    finally:
+        for cache, capacity in zip(caches, capacities):
+            cache.capacity = capacity
+
+
+async def time_predict_requests(emails: List[str], repeat: int) -> List[float]:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app.app)
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+        for _ in range(repeat):
+            for email_text in emails:
+                started = time.perf_counter()
+                response = await client.post('/predict', json={"email": email_text})
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200 or "error" in response.json():
+                    raise RuntimeError(f"/predict failed: {response.status_code} {response.text[:200]}")
+    return latencies
+
+
+def run_benchmark(name: str, emails: List[str], repeat: int) -> Dict[str, float]:
+    if name == 'extract_domain_from_email':
+        return latency_summary(time_calls(app.extract_domain_from_email, emails, repeat),
+                               len(emails) * repeat)
+    if name in ('calculate_domain_legitimacy_score', 'score_domains'):
+        # Every distinct domain the corpus mentions, in first-seen order
+        domains = list(dict.fromkeys(domain for email_text in emails
+                                     for domain in app.extract_domain_from_email(email_text)))
+        if name == 'score_domains':
+            # One batch call per pass, over all of them
+            latencies = time_calls(app.score_domains, [domains], repeat)
+        else:
+            latencies = time_calls(app.calculate_domain_legitimacy_score, domains, repeat)
+        return {**latency_summary(latencies, len(domains) * repeat), "unique_domains": len(domains)}
+    if name == 'extract_enhanced_email_features':
+        return latency_summary(time_calls(lambda email_text: app.extract_enhanced_email_features([email_text]),
+                                          emails, repeat),
+                               len(emails) * repeat)
+    if name == 'process_email_enhanced':
+        return latency_summary(time_calls(app.process_email_enhanced, emails, repeat),
+                               len(emails) * repeat)
+    if name == 'predict_endpoint':
+        return latency_summary(asyncio.run(time_predict_requests(emails, repeat)), len(emails) * repeat)
+    raise ValueError(f"Unknown benchmark: {name}")
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment_info(args) -> Dict:
+    import sklearn
+
+    return {
+        "git_revision": git_revision(),
+        "model_fingerprint": app.MODEL_FINGERPRINT,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scikit_learn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "warmup": args.warmup,
+        "warm_caches": args.warm_caches,
+        "pythonhashseed": os.environ.get("PYTHONHASHSEED"),
+        "settings": {name: os.environ[name] for name in
+                     ("ARRAY_EVALUATOR", "LEGITIMACY_FAST_PATH", "MODEL_ARTIFACT_DIR", "INFERENCE_EXECUTOR")
+                     if name in os.environ},
+    }
+
+
+def run_suite(args) -> Dict:
+    app.load_models()
+    results = []
+    for size in args.sizes:
+        emails = build_corpus(size, args.seed)
+        for name in args.benchmarks:
+            with caches_disabled() if not args.warm_caches else contextlib.nullcontext():
+                if args.warmup:
+                    run_benchmark(name, emails[:args.warmup], 1)
+                summary = run_benchmark(name, emails, args.repeat)
+            results.append({"benchmark": name, "corpus_size": len(emails), **summary})
+            print(f"{name:36s} n={len(emails):<6d} {summary['throughput_per_second']:>10.1f}/s  "
+                  f"p50 {summary['p50_ms']:.3f} ms  p95 {summary['p95_ms']:.3f} ms  "
+                  f"p99 {summary['p99_ms']:.3f} ms", file=sys.stderr)
+    return {"environment": environment_info(args), "results": results}
+
+
+def compare(baseline: Dict, current: Dict) -> List[str]:
+    """Lines comparing throughput and p99 of ``current`` against ``baseline``"""
+    previous = {(r["benchmark"], r["corpus_size"]): r for r in baseline["results"]}
+    lines = []
+    for result in current["results"]:
+        before = previous.get((result["benchmark"], result["corpus_size"]))
+        if before is None:
+            continue
+        speedup = result["throughput_per_second"] / before["throughput_per_second"]
+        lines.append(f"{result['benchmark']:36s} n={result['corpus_size']:<6d} "
+                     f"throughput x{speedup:.2f}  p99 {before['p99_ms']:.3f} -> {result['p99_ms']:.3f} ms")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the phishing scoring pipeline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000],
+                        help="corpus sizes to generate (default: 100 1000)")
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3, help="timed passes over each corpus")
+    parser.add_argument('--warmup', type=int, default=50, help="untimed calls before each benchmark")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--warm-caches', action='store_true',
+                        help="leave the domain score and verdict caches enabled")
+    parser.add_argument('--out', default='-', help="JSON output file (default: stdout)")
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help="JSON results of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    # Per-request log lines would dominate the timings
+    logging.getLogger(app.__name__).setLevel(logging.WARNING)
+
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_suite(args)
+
+    output = json.dumps(report, indent=2)
+    if args.out == '-':
+        print(output)
+    else:
+        with open(args.out, 'w') as out_file:
+            out_file.write(output + '\n')
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        for line in compare(baseline, report):
+            print(line, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Shared test setup: the backend modules on sys.path, the loaded models and an API
+client, a fake clock, the scikit-learn model and a view of it without private
+helpers, the sample emails of test_improvements.py plus emails that reach the
+model, and the differential check the parity tests use
+"""
+
+import os
+import pickle
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.append(BACKEND_DIR)
+
+import app
+from test_improvements import LEGITIMATE_TEST_EMAILS, PHISHING_TEST_EMAILS
+
+
+@pytest.fixture(scope='session')
+def backend_dir():
+    return BACKEND_DIR
+
+
+@pytest.fixture(scope='session')
+def sklearn_model(backend_dir):
+    """The pickled scikit-learn model, as trained"""
+    with open(os.path.join(backend_dir, 'model.pkl'), 'rb') as model_file:
+        return pickle.load(model_file)
+
+
+class PublicOnly:
+    """Exposes only the public attributes of ``model``, like a scikit-learn without its private helpers"""
+
+    def __init__(self, model):
+        self._model = model
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._model, name)
+
+
+@pytest.fixture(scope='module')
+def models():
+    """The models, loaded without warmup"""
+    app.load_models(warmup_rounds=0)
+
+
+@pytest.fixture(scope='module')
+def client(models):
+    """A test client of the API with the models loaded (the lifespan is not run)"""
+    return TestClient(app.app)
+
+
+class Clock:
+    """Stands in for ``time.time``; tests move ``now`` forward by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A Clock that the app reads as its wall clock"""
+    clock = Clock()
+    monkeypatch.setattr(app.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture(scope='session')
+def sample_emails():
+    """The legitimate and phishing sample emails, in that order"""
+    return LEGITIMATE_TEST_EMAILS + PHISHING_TEST_EMAILS
+
+
+@pytest.fixture(scope='session')
+def model_path_emails():
+    """Emails that skip the legitimate-sender fast path: suspicious senders, and no sender at all"""
+    return [
+        "From: billing@secure-paypal-login.tk\nSubject: Account suspended\n\nURGENT: verify your account now "
+        "at http://secure-paypal-login.tk/verify or it will be closed. Enter your password and credit card details.",
+        "From: it-desk@mail-update.ml\nSubject: Mailbox quota\n\nYour mailbox is full. Login at "
+        "http://192.168.4.20/owa to confirm your password within 24 hours.",
+        "URGENT: your account suspended. Verify now at http://secure-login.tk/ to claim your $500 refund",
+        "Hi team, the quarterly review meeting moved to Thursday at 3pm. Please bring the updated figures.",
+        "Dear customer, we noticed unusual activity. Confirm your details immediately to avoid suspension.",
+    ]
+
+
+def assert_matches_legacy(new, legacy, inputs):
+    """Assert ``new(x) == legacy(x)`` for every input, naming the first input where they differ"""
+    for value in inputs:
+        assert new(value) == legacy(value), value
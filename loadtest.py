@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Local load test for the phishing detection API
+
+Starts backend/app.py on a free local port (or targets --url), drives /predict and
+/check_sender from many concurrent simulated extension users, and reports
+throughput, latency percentiles and error rates per endpoint, together with the
+server's CPU and RSS sampled over the run. Request bodies are built from the
+create_dataset.py templates, so nothing leaves the machine.
+
+    python loadtest.py --concurrency 32 --duration 60
+    python loadtest.py --rate 200 --concurrency 256 --size-mix 2000:0.8,20000:0.2
+
+Without --rate every simulated user sends its next request as soon as the previous
+one is answered (closed loop). With --rate, requests arrive as a Poisson process at
+that rate, at most --concurrency at a time, and latency is measured from the
+scheduled arrival so queueing delay is not hidden (open loop).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from create_dataset import generate_comprehensive_dataset
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+ENDPOINTS = ('predict', 'check_sender')
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def parse_mix(spec: str, cast=str) -> List[Tuple]:
+    """'a:0.8,b:0.2' -> [(a, 0.8), (b, 0.2)]"""
+    mix = []
+    for part in spec.split(','):
+        value, _, weight = part.partition(':')
+        mix.append((cast(value.strip()), float(weight or 1)))
+    return mix
+
+
+def build_bodies(size_mix: List[Tuple[int, float]], count: int, seed: int) -> List[Tuple[int, str]]:
+    """``count`` emails of roughly the sizes in ``size_mix`` (bytes), as ``(size class, text)``
+
+    Larger emails are generated emails concatenated until they reach their size, the
+    way long threads quote earlier messages.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch, contextlib.redirect_stdout(io.StringIO()):
+        os.chdir(scratch)
+        try:
+            emails = generate_comprehensive_dataset(num_samples=max(count, 2))['Email Text'].tolist()
+        finally:
+            os.chdir(cwd)
+
+    rng = random.Random(seed)
+    sizes = [size for size, _ in size_mix]
+    weights = [weight for _, weight in size_mix]
+    bodies = []
+    for i in range(count):
+        size = rng.choices(sizes, weights)[0]
+        parts = [emails[i % len(emails)]]
+        length = len(parts[0])
+        while length < size:
+            parts.append(rng.choice(emails))
+            length += len(parts[-1]) + 2
+        bodies.append((size, '\n\n'.join(parts)))
+    return bodies
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def process_tree(pid: int) -> List[int]:
+    """``pid`` and all of its descendants (Linux /proc only)"""
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        try:
+            with open(f"/proc/{current}/task/{current}/children") as children_file:
+                pending.extend(int(child) for child in children_file.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def process_cpu_rss(pid: int) -> Tuple[float, int]:
+    """CPU seconds used so far and resident memory in kB of one process"""
+    try:
+        with open(f"/proc/{pid}/stat") as stat_file:
+            # Fields after the parenthesised command name; utime and stime are 14 and 15
+            fields = stat_file.read().rpartition(')')[2].split()
+        with open(f"/proc/{pid}/status") as status_file:
+            rss_kb = next((int(line.split()[1]) for line in status_file if line.startswith('VmRSS:')), 0)
+    except (OSError, ValueError, IndexError):
+        return 0.0, 0
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS, rss_kb
+
+
+class ResourceSampler(threading.Thread):
+    """Samples CPU utilisation and RSS of a server process tree every ``interval`` seconds"""
+
+    def __init__(self, pid: int, interval: float):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Dict] = []
+        self._stop_event = threading.Event()
+        self.started_at = time.monotonic()
+
+    def totals(self) -> Tuple[float, int]:
+        cpu = rss = 0
+        for pid in process_tree(self.pid):
+            process_cpu, process_rss = process_cpu_rss(pid)
+            cpu += process_cpu
+            rss += process_rss
+        return cpu, rss
+
+    def run(self):
+        last_cpu, _ = self.totals()
+        last_time = time.monotonic()
+        while not self._stop_event.wait(self.interval):
+            cpu, rss_kb = self.totals()
+            now = time.monotonic()
+            self.samples.append({
+                "t": round(now - self.started_at, 2),
+                # 100 is one fully busy core
+                "cpu_percent": round(100 * (cpu - last_cpu) / (now - last_time), 1),
+                "rss_mb": round(rss_kb / 1024, 1),
+            })
+            last_cpu, last_time = cpu, now
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def start_server(port: int, env_overrides: Dict[str, str], timeout: float) -> subprocess.Popen:
+    env = {**os.environ, "PORT": str(port), **env_overrides}
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, 'backend', 'app.py')],
+                              cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_until_ready(f"http://127.0.0.1:{port}", timeout, server)
+    return server
+
+
+def wait_until_ready(url: str, timeout: float, server: Optional[subprocess.Popen] = None):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"Server exited with status {server.returncode} before becoming ready")
+        try:
+            if httpx.get(f"{url}/ready", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} not ready after {timeout}s")
+
+
+def stop_server(server: subprocess.Popen):
+    server.terminate()
+    try:
+        server.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+class LoadResults:
+    def __init__(self, started: float):
+        self.started = started
+        # (completed at, endpoint, size class, latency seconds, status; 0 for transport errors)
+        self.records: List[Tuple[float, str, int, float, int]] = []
+
+    def record(self, endpoint: str, size: int, scheduled: float, status: int):
+        now = time.monotonic()
+        self.records.append((now - self.started, endpoint, size, now - scheduled, status))
+
+
+async def send(client, endpoint: str, body: Tuple[int, str], scheduled: float, results: LoadResults):
+    size, email_text = body
+    try:
+        response = await client.post(f"/{endpoint}", json={"email": email_text})
+        status = response.status_code
+        # The API reports scoring failures as a 200 with an "error" field
+        if status == 200 and "error" in response.json():
+            status = 299
+    except Exception:
+        status = 0
+    results.record(endpoint, size, scheduled, status)
+
+
+async def drive_load(args, url: str, bodies: List[Tuple[int, str]], started: float) -> LoadResults:
+    import httpx
+
+    endpoints = parse_mix(args.endpoint_mix)
+    names = [name for name, _ in endpoints]
+    weights = [weight for _, weight in endpoints]
+    rng = random.Random(args.seed)
+    results = LoadResults(started)
+    deadline = started + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout) as client:
+        if args.rate is None:
+            async def user():
+                while time.monotonic() < deadline:
+                    await send(client, rng.choices(names, weights)[0], rng.choice(bodies),
+                               time.monotonic(), results)
+
+            await asyncio.gather(*(user() for _ in range(args.concurrency)))
+            return results
+
+        slots = asyncio.Semaphore(args.concurrency)
+        tasks = set()
+
+        async def limited(endpoint, body, scheduled):
+            async with slots:
+                await send(client, endpoint, body, scheduled, results)
+
+        next_arrival = time.monotonic()
+        while next_arrival < deadline:
+            delay = next_arrival - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.ensure_future(limited(rng.choices(names, weights)[0], rng.choice(bodies),
+                                                 next_arrival))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            next_arrival += rng.expovariate(args.rate)
+        if tasks:
+            await asyncio.gather(*tasks)
+    return results
+
+
+def latency_stats(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {}
+    p50, p90, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 90, 95, 99])
+    return {"p50_ms": round(float(p50), 2), "p90_ms": round(float(p90), 2),
+            "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2),
+            "max_ms": round(max(latencies) * 1000, 2)}
+
+
+def summarize(records: List[Tuple], elapsed: float) -> Dict:
+    errors: Dict[str, int] = {}
+    for _, _, _, _, status in records:
+        if status != 200:
+            key = {0: "transport", 299: "scoring_error"}.get(status, str(status))
+            errors[key] = errors.get(key, 0) + 1
+    ok_latencies = [latency for _, _, _, latency, status in records if status == 200]
+    return {
+        "requests": len(records),
+        "throughput_per_second": round(len(records) / elapsed, 2) if elapsed > 0 else None,
+        "error_rate": round(sum(errors.values()) / len(records), 4) if records else 0.0,
+        "errors": errors,
+        **latency_stats(ok_latencies),
+    }
+
+
+def timeline(records: List[Tuple], interval: float, resources: List[Dict]) -> List[Dict]:
+    """Requests, errors and p95 per ``interval``, joined with the server resource samples"""
+    buckets: Dict[int, List[Tuple]] = {}
+    for record in records:
+        buckets.setdefault(int(record[0] // interval), []).append(record)
+    rows = []
+    for index in sorted(buckets):
+        bucket = buckets[index]
+        ok_latencies = [latency for _, _, _, latency, status in bucket if status == 200]
+        row = {"t": round((index + 1) * interval, 2),
+               "requests": len(bucket),
+               "errors": sum(1 for record in bucket if record[4] != 200),
+               "p95_ms": latency_stats(ok_latencies).get("p95_ms")}
+        sample = next((s for s in resources if s["t"] >= row["t"] - interval / 2), None)
+        if sample is not None:
+            row.update(cpu_percent=sample["cpu_percent"], rss_mb=sample["rss_mb"])
+        rows.append(row)
+    return rows
+
+
+def report(args, results: LoadResults, elapsed: float, resources: List[Dict]) -> Dict:
+    records = results.records
+    by_endpoint = {name: summarize([r for r in records if r[1] == name], elapsed)
+                   for name in sorted({r[1] for r in records})}
+    by_size = {str(size): summarize([r for r in records if r[2] == size], elapsed)
+               for size in sorted({r[2] for r in records})}
+    server = {}
+    if resources:
+        cpu = [s["cpu_percent"] for s in resources]
+        rss = [s["rss_mb"] for s in resources]
+        server = {"cpu_percent_mean": round(float(np.mean(cpu)), 1), "cpu_percent_max": max(cpu),
+                  "rss_mb_start": rss[0], "rss_mb_max": max(rss), "rss_mb_end": rss[-1]}
+    return {
+        "settings": {"concurrency": args.concurrency, "rate": args.rate, "duration": args.duration,
+                     "endpoint_mix": args.endpoint_mix, "size_mix": args.size_mix,
+                     "server_env": dict(args.server_env), "url": args.url},
+        "elapsed_seconds": round(elapsed, 2),
+        "total": summarize(records, elapsed),
+        "endpoints": by_endpoint,
+        "sizes": by_size,
+        "server": server,
+        "timeline": timeline(records, args.sample_interval, resources),
+    }
+
+
+def parse_env(value: str) -> Tuple[str, str]:
+    name, separator, setting = value.partition('=')
+    if not separator:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {value!r}")
+    return name, setting
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load test the phishing detection API locally")
+    parser.add_argument('--url', help="target an already running server instead of starting one")
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help="simulated users, or the cap on outstanding requests with --rate")
+    parser.add_argument('--rate', type=float, help="open-loop arrival rate in requests per second")
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds to generate load")
+    parser.add_argument('--endpoint-mix', default='predict:0.8,check_sender:0.2',
+                        help="weighted endpoints (default: predict:0.8,check_sender:0.2)")
+    parser.add_argument('--size-mix', default='1000:0.7,10000:0.25,100000:0.05',
+                        help="weighted minimum email sizes in bytes")
+    parser.add_argument('--corpus-size', type=int, default=1000, help="distinct request bodies")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument('--sample-interval', type=float, default=1.0,
+                        help="seconds between server CPU/RSS samples and timeline rows")
+    parser.add_argument('--server-env', type=parse_env, action='append', default=[],
+                        metavar='NAME=VALUE', help="environment of the started server (repeatable)")
+    parser.add_argument('--verdict-cache', action='store_true',
+                        help="keep the server's verdict cache on; by default it is disabled so "
+                             "repeated bodies are scored every time")
+    parser.add_argument('--startup-timeout', type=float, default=120.0)
+    parser.add_argument('--out', default='-', help="JSON report file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    bodies = build_bodies(parse_mix(args.size_mix, int), args.corpus_size, args.seed)
+
+    server = None
+    if args.url:
+        url = args.url.rstrip('/')
+        wait_until_ready(url, args.startup_timeout)
+        server_pid = None
+    else:
+        env = dict(args.server_env)
+        if not args.verdict_cache:
+            env.setdefault("VERDICT_CACHE_SIZE", "0")
+        port = free_port()
+        print(f"Starting backend/app.py on port {port}...", file=sys.stderr)
+        server = start_server(port, env, args.startup_timeout)
+        url = f"http://127.0.0.1:{port}"
+        server_pid = server.pid
+
+    sampler = ResourceSampler(server_pid, args.sample_interval) if server_pid else None
+    try:
+        if sampler is not None:
+            sampler.start()
+        started = time.monotonic()
+        if sampler is not None:
+            sampler.started_at = started
+        results = asyncio.run(drive_load(args, url, bodies, started))
+        elapsed = time.monotonic() - started
+    finally:
+        if sampler is not None:
+            sampler.stop()
+        if server is not None:
+            stop_server(server)
+
+    load_report = report(args, results, elapsed, sampler.samples if sampler else [])
+    total = load_report["total"]
+    print(f"{total['requests']} requests in {elapsed:.1f}s ({total['throughput_per_second']}/s), "
+          f"error rate {total['error_rate']}, p50 {total.get('p50_ms')} ms, "
+          f"p95 {total.get('p95_ms')} ms, p99 {total.get('p99_ms')} ms", file=sys.stderr)
+
+    output = json.dumps(load_report, indent=2)
+    if args.out == '-':
+        print(output)
+    else:
+        with open(args.out, 'w') as out_file:
+            out_file.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
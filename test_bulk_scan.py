@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for the mbox and .eml bulk scanner
+"""
+
+import io
+import json
+
+import app
+import bulk_scan
+
+MBOX = b"""From alice@example.com Mon Jan  1 00:00:00 2024
+From: alice@example.com
+Subject: First
+
+Hello
+From the team
+>From the quoted line
+>>From twice quoted
+
+From bob@example.com Mon Jan  1 00:00:01 2024
+From: bob@example.com
+Subject: Second
+
+Bye
+"""
+
+HTML_EML = b"""From: news@example.com
+Subject: Offers
+Content-Type: text/html; charset=utf-8
+
+<html><head><style>p { color: red }</style><script>alert(1)</script></head>
+<body><p>Spring <b>sale</b></p></body></html>
+"""
+
+UNKNOWN_CHARSET_EML = b"""From: team@example.com
+Subject: Hi
+Content-Type: text/plain; charset=x-no-such-charset
+Content-Transfer-Encoding: 8bit
+
+caf\xc3\xa9 menu
+"""
+
+
+def eml(sender, subject, body):
+    return f"From: {sender}\nSubject: {subject}\n\n{body}\n".encode()
+
+
+def test_mbox_splits_on_from_lines_after_blank_lines(tmp_path):
+    path = tmp_path / 'archive.mbox'
+    path.write_bytes(MBOX)
+    messages = list(bulk_scan.iter_mbox(str(path)))
+    assert [source for source, _ in messages] == [f"{path}:0", f"{path}:1"]
+    first = messages[0][1].decode()
+    # "From " inside a body (no blank line before it) stays, quoted lines lose one ">"
+    assert "Hello\nFrom the team\nFrom the quoted line\n>From twice quoted\n" in first
+    assert messages[1][1].startswith(b"From: bob@example.com\n")
+
+
+def test_html_bodies_lose_their_tags():
+    headers, text = bulk_scan.message_to_text(HTML_EML)
+    assert headers == {"message_id": None, "from": "news@example.com", "subject": "Offers"}
+    assert text.startswith("From: news@example.com\nSubject: Offers\n\n")
+    assert "Spring" in text and "sale" in text
+    assert "<" not in text and "color" not in text and "alert" not in text
+
+
+def test_unknown_charsets_are_decoded_leniently():
+    _, text = bulk_scan.message_to_text(UNKNOWN_CHARSET_EML)
+    assert text.endswith("\n\ncafé menu\n")
+
+
+def scan(paths, **kwargs):
+    out = io.StringIO()
+    progress = bulk_scan.scan_archives([str(path) for path in paths], out, **kwargs)
+    return [json.loads(line) for line in out.getvalue().splitlines()], progress
+
+
+def test_results_keep_input_order_across_workers(tmp_path, sample_emails, model_path_emails):
+    emails = sample_emails + model_path_emails
+    maildir = tmp_path / 'maildir'
+    maildir.mkdir()
+    for i, body in enumerate(emails):
+        (maildir / f"{i:03}.eml").write_bytes(eml(f"sender{i}@example.com", f"Message {i}", body))
+    mbox = tmp_path / 'archive.mbox'
+    mbox.write_bytes(MBOX)
+
+    serial, _ = scan([maildir, mbox], workers=1, batch_size=3)
+    parallel, progress = scan([maildir, mbox], workers=3, batch_size=2)
+    assert parallel == serial
+    assert [result["source"] for result in parallel] == (
+        [str(maildir / f"{i:03}.eml") for i in range(len(emails))] + [f"{mbox}:0", f"{mbox}:1"])
+    assert [result["subject"] for result in parallel] == (
+        [f"Message {i}" for i in range(len(emails))] + ["First", "Second"])
+    for i in (0, len(emails) - 1):
+        headers, text = bulk_scan.message_to_text((maildir / f"{i:03}.eml").read_bytes())
+        assert parallel[i] == {"source": str(maildir / f"{i:03}.eml"), **headers, **app.score_email(text)}
+    assert progress.scanned == len(emails) + 2 and progress.errors == 0
+
+
+def test_unparseable_messages_become_error_rows(tmp_path, monkeypatch):
+    def message_to_text(raw):
+        if b"Second" in raw:
+            raise ValueError("broken headers")
+        return parse(raw)
+
+    parse = bulk_scan.message_to_text
+    monkeypatch.setattr(bulk_scan, 'message_to_text', message_to_text)
+    mbox = tmp_path / 'archive.mbox'
+    mbox.write_bytes(MBOX)
+    results, progress = scan([mbox], workers=1)
+    assert results[0]["subject"] == "First" and "prediction" in results[0]
+    assert results[1] == {"source": f"{mbox}:1", "error": "Unparseable message: broken headers"}
+    assert progress.errors == 1
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Parity tests for batch domain scoring against the per-domain scoring function
+"""
+
+import random
+
+import numpy as np
+
+import app
+from conftest import assert_matches_legacy
+
+LABELS = ['paypal', 'amazon', 'secure-login', 'verify', 'account', 'noreply', 'no-reply', 'support',
+          'www', 'api', 'app', 'apps', 'mail', 'news', 'updates', 'a', 'ab', 'abc', 'x1', '123',
+          '9abc9', 'corp', 'techhub', 'shopcenter', 'verylongdomainnamethatkeepsgoingforever',
+          'login-update', 'update', '-secure', 'confirm', 'docs', 'play', 'cdn', 'assets', 'blog',
+          'ai', 'studio', 'ExAmPle', 'İstanbul', '١٢٣']
+SUFFIXES = ['com', 'org', 'net', 'tk', 'info', 'co.uk', 'com.au', 'co', 'edu', 'gov', 'mil', 'xyz',
+            'de', 'io', '1', 'c', 'ml', 'click']
+ODD_DOMAINS = ['', 'nodot', '.', '..', 'a.', '.com', 'a..b', '192.168.0.1', '1.2.3.4\n',
+               '10.0.0.300', 'NOREPLY.PAYPAL.COM']
+
+
+def random_domains(count, seed=0):
+    rng = random.Random(seed)
+    domains = []
+    for _ in range(count):
+        domain = '.'.join([rng.choice(LABELS) for _ in range(rng.randint(0, 4))] + [rng.choice(SUFFIXES)])
+        domains.append(domain.upper() if rng.random() < 0.1 else domain)
+    return domains + ODD_DOMAINS
+
+
+def assert_matches_scalar(domains):
+    scores, reasons = app.score_domains(domains)
+    assert isinstance(scores, np.ndarray) and scores.shape == (len(domains),)
+    batch = {domain: (score, domain_reasons)
+             for domain, score, domain_reasons in zip(domains, scores.tolist(), reasons)}
+    assert_matches_legacy(batch.get, app._score_domain_legitimacy, domains)
+
+
+def test_matches_scalar_on_random_domains():
+    assert_matches_scalar(random_domains(20000))
+
+
+def test_matches_scalar_on_email_domains(sample_emails):
+    assert_matches_scalar([domain for email_text in sample_emails
+                           for domain in app.extract_domain_from_email(email_text)])
+
+
+def test_empty_batch():
+    scores, reasons = app.score_domains([])
+    assert scores.shape == (0,) and reasons == []
+
+
+def test_cached_batch_scores():
+    domains = ['paypal.com', 'secure-login.tk', 'paypal.com']
+    app.DOMAIN_SCORE_CACHE.clear()
+    scored = app.calculate_domain_legitimacy_scores(domains)
+    assert list(scored) == ['paypal.com', 'secure-login.tk']
+    for domain, result in scored.items():
+        assert result == app._score_domain_legitimacy(domain)
+        assert app.calculate_domain_legitimacy_score(domain) == result  # served from the cache
+
+
+def test_batch_analysis_matches_single(sample_emails):
+    budgets = [app.ScanBudget() for _ in sample_emails]
+    for email_text, batch in zip(sample_emails, app.EmailAnalysis.analyze_batch(sample_emails, budgets)):
+        single = app.EmailAnalysis(email_text)
+        assert batch.domain_contexts == single.domain_contexts
+        assert batch.domain_scores == single.domain_scores
+        assert (batch.is_legitimate, batch.legitimacy_reason) == (single.is_legitimate, single.legitimacy_reason)
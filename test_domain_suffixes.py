@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the suffix trie: TLD classes and main labels identical to the
+split-and-join rules it replaced, and public suffixes and registrable domains
+from the bundled list
+"""
+
+import random
+
+import pytest
+
+import app
+from conftest import assert_matches_legacy
+from domain_suffixes import SuffixTrie, read_suffix_list
+
+LABELS = ['paypal', 'mail', 'www', 'co', 'com', 'org', 'net', 'uk', 'tk', 'edu', 'gov', 'mil', 'au',
+          'in', 'jp', 'ne', 'ck', 'bd', 'a', '', 'x1', 'İ', 'zz']
+
+
+def legacy_tld_class(domain):
+    """The TLD and its class as _score_domain_legitimacy decided them before the trie"""
+    parts = domain.split('.')
+    tld = '.' + '.'.join(parts[-2:]) if len(parts) >= 3 and parts[-2] in ['co', 'com', 'org'] else '.' + parts[-1]
+    if tld in app.SUSPICIOUS_TLDS:
+        return tld, 'suspicious'
+    if tld in ['.edu', '.gov', '.mil']:
+        return tld, 'institutional'
+    if tld in app.LEGITIMATE_TLDS:
+        return tld, 'legitimate'
+    return tld, None
+
+
+def test_matches_legacy_tld_rule():
+    rng = random.Random(0)
+    domains = ['.'.join(rng.choice(LABELS) for _ in range(rng.randint(1, 5))) for _ in range(20000)]
+    assert_matches_legacy(lambda domain: tuple(app.SUFFIX_TRIE.lookup(domain)[:2]), legacy_tld_class,
+                          domains + ['', '.', 'co.uk', 'a.co.uk', 'edu', 'x.com.tk', 'a.org.edu'])
+
+
+def legacy_main_label(domain):
+    """The label _score_domain_legitimacy inspected before the trie"""
+    parts = domain.split('.')
+    return parts[-2] if len(parts) >= 2 else parts[0]
+
+
+def test_main_label_matches_legacy_split():
+    rng = random.Random(1)
+    domains = ['.'.join(rng.choice(LABELS) for _ in range(rng.randint(1, 5))) for _ in range(20000)]
+    assert_matches_legacy(lambda domain: app.SUFFIX_TRIE.lookup(domain).main_label, legacy_main_label,
+                          domains + ['', '.', 'com', 'a.', '.com', 'a..b', 'news.bbc.co.uk'])
+
+
+@pytest.mark.parametrize('domain, public_suffix, registrable_domain', [
+    ('mail.paypal.com', 'com', 'paypal.com'),
+    ('paypal.com', 'com', 'paypal.com'),
+    ('com', 'com', None),
+    ('news.bbc.co.uk', 'co.uk', 'bbc.co.uk'),
+    ('co.uk', 'co.uk', None),
+    ('shop.example.unknowntld', 'unknowntld', 'example.unknowntld'),
+    ('a.b.c.ne.jp', 'ne.jp', 'c.ne.jp'),
+    ('www.example.ck', 'example.ck', 'www.example.ck'),  # *.ck
+    ('www.ck', 'ck', 'www.ck'),  # !www.ck
+    ('login.www.ck', 'ck', 'www.ck'),
+])
+def test_public_suffix_and_registrable_domain(domain, public_suffix, registrable_domain):
+    match = app.SUFFIX_TRIE.lookup(domain)
+    assert (match.public_suffix, match.registrable_domain) == (public_suffix, registrable_domain)
+
+
+def test_first_class_wins():
+    trie = SuffixTrie([], [('high', {'.edu'}), ('low', {'.edu', '.com'})])
+    assert trie.lookup('mit.edu').tld_class == 'high'
+    assert trie.lookup('example.com').tld_class == 'low'
+
+
+def test_bundled_list_covers_classified_tlds():
+    rules = set(read_suffix_list())
+    for _, tlds, _, _ in app.TLD_CLASSES:
+        assert {tld.lstrip('.') for tld in tlds} <= rules
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Differential tests for the single-pass domain tokenizer against the seven regexes it replaced
+"""
+
+import random
+import re
+import time
+
+from app import extract_domain_from_email
+from conftest import assert_matches_legacy
+from domain_tokenizer import LINK, MENTION, SENDER, scan_domains
+
+LEGACY_DOMAIN_PATTERNS = [
+    r'from[:\s]+[^@\s]*@([^\s<>\[\]]+)',  # From header
+    r'@([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',  # Any email domain
+    r'https?://(?:www\.)?([^/\s<>\[\]]+)',  # URL domains
+    r'\b([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})\b',  # Plain domain mentions (like Claude.ai)
+    r'visit\s+([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',  # "visit domain.com"
+    r'go\s+to\s+([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',  # "go to domain.com"
+    r'log\s+in(?:to)?\s+([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',  # "log in to domain.com"
+]
+
+
+def legacy_extract_domain_from_email(email_text):
+    """The extractor as it was before the tokenizer, one findall per pattern"""
+    domains = set()
+    email_lower = email_text.lower()
+    for pattern in LEGACY_DOMAIN_PATTERNS:
+        for match in re.findall(pattern, email_lower, re.IGNORECASE):
+            domain = match.strip('.,;!?')
+            if ('.' in domain and
+                    len(domain) > 3 and
+                    not domain.startswith('.') and
+                    not domain.endswith('.') and
+                    not re.search(r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}', domain)):
+                domains.add(domain)
+    return domains
+
+
+EDGE_CASES = [
+    "",
+    "From: PayPal <service@paypal.com>\nVisit https://www.paypal.com/signin or go to paypal.com.",
+    "from:a@bfrom c@d.com)",  # the second From is inside the first address
+    "From : : user@mail.example.org, cc: other@example.net;",
+    "wherefrom:x@y.co.uk>from:z@w.io",
+    "log in to account.example.com, log into secure.example.com or log in example.org",
+    "please revisit foo.com_x and visit a.visit foo.com_x",
+    "ago to bar.net and go  to\tbaz.info!",
+    "http://user:pw@host.example.com:8080?x=1 https://www./path http://a.comhttp://b.com",
+    "support@-bank.com ip 192.168.1.10 at 10.0.0.1.example.com",
+    "-foo.com _bar.com é.com example.com1 example.co.uk. ..dots..com",
+    "HTTPſ://Example.COM/ and KELVIN.org ſite.ſu",
+    "a." * 2000,
+    "from: " * 500 + "a@b.com",
+]
+
+
+def random_text(rng):
+    fragments = ['from', ':', '@', '.', '-', 'com', 'co', 'a', 'b1', 'http', 'https', '://', '/',
+                 'www.', 'visit', 'go', 'to', 'log', 'in', 'into', '_', 'é', 'ſ', 'ı', 'K', '<', '>',
+                 '[', ']', '1', '22', '333', 'x', '?', ',', ')', 'ex', 'ample', '.org', 's']
+    separators = [' ', '  ', '\n', '\t', '', '', '', '', '\xa0', ':']
+    return ''.join(rng.choice(fragments) + rng.choice(separators) for _ in range(rng.randint(1, 25)))
+
+
+def test_matches_legacy_extractor(sample_emails):
+    assert_matches_legacy(lambda email_text: set(extract_domain_from_email(email_text)),
+                          legacy_extract_domain_from_email, sample_emails + EDGE_CASES)
+
+
+def test_matches_legacy_extractor_on_random_text():
+    rng = random.Random(0)
+    assert_matches_legacy(lambda email_text: set(scan_domains(email_text)), legacy_extract_domain_from_email,
+                          [random_text(rng) for _ in range(20000)])
+
+
+def test_domains_in_order_of_first_appearance():
+    email_text = "Go to zeta.com, then write to alpha@beta.org or visit zeta.com and gamma.net"
+    assert extract_domain_from_email(email_text) == ['zeta.com', 'beta.org', 'gamma.net']
+
+
+def test_contexts():
+    domains = scan_domains("From: alerts@bank.com\nSign in at https://bank-login.net/verify "
+                           "or mail help@bank.com. Details on bank.com")
+    assert domains == {
+        'bank.com': [SENDER, MENTION],
+        'bank-login.net': [LINK, MENTION],
+    }
+
+
+def test_stops_when_budget_is_exhausted():
+    class SpentBudget:
+        def exhausted(self, stage):
+            return True
+
+    assert scan_domains("Contact us at help@example.com", SpentBudget()) == {}
+
+
+def test_long_runs_take_linear_time():
+    started = time.perf_counter()
+    scan_domains("a." * 20000)
+    scan_domains("@a." * 20000)
+    assert time.perf_counter() - started < 2.0
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Tests for the legitimate-sender fast path, which skips TF-IDF and the model
+"""
+
+import app
+
+
+def failing_extraction(*args, **kwargs):
+    raise RuntimeError("feature extraction failed")
+
+
+def test_failed_feature_extraction_falls_back(models, monkeypatch, sample_emails, model_path_emails):
+    emails = sample_emails + model_path_emails
+    expected = app.score_emails(emails)
+    assert {result["is_legitimate_sender"] for result in expected} == {True, False}
+    monkeypatch.setattr(app, 'extract_enhanced_email_features', failing_extraction)
+    batch_results = app.score_emails(emails)
+    assert batch_results == [app.score_email(email_text) for email_text in emails]
+    for result, unfailed in zip(batch_results, expected):
+        assert "error" not in result
+        if result["is_legitimate_sender"]:
+            assert result["prediction"] == unfailed["prediction"]
+            assert result["reasons"] == unfailed["reasons"][:2]
+        else:
+            # The model still runs, with the enhanced feature columns left at zero
+            assert result["prediction"] in ("Safe Email", "Phishing Email")
+            assert result["reasons"] == ["Basic ML model prediction"]
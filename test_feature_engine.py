@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the enhanced feature engine: chunking, dtypes and the per-thread row buffer
+"""
+
+import threading
+
+import numpy as np
+
+import app
+
+
+def test_chunks_match_one_batch(sample_emails):
+    whole = app.FeatureEngine(np.float64, chunk_size=len(sample_emails)).extract(sample_emails)
+    assert whole.shape == (len(sample_emails), len(app.ENHANCED_FEATURES)) and whole.dtype == np.float64
+    for chunk_size in (1, 2, 7):
+        assert np.array_equal(app.FeatureEngine(np.float64, chunk_size=chunk_size).extract(sample_emails), whole)
+
+
+def test_float64_rows_match_single_emails(sample_emails):
+    engine = app.FeatureEngine(np.float64)
+    batch = engine.extract(sample_emails)
+    for email_text, row in zip(sample_emails, batch):
+        assert np.array_equal(engine.extract([email_text])[0], row)
+
+
+def test_float32_is_the_rounded_float64(sample_emails):
+    exact = app.FeatureEngine(np.float64).extract(sample_emails)
+    rounded = app.FeatureEngine(np.float32).extract(sample_emails)
+    assert rounded.dtype == np.float32
+    assert np.array_equal(rounded, exact.astype(np.float32))
+
+
+def test_precomputed_analyses(sample_emails):
+    analyses = [app.EmailAnalysis(email_text) for email_text in sample_emails]
+    engine = app.FeatureEngine(np.float64, chunk_size=3)
+    assert np.array_equal(engine.extract(sample_emails, analyses), engine.extract(sample_emails))
+
+
+def test_single_email_buffer_is_per_thread(sample_emails):
+    engine = app.FeatureEngine()
+    first = engine.extract(sample_emails[:1], reuse_row=True)
+    assert engine.extract(sample_emails[1:2], reuse_row=True) is first
+    other = []
+    thread = threading.Thread(target=lambda: other.append(engine.extract(sample_emails[:1], reuse_row=True)))
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+
+
+def test_public_results_are_not_shared(models, sample_emails):
+    first = app.extract_enhanced_email_features(sample_emails[:1])
+    expected = first.copy()
+    second = app.extract_enhanced_email_features(sample_emails[-1:])
+    _, additional_features = app.process_email_enhanced(sample_emails[-1])
+    assert second is not first and additional_features is not second
+    assert np.array_equal(first, expected)
+
+
+def test_empty_batch():
+    assert app.extract_enhanced_email_features([]).shape == (0, len(app.ENHANCED_FEATURES))
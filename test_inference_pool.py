@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded inference pool and the 503 the endpoints answer when it is full
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def full_pool(monkeypatch):
+    """A one-worker pool with no queue, kept busy by a job that waits until the test ends"""
+    pool = app.InferencePool("thread", workers=1, queue_size=0)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocked_job():
+        started.set()
+        release.wait(10)
+
+    runner = threading.Thread(target=lambda: asyncio.run(pool.run(blocked_job)))
+    runner.start()
+    started.wait(10)
+    monkeypatch.setattr(app, 'INFERENCE_POOL', pool)
+    yield pool
+    release.set()
+    runner.join()
+    pool.shutdown()
+
+
+def test_full_pool_rejects_calls(full_pool):
+    assert full_pool.in_flight == 1
+    with pytest.raises(app.InferenceQueueFull):
+        asyncio.run(full_pool.run(len, "never runs"))
+    assert full_pool.in_flight == 1
+
+
+def test_endpoints_answer_503_when_the_pool_is_full(client, full_pool):
+    # Texts no earlier test scored, so the verdict cache cannot answer them
+    email_text = "Queue test: please review the attached quarterly figures before Friday."
+    for response in (client.post("/predict", json={"email": email_text}),
+                     client.post("/predict_batch", json={"emails": [email_text, email_text + " Thanks!"]}),
+                     client.post("/check_sender", json={"email": email_text})):
+        assert response.status_code == 503
+        assert response.json() == {"error": "Inference queue full (1 requests in flight)"}
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Differential tests for the keyword matcher against the per-term regexes and
+``in`` scans it replaced
+"""
+
+import functools
+import random
+import re
+
+import app
+from conftest import assert_matches_legacy
+from keyword_matcher import KeywordMatcher
+
+
+def legacy_business_indicators(email_lower):
+    return sum([1 for term in app.LEGITIMATE_BUSINESS_TERMS
+                if re.search(r'\b' + re.escape(term) + r'\b', email_lower)])
+
+
+def legacy_first_term(main_domain, terms):
+    for index, term in enumerate(terms):
+        if term in main_domain:
+            return index
+    return -1
+
+
+def random_text(rng, terms):
+    fragments = terms + ['thank', 'you', 'orders', 'x', '_', '-', '.', '1', 'é', 'ſ']
+    separators = [' ', '  ', '\n', '', '', ',', '_', '-']
+    return ''.join(rng.choice(fragments) + rng.choice(separators) for _ in range(rng.randint(0, 20)))
+
+
+def test_words_match_legacy_regexes(sample_emails):
+    rng = random.Random(0)
+    terms = sorted(app.LEGITIMATE_BUSINESS_TERMS)
+    texts = [email_text.lower() for email_text in sample_emails] + [random_text(rng, terms) for _ in range(5000)]
+    assert_matches_legacy(lambda text: len(app.LEGITIMATE_TERM_MATCHER.words_in(text)), legacy_business_indicators,
+                          texts + ['', 'thank  you', 'thank you_', 'thank-you', 'Order', 'orders order'])
+
+
+def test_first_index_matches_legacy_scan():
+    rng = random.Random(0)
+    terms = app.DOMAIN_BUSINESS_TERMS
+    labels = [''.join(rng.choice(terms + ['x', 'e', 'c', '-', '1']) for _ in range(rng.randint(0, 4)))
+              for _ in range(5000)]
+    assert_matches_legacy(app.DOMAIN_TERM_MATCHER.first_index,
+                          functools.partial(legacy_first_term, terms=terms), labels)
+
+
+def test_phrases_and_punctuation():
+    matcher = KeywordMatcher(['thank you', 'c++', 'e-mail', 'team'])
+    assert matcher.words_in('thank you for the e-mail, team') == ['thank you', 'e-mail', 'team']
+    assert matcher.words_in('thank youth, e-mails, teams, c++ ') == []
+    assert matcher.words_in('c++x') == ['c++']  # \b between "+" and "x", as the regex has it
+
+
+def test_phrases_sharing_a_first_word():
+    matcher = KeywordMatcher(['thank you all', 'you', 'thank you', 'thank', '--'])
+    assert matcher.phrase_terms.keys() == {'thank'}
+    assert matcher.words_in('thank you all') == ['thank you all', 'you', 'thank you', 'thank']
+    assert matcher.words_in('you all, thank') == ['you', 'thank']
+    assert matcher.words_in('a--b -- c') == ['--']
+
+
+def test_first_index_prefers_list_order():
+    matcher = KeywordMatcher(['services', 'service', 'app'])
+    assert matcher.first_index('appservices') == 0
+    assert matcher.first_index('appservice') == 1
+    assert matcher.first_index('web') == -1
+
+
+def test_first_index_with_overlapping_terms():
+    rng = random.Random(1)
+    for _ in range(300):
+        matcher = KeywordMatcher([''.join(rng.choice('abc') for _ in range(rng.randint(1, 4)))
+                                  for _ in range(rng.randint(1, 8))])
+        texts = [''.join(rng.choice('abcd') for _ in range(rng.randint(0, 10))) for _ in range(50)]
+        assert_matches_legacy(matcher.first_index, functools.partial(legacy_first_term, terms=matcher.terms), texts)
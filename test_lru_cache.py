@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for the LRU cache behind the domain score memo
+"""
+
+import app
+from app import LRUCache
+
+
+def test_least_recently_used_is_evicted_first():
+    cache = LRUCache(3)
+    for key in 'abc':
+        cache.put(key, key.upper())
+    assert cache.get('a') == 'A'  # 'b' is now least recently used
+    cache.put('d', 'D')
+    cache.put('c', 'C2')  # overwriting refreshes 'c'
+    cache.put('e', 'E')
+    assert [key for key, _, _ in cache.items()] == ['d', 'c', 'e']
+    assert cache.get('b') is None and cache.get('a', 'missing') == 'missing'
+    assert cache.evictions == 2
+
+
+def test_counters_and_hit_rate():
+    cache = LRUCache(1)
+    cache.put('a', 1)
+    cache.get('a')
+    cache.get('a')
+    cache.get('b')
+    cache.put('b', 2)
+    assert cache.stats() == {"capacity": 1, "size": 1, "hits": 2, "misses": 1, "evictions": 1,
+                             "expirations": 0, "hit_rate": 0.6667}
+    cache.reset_stats()
+    assert cache.stats()["hits"] == cache.stats()["evictions"] == 0
+    assert cache.stats()["hit_rate"] == 0.0 and len(cache) == 1
+
+
+def test_zero_capacity_stores_nothing():
+    cache = LRUCache(0)
+    cache.put('a', 1)
+    assert cache.get('a') is None and len(cache) == 0 and cache.evictions == 0
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = LRUCache(10, ttl=60)
+    cache.put('a', 1)
+    cache.put('b', 2, expires_at=clock.now + 600)
+    clock.now += 59
+    assert cache.get('a') == 1
+    clock.now += 1
+    assert cache.get('a') is None and cache.get('b') == 2
+    assert (cache.hits, cache.misses, cache.expirations, len(cache)) == (2, 1, 1, 1)
+
+
+def test_domain_scores_are_memoized(monkeypatch):
+    monkeypatch.setattr(app, 'DOMAIN_SCORE_CACHE', LRUCache(10))
+    first = app.calculate_domain_legitimacy_score('mail.example-store.com')
+    first[1].append('caller mutation')
+    second = app.calculate_domain_legitimacy_score('mail.example-store.com')
+    assert second == app._score_domain_legitimacy('mail.example-store.com')
+    assert (app.DOMAIN_SCORE_CACHE.hits, app.DOMAIN_SCORE_CACHE.misses) == (1, 1)
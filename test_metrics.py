@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for the Prometheus metrics, their /metrics endpoint and the replay of
+metrics recorded in the process inference pool
+"""
+
+import asyncio
+
+import pytest
+
+import app
+import metrics
+
+
+def histogram_count(histogram, *labelvalues):
+    return sum(histogram.labels(*labelvalues).bucket_counts)
+
+
+def test_render_text_format():
+    counter = metrics.Counter("test_render_emails", "Emails seen", ["kind"])
+    gauge = metrics.Gauge("test_render_queue", "Queued emails")
+    histogram = metrics.Histogram("test_render_seconds", "Scan time", buckets=(0.5, 0.1))
+    try:
+        counter.labels("spam").inc()
+        counter.labels("ham").inc(2.5)
+        gauge.set_function(lambda: 3)
+        for value in (0.05, 0.1, 0.7):
+            histogram.observe(value)
+        assert counter.render() == '\n'.join([
+            '# HELP test_render_emails Emails seen',
+            '# TYPE test_render_emails counter',
+            'test_render_emails_total{kind="ham"} 2.5',
+            'test_render_emails_total{kind="spam"} 1',
+        ])
+        assert gauge.render().splitlines()[-1] == 'test_render_queue 3'
+        assert histogram.render().splitlines()[2:] == [
+            'test_render_seconds_bucket{le="0.1"} 2',
+            'test_render_seconds_bucket{le="0.5"} 2',
+            'test_render_seconds_bucket{le="+Inf"} 3',
+            'test_render_seconds_sum 0.85',
+            'test_render_seconds_count 3',
+        ]
+        with pytest.raises(ValueError):
+            metrics.Counter("test_render_emails", "Duplicate")
+        with pytest.raises(ValueError):
+            counter.labels("spam", "extra")
+    finally:
+        for metric in (counter, gauge, histogram):
+            del metrics.REGISTRY[metric.name]
+
+
+def test_captured_samples_are_recorded_on_replay():
+    counter = metrics.Counter("test_capture_emails", "Emails seen", ["kind"])
+    histogram = metrics.Histogram("test_capture_seconds", "Scan time")
+    try:
+        counter.labels("spam").inc()
+        with metrics.capture() as samples:
+            counter.labels("spam").inc(2)
+            histogram.observe(0.2)
+        assert counter.labels("spam").value == 1 and histogram_count(histogram) == 0
+        assert samples == [("test_capture_emails", ("spam",), 2), ("test_capture_seconds", (), 0.2)]
+        metrics.replay(samples)
+        assert counter.labels("spam").value == 3 and histogram.labels().sum == 0.2
+    finally:
+        del metrics.REGISTRY[counter.name], metrics.REGISTRY[histogram.name]
+
+
+def test_process_pool_metrics_are_replayed(models, sample_emails):
+    pool = app.InferencePool("process", workers=1)
+    before = histogram_count(app.STAGE_SECONDS, "domain_scoring")
+    try:
+        result = asyncio.run(pool.run(app.score_email, sample_emails[0]))
+    finally:
+        pool.shutdown()
+    assert result["prediction"] in ("Safe Email", "Phishing Email")
+    assert histogram_count(app.STAGE_SECONDS, "domain_scoring") == before + 1
+
+
+def test_metrics_endpoint(client, sample_emails):
+    assert client.post("/predict", json={"email": sample_emails[-1]}).status_code == 200
+    assert client.post("/predict_batch", json={"emails": sample_emails[:2]}).status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    for metric in ("phishing_stage_seconds", "phishing_request_seconds", "phishing_verdicts",
+                   "phishing_model_ready"):
+        assert f"# TYPE {metric} " + metrics.REGISTRY[metric].kind in lines
+    assert "phishing_model_ready 1" in lines
+    assert any(line.startswith('phishing_request_seconds_count{endpoint="/predict"} ') for line in lines)
+    assert any(line.startswith('phishing_request_seconds_count{endpoint="/predict_batch"} ') for line in lines)
+    assert any(line.startswith('phishing_stage_seconds_bucket{stage="domain_scoring",le="+Inf"} ')
+               for line in lines)
+    assert any(line.startswith('phishing_verdicts_total{endpoint="/predict_batch",') for line in lines)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Parity tests for the array-based ensemble evaluator and the exported artifact format
+"""
+
+import os
+import pickle
+
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix, hstack
+
+from app import extract_enhanced_email_features
+from conftest import PublicOnly
+from model_artifacts import (ArrayEnsemble, ArrayTfidfVectorizer, export_model_artifacts, flatten_ensemble,
+                             load_model_artifacts, prune_vocabulary)
+
+
+@pytest.fixture(scope='module')
+def emails(sample_emails):
+    return sample_emails + [
+        "",
+        "URGENT: verify your password at http://secure-login.tk/confirm to claim your $1,000 prize",
+        "From: team@github.com\nThank you for your order. Your invoice is attached.",
+    ]
+
+
+@pytest.fixture(scope='module')
+def sklearn_vectorizer(backend_dir):
+    with open(os.path.join(backend_dir, 'vectorizer.pkl'), 'rb') as vectorizer_file:
+        return pickle.load(vectorizer_file)
+
+
+@pytest.fixture(scope='module')
+def email_features(sklearn_vectorizer, emails):
+    return hstack([sklearn_vectorizer.transform(emails),
+                   extract_enhanced_email_features(emails)]).tocsr()
+
+
+def assert_same_outputs(ensemble, sklearn_model, X):
+    np.testing.assert_array_equal(ensemble.decision_function(X), sklearn_model.decision_function(X))
+    np.testing.assert_array_equal(ensemble.predict_proba(X), sklearn_model.predict_proba(X))
+    np.testing.assert_array_equal(ensemble.predict(X), sklearn_model.predict(X))
+
+
+def test_matches_sklearn_on_emails(sklearn_model, email_features):
+    assert_same_outputs(ArrayEnsemble.from_model(sklearn_model), sklearn_model, email_features)
+
+
+def test_single_rows_match_batch(sklearn_model, email_features):
+    ensemble = ArrayEnsemble.from_model(sklearn_model)
+    batch = ensemble.predict_proba(email_features)
+    for i in range(email_features.shape[0]):
+        np.testing.assert_array_equal(ensemble.predict_proba(email_features[i]), batch[i:i + 1])
+
+
+def test_matches_sklearn_at_split_thresholds(sklearn_model):
+    # Values at and right around the split thresholds exercise the float32 casting
+    # and the <= comparison on both sides of every split
+    ensemble = ArrayEnsemble.from_model(sklearn_model)
+    rng = np.random.default_rng(0)
+    thresholds = ensemble.threshold[ensemble.left != np.arange(len(ensemble.left))]
+    candidates = np.concatenate([thresholds, np.nextafter(thresholds, np.inf),
+                                 np.nextafter(thresholds, -np.inf), [0.0]])
+
+    X = np.zeros((64, sklearn_model.n_features_in_))
+    columns = rng.choice(ensemble.used_features, size=(64, 40))
+    X[np.arange(64)[:, None], columns] = rng.choice(candidates, size=(64, 40))
+
+    assert_same_outputs(ensemble, sklearn_model, X)
+    assert_same_outputs(ensemble, sklearn_model, csr_matrix(X))
+    assert_same_outputs(ensemble, sklearn_model, X[:1])
+
+
+def test_exported_artifacts_round_trip(tmp_path, sklearn_model, sklearn_vectorizer, emails):
+    artifact_dir = str(tmp_path / 'model_artifacts')
+    manifest = export_model_artifacts(sklearn_model, sklearn_vectorizer, artifact_dir, prune=False)
+    model, vectorizer, loaded_manifest = load_model_artifacts(artifact_dir)
+    assert loaded_manifest == manifest
+
+    tfidf = vectorizer.transform(emails)
+    expected_tfidf = sklearn_vectorizer.transform(emails)
+    np.testing.assert_array_equal(tfidf.indptr, expected_tfidf.indptr)
+    np.testing.assert_array_equal(tfidf.indices, expected_tfidf.indices)
+    np.testing.assert_array_equal(tfidf.data, expected_tfidf.data)
+
+    X = hstack([tfidf, extract_enhanced_email_features(emails)]).tocsr()
+    assert_same_outputs(model, sklearn_model, X)
+
+
+def test_pruned_vocabulary_keeps_predictions(tmp_path, sklearn_model, sklearn_vectorizer, emails):
+    model, vectorizer = prune_vocabulary(ArrayEnsemble.from_model(sklearn_model),
+                                         ArrayTfidfVectorizer.from_vectorizer(sklearn_vectorizer))
+    assert vectorizer.n_columns < len(sklearn_vectorizer.vocabulary_)
+    assert model.n_features_in_ < sklearn_model.n_features_in_
+
+    # Kept columns hold exactly the values of the full transform
+    kept_terms = np.flatnonzero(vectorizer.term_columns >= 0)
+    tfidf = vectorizer.transform(emails)
+    np.testing.assert_array_equal(tfidf.toarray(),
+                                  sklearn_vectorizer.transform(emails)[:, kept_terms].toarray())
+
+    extra_features = extract_enhanced_email_features(emails)
+    X_full = hstack([sklearn_vectorizer.transform(emails), extra_features]).tocsr()
+    X_pruned = hstack([tfidf, extra_features]).tocsr()
+    np.testing.assert_array_equal(model.decision_function(X_pruned), sklearn_model.decision_function(X_full))
+    np.testing.assert_array_equal(model.predict(X_pruned), sklearn_model.predict(X_full))
+
+    # Pruning twice changes nothing, and the pruned export loads back the same way
+    repruned_model, repruned_vectorizer = prune_vocabulary(model, vectorizer)
+    np.testing.assert_array_equal(repruned_vectorizer.term_columns, vectorizer.term_columns)
+    np.testing.assert_array_equal(repruned_model.used_features, model.used_features)
+
+    artifact_dir = str(tmp_path / 'model_artifacts')
+    export_model_artifacts(sklearn_model, sklearn_vectorizer, artifact_dir)
+    loaded_model, loaded_vectorizer, manifest = load_model_artifacts(artifact_dir)
+    assert manifest['output_terms'] == vectorizer.n_columns
+    np.testing.assert_array_equal(loaded_vectorizer.transform(emails).toarray(), tfidf.toarray())
+    np.testing.assert_array_equal(loaded_model.predict_proba(X_pruned), sklearn_model.predict_proba(X_full))
+
+
+def test_corrupted_artifacts_are_rejected(tmp_path, sklearn_model, sklearn_vectorizer):
+    artifact_dir = str(tmp_path / 'model_artifacts')
+    export_model_artifacts(sklearn_model, sklearn_vectorizer, artifact_dir)
+    with open(os.path.join(artifact_dir, 'threshold.npy'), 'r+b') as threshold_file:
+        threshold_file.seek(-1, os.SEEK_END)
+        last_byte = threshold_file.read(1)[0]
+        threshold_file.seek(-1, os.SEEK_END)
+        threshold_file.write(bytes([last_byte ^ 0xFF]))
+
+    with pytest.raises(ValueError, match='Checksum mismatch'):
+        load_model_artifacts(artifact_dir)
+
+
+def test_initial_predictions_without_private_helpers(sklearn_model, email_features):
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    np.testing.assert_array_equal(flatten_ensemble(PublicOnly(sklearn_model))['init_raw'],
+                                  flatten_ensemble(sklearn_model)['init_raw'])
+    assert_same_outputs(ArrayEnsemble.from_model(PublicOnly(sklearn_model)), sklearn_model, email_features)
+
+    # Binary and multiclass, with prior and zero initial predictions
+    X = np.random.RandomState(0).rand(60, 4)
+    for y in (X[:, 0] > 0.3, (X[:, 1] * 3).astype(int)):
+        for init in (None, 'zero'):
+            model = GradientBoostingClassifier(n_estimators=3, max_depth=2, init=init, random_state=0).fit(X, y)
+            np.testing.assert_array_equal(flatten_ensemble(PublicOnly(model))['init_raw'],
+                                          flatten_ensemble(model)['init_raw'])
+            assert_same_outputs(ArrayEnsemble.from_model(PublicOnly(model)), model, X)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests for loading the models in the background while the server already answers
+"""
+
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+
+
+@pytest.fixture
+def loading(models, monkeypatch):
+    """The models are loaded, but the service reports them as still loading"""
+    monkeypatch.setattr(app, 'MODELS_READY', threading.Event())
+    monkeypatch.setitem(app.MODEL_STATE, 'status', 'loading')
+
+
+def test_only_model_endpoints_wait_for_the_models(loading, sample_emails):
+    client = TestClient(app.app)
+    assert client.get("/health").status_code == 200
+    assert client.get("/ready").status_code == 503
+    assert client.get("/model_info").status_code == 503
+    for response in (client.post("/predict", json={"email": sample_emails[0]}),
+                     client.post("/predict_batch", json={"emails": sample_emails[:2]}),
+                     client.post("/predict_stream", content='{"email": "hello"}\n')):
+        assert response.status_code == 503
+        assert response.json()["model_status"] == "loading"
+    assert client.post("/check_sender", json={"email": sample_emails[0]}).status_code == 200
+
+
+def test_process_pool_forks_only_once_models_are_ready(loading, sample_emails):
+    pool = app.InferencePool("process", workers=1)
+    try:
+        asyncio.run(pool.run(app.check_sender, sample_emails[0]))
+        assert pool._process_executor is None
+        app.MODELS_READY.set()
+        result = asyncio.run(pool.run(app.score_email, sample_emails[-1]))
+        assert pool._process_executor is not None
+    finally:
+        pool.shutdown()
+    assert result == app.score_email(sample_emails[-1])
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Differential tests for the multi-pattern scanner against one ``re.findall`` per
+pattern
+"""
+
+import functools
+import random
+import re
+
+import app
+from app import MultiPatternScanner
+from conftest import assert_matches_legacy
+
+LANGUAGE_FAMILIES = {
+    'urgency': app.PHISHING_URGENT_PATTERNS,
+    'money': app.PHISHING_MONEY_PATTERNS,
+    'credential': app.PHISHING_CREDENTIAL_PATTERNS,
+}
+URL_FAMILIES = {'suspicious_url': app.SUSPICIOUS_URL_PATTERNS}
+
+FRAGMENTS = ['urgent', 'act now', 'account suspended', 'verify now', 'verify your account', 'click here now',
+             'click to verify', 'final notice', 'security alert', '$1,000.00 prize', '$5 refund', 'claim your',
+             'you have won', 'congratulations', 'winner', 'lottery', 'transfer', 'million', 'billion dollars',
+             'bitcoin', 'investment', 'confirm', 'update', 'password', 'credit card', 'details', 'enter your',
+             'pin', 'http://', 'https://', 'secure-', 'login-', 'verify.net', 'account.org', '.tk/', '.com/',
+             '.info/', 'bit.ly', 'tinyurl', 't.co', '192.168.0.1', '10.0.0.', '/', '.', '?', 'x', 'é']
+
+ADVERSARIAL_TEXTS = [
+    # Overlapping and adjacent matches
+    'urgent urgent urgenturgent act now act now',
+    'verify your account verify now verify immediately',
+    'click here now click to verify click to confirm',
+    '1.2.3.4.5.6.7.8.9 and 255.255.255.2555',
+    'bit.lybit.ly t.cot.co goo.gl.goo.gl',
+    'http://verify.net/http://account.org/http://login.info/',
+    'https://secure-https://verify-bank.com/',
+    # Long URL matches, past the scanner's first match window
+    'http://example.com?ref=' + 'x' * 300 + '... mirror.tk/',
+    'https://' + 'a' * 1000 + 'security' + 'b' * 1000 + '.org/',
+    'http://login-' + 'c' * 600 + '.com/ and http://' + 'd.' * 400 + 'xyz/',
+    'congratulations' + ' ' * 45 + 'winner congratulations' + ' ' * 55 + 'winner',
+]
+
+
+def family_counts(families, text, flags=0):
+    return {family: sum(len(re.findall(pattern, text, flags)) for pattern in patterns)
+            for family, patterns in families.items()}
+
+
+def random_text(rng):
+    separators = [' ', '', '', '\n', '/', '.']
+    return ''.join(rng.choice(FRAGMENTS) + rng.choice(separators) for _ in range(rng.randint(0, 30)))
+
+
+def scan_texts(sample_emails):
+    rng = random.Random(0)
+    return sample_emails + ADVERSARIAL_TEXTS + [random_text(rng) for _ in range(3000)]
+
+
+def budgeted_scan(scanner, text):
+    budget = app.ScanBudget(time_budget_ms=10000)
+    with budget:
+        counts = scanner.scan(text, budget, 'test')
+    assert not budget.degraded
+    return counts
+
+
+def test_language_patterns_match_findall(sample_emails):
+    texts = [text.lower() for text in scan_texts(sample_emails)]
+    legacy = functools.partial(family_counts, LANGUAGE_FAMILIES)
+    assert_matches_legacy(app.PHISHING_LANGUAGE_SCANNER.scan, legacy, texts)
+    assert_matches_legacy(functools.partial(budgeted_scan, app.PHISHING_LANGUAGE_SCANNER), legacy, texts)
+
+
+def test_url_patterns_match_findall(sample_emails):
+    texts = scan_texts(sample_emails)
+    legacy = functools.partial(family_counts, URL_FAMILIES, flags=re.IGNORECASE)
+    assert_matches_legacy(app.SUSPICIOUS_URL_SCANNER.scan, legacy, texts)
+    assert_matches_legacy(functools.partial(budgeted_scan, app.SUSPICIOUS_URL_SCANNER), legacy, texts)
+
+
+def test_patterns_without_long_prefixes_use_findall():
+    scanner = MultiPatternScanner({'digits': [r'\d+', r'[0-9]{1,3}\.'], 'words': [r'ab', r'x+y']})
+    assert [pattern.pattern for pattern, _ in scanner.findall_patterns] == [r'\d+', r'[0-9]{1,3}\.', r'x+y']
+    assert scanner.scan('ab12 ab 3 1.2. xxy') == {'digits': 6, 'words': 3}
+    assert MultiPatternScanner({'digits': [r'\d+']}).trigger is None
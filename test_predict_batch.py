@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Tests for the batch endpoint /predict_batch
+"""
+
+import app
+
+
+def test_results_come_back_in_order(client, sample_emails, model_path_emails):
+    emails = model_path_emails + sample_emails + model_path_emails[::-1]
+    response = client.post("/predict_batch", json={"emails": emails})
+    assert response.status_code == 200
+    assert response.json() == {"results": [app.score_email(email_text) for email_text in emails]}
+
+
+def test_labels_only(client, sample_emails, model_path_emails):
+    emails = sample_emails + model_path_emails
+    response = client.post("/predict_batch?labels_only=true", json={"emails": emails})
+    assert response.status_code == 200
+    assert response.json() == {"results": [app.label_only_response(app.score_email(email_text))
+                                           for email_text in emails]}
+
+
+def test_empty_batch(client):
+    assert client.post("/predict_batch", json={"emails": []}).json() == {"results": []}
+
+
+def test_oversized_batch_is_rejected(client, monkeypatch, sample_emails):
+    monkeypatch.setattr(app, 'MAX_BATCH_SIZE', 3)
+    assert client.post("/predict_batch", json={"emails": sample_emails[:3]}).status_code == 200
+    response = client.post("/predict_batch", json={"emails": sample_emails[:4]})
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Batch too large: 4 emails (limit 3)"}
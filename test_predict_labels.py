@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Tests for the single ensemble evaluation behind labels and probabilities
+"""
+
+import os
+import pickle
+
+import numpy as np
+import pytest
+from scipy.sparse import hstack
+
+import app
+from conftest import PublicOnly
+
+
+@pytest.fixture(scope='module')
+def email_features(backend_dir, sample_emails):
+    with open(os.path.join(backend_dir, 'vectorizer.pkl'), 'rb') as vectorizer_file:
+        vectorizer = pickle.load(vectorizer_file)
+    return hstack([vectorizer.transform(sample_emails),
+                   app.extract_enhanced_email_features(sample_emails)]).tocsr()
+
+
+def assert_matches_sklearn(model, X):
+    labels, proba = app.predict_labels_and_proba(X)
+    np.testing.assert_array_equal(labels, model.predict(X))
+    np.testing.assert_array_equal(proba, model.predict_proba(X))
+    labels_only, no_proba = app.predict_labels_and_proba(X, labels_only=True)
+    np.testing.assert_array_equal(labels_only, labels)
+    assert no_proba is None
+
+
+def test_matches_sklearn(monkeypatch, sklearn_model, email_features):
+    monkeypatch.setattr(app, 'model', sklearn_model)
+    assert_matches_sklearn(sklearn_model, email_features)
+
+
+def test_falls_back_without_private_loss(monkeypatch, sklearn_model, email_features):
+    assert not hasattr(PublicOnly(sklearn_model), '_loss')
+    monkeypatch.setattr(app, 'model', PublicOnly(sklearn_model))
+    assert_matches_sklearn(sklearn_model, email_features)
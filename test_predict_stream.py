@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the NDJSON streaming endpoint /predict_stream
+"""
+
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.routing import Route
+
+import app
+
+
+class ChunkedRequest:
+    """Stands in for a Request whose body arrives in ``chunks``, failing after them with ``error``"""
+
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+        if self.error is not None:
+            raise self.error
+
+
+def read_lines(chunks, error=None):
+    async def read():
+        lines = asyncio.Queue()
+        await app.read_ndjson_lines(ChunkedRequest(chunks, error), lines)
+        return [lines.get_nowait() for _ in range(lines.qsize())]
+    return asyncio.run(read())
+
+
+def ndjson(lines):
+    return [json.loads(line) for line in lines.splitlines()]
+
+
+def test_lines_split_across_chunks():
+    assert read_lines([b'{"a"', b': 1}\n{"b": 2}\n{', b'"c": 3}']) == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}', None]
+    assert read_lines([b'{"a": 1}\r\n', b'{"b": 2}\n']) == [b'{"a": 1}\r', b'{"b": 2}', None]
+
+
+def test_blank_lines_are_skipped():
+    assert read_lines([b'\n\n  \n{"a": 1}\n\n', b'\t\n', b'{"b": 2}\n  ']) == [b'{"a": 1}', b'{"b": 2}', None]
+    assert read_lines([]) == [None]
+
+
+def test_oversized_lines_become_errors(monkeypatch):
+    monkeypatch.setattr(app, 'MAX_STREAM_LINE_BYTES', 8)
+    lines = read_lines([b'{"a": 1}\n{"b": "', b'long"}\n{"c": 3}\n', b'0123456789'])
+    assert lines[0] == b'{"a": 1}' and lines[2] == b'{"c": 3}' and lines[-1] is None
+    assert [str(line) for line in (lines[1], lines[3])] == ["Line longer than 8 bytes"] * 2
+
+
+def test_body_failure_ends_the_stream():
+    lines = read_lines([b'{"a": 1}\n{"b"'], OSError("disconnected"))
+    assert lines[0] == b'{"a": 1}' and lines[-1] is None
+    assert str(lines[1]) == "Request body failed: disconnected"
+
+
+def test_verdicts_stream_back_in_order(client, monkeypatch, sample_emails, model_path_emails):
+    monkeypatch.setattr(app, 'STREAM_BATCH_SIZE', 3)
+    emails = sample_emails + model_path_emails
+    body = ''.join(json.dumps({"id": i, "email": email_text}) + '\n' for i, email_text in enumerate(emails))
+    # Chunk boundaries fall inside lines
+    chunks = [body[start:start + 50].encode() for start in range(0, len(body), 50)]
+    response = client.post("/predict_stream", content=iter(chunks))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    results = ndjson(response.text)
+    assert [result.pop("id") for result in results] == list(range(len(emails)))
+    assert results == [app.score_email(email_text) for email_text in emails]
+
+
+def test_malformed_lines_do_not_end_the_stream(client, sample_emails):
+    body = '\n'.join([
+        json.dumps({"id": "first", "email": sample_emails[0]}),
+        '{"email": ',
+        '',
+        '["not", "an", "object"]',
+        json.dumps({"id": 4}),
+        json.dumps({"email": sample_emails[-1]}),
+    ])
+    results = ndjson(client.post("/predict_stream", content=body.encode()).text)
+    assert len(results) == 5
+    assert results[0]["id"] == "first" and "prediction" in results[0]
+    assert results[1]["error"].startswith("Invalid line: Expecting value")
+    assert results[2] == {"error": "Invalid line: Expected a JSON object with an \"email\" field"}
+    assert results[3]["id"] == 4 and results[3]["error"].startswith("Invalid line:")
+    assert results[4] == app.score_email(sample_emails[-1])
+
+
+def test_duplex_response_reads_the_body_while_streaming():
+    async def echo(request: Request):
+        async def lines():
+            async for chunk in request.stream():
+                if chunk:
+                    yield chunk.upper()
+        return app.DuplexStreamingResponse(lines())
+
+    client = TestClient(Starlette(routes=[Route("/echo", echo, methods=["POST"])]))
+    response = client.post("/echo", content=iter([b'one\n', b'two\n', b'three\n']))
+    assert response.text == 'ONE\nTWO\nTHREE\n'
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-request profiling mode
+"""
+
+import app
+
+MODEL_EMAIL = "URGENT: your account suspended. Verify now at http://secure-login.tk/ to claim your $500 refund"
+
+
+def test_profile_has_a_span_per_stage_and_pattern_family(client):
+    response = client.post("/predict?profile=true", json={"email": MODEL_EMAIL})
+    result = response.json()
+    profile = result.pop("profile")
+    assert result == app.score_email(MODEL_EMAIL)
+    stages = [span["stage"] for span in profile["spans"]]
+    for stage in ("extract_domain_from_email", "calculate_domain_legitimacy_score", "urgency_patterns",
+                  "money_patterns", "credential_patterns", "suspicious_url_patterns",
+                  "extract_enhanced_email_features", "tfidf_transform", "model_inference"):
+        assert stage in stages
+    assert all(span["ms"] >= 0 for span in profile["spans"]) and profile["total_ms"] > 0
+
+
+def test_profiled_features_match_the_single_pass(client, sample_emails):
+    for email_text in sample_emails + [MODEL_EMAIL]:
+        expected = app.extract_enhanced_email_features([email_text])
+        profiled, _ = app.run_profiled(lambda text: app.extract_enhanced_email_features([text]),
+                                       email_text, 'timings')
+        assert (profiled == expected).all(), email_text
+
+
+def test_profiling_is_opt_in(client):
+    assert "profile" not in client.post("/predict", json={"email": MODEL_EMAIL}).json()
+    assert "profile" not in client.post("/predict?profile=false", json={"email": MODEL_EMAIL}).json()
+    assert "profile" in client.post("/predict", json={"email": MODEL_EMAIL}, headers={"X-Profile": "true"}).json()
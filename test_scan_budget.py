@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-email scan budgets
+"""
+
+import gc
+import re
+import time
+
+import pytest
+
+import app
+
+
+def test_garbage_collection_is_not_charged():
+    budget = app.ScanBudget(time_budget_ms=1)
+    garbage = [[] for _ in range(500000)]
+    with budget:
+        started = time.thread_time()
+        gc.collect()
+        collection = time.thread_time() - started
+    del garbage
+    if collection < budget.time_budget:
+        pytest.skip("garbage collection was faster than the budget")
+    assert not budget.exhausted("test") and not budget.degraded
+
+
+def test_repeated_batches_are_not_degraded(models, sample_emails, model_path_emails):
+    batch = (sample_emails + model_path_emails) * 50
+    first = app.score_emails(batch)
+    for _ in range(3):
+        results = app.score_emails(batch)
+        assert not [result for result in results if result.get("degraded")]
+        assert results == first
+
+
+def newsletter(size):
+    items = ['Spring collection', 'Garden tools', 'Running shoes', 'Coffee beans', 'Desk lamps', 'Rain jackets']
+    paragraphs = []
+    for i in range(size // 400):
+        item = items[i % len(items)]
+        slug = item.lower().replace(' ', '-')
+        paragraphs.append(
+            f"{item} now from ${5 + i % 495}.{10 + i % 90} - read more at "
+            f"https://www.example-shop.com/catalog/{slug}/{1000 + i}?utm_source=newsletter&utm_medium=email "
+            f"Our team has updated the {item.lower()} range with {2 + i % 38} new products, shipping within "
+            f"{1 + i % 5} days to over 120 countries. Version 2.{i % 10} of our app makes tracking easy. "
+            f"Call 555-{1000 + i % 9000} or visit https://help.example-shop.com/faq for answers. "
+            f"Thank you for shopping with us!\n\n")
+    return ("From: news@example-shop.com\nSubject: This week's offers\n\n" + ''.join(paragraphs)
+            + "Unsubscribe: https://www.example-shop.com/unsubscribe\n")
+
+
+def test_long_benign_email_is_not_degraded(models, monkeypatch):
+    email_text = newsletter(90000)
+    budgeted = app.score_email(email_text)
+    assert not budgeted.get('degraded'), budgeted.get('degraded_reasons')
+    monkeypatch.setattr(app, 'BUDGETED_SCANNING', False)
+    assert budgeted == app.score_email(email_text)
+
+
+def findall_count(patterns, text, flags=0):
+    return sum(len(re.findall(pattern, text, flags)) for pattern in patterns)
+
+
+def test_long_matches_are_not_clamped():
+    text = 'http://example.com?ref=' + 'x' * 300 + '... mirror.tk/'
+    budget = app.new_scan_budget()
+    with budget:
+        counts = app.SUSPICIOUS_URL_SCANNER.scan(text, budget, 'suspicious_url_patterns')
+    assert counts['suspicious_url'] == findall_count(app.SUSPICIOUS_URL_PATTERNS, text, re.IGNORECASE) == 1
+    assert not budget.degraded
+
+
+def test_backtracking_match_is_cut_short():
+    text = 'http://' + 'verify.net ' * 8000
+    budget = app.ScanBudget(time_budget_ms=20)
+    with budget:
+        app.SUSPICIOUS_URL_SCANNER.scan(text, budget, 'suspicious_url_patterns')
+    assert budget.cut_short == ['suspicious_url_patterns']
+    assert budget.used < 1
+
+
+def test_byte_cap_keeps_whole_characters():
+    budget = app.ScanBudget(max_bytes=11)
+    assert budget.limit('é' * 10) == 'é' * 5
+    assert budget.exceeded == ['bytes'] and budget.degraded
+
+
+def test_token_cap_cuts_long_runs_only():
+    budget = app.ScanBudget(max_token_chars=4)
+    assert budget.limit('abcdefgh ij\nklmnop') == 'abcd ij\nklmn'
+    assert budget.exceeded == ['tokens']
+    assert app.ScanBudget(max_token_chars=4).limit('abcd ij') == 'abcd ij'
+
+
+def test_oversized_email_is_degraded(models, monkeypatch, sample_emails):
+    monkeypatch.setattr(app, 'SCAN_MAX_BYTES', 2048)
+    monkeypatch.setattr(app, 'SCAN_MAX_TOKEN_CHARS', 64)
+    result = app.score_email('x' * 100 + ' ' + sample_emails[0] * 20)
+    assert result['degraded']
+    assert result['degraded_reasons'] == ['Only the first 2048 bytes were scanned',
+                                          'Tokens longer than 64 characters were cut']
+
+
+def test_spent_time_budget_names_the_stages(models, monkeypatch, sample_emails):
+    monkeypatch.setattr(app, 'SCAN_TIME_BUDGET_MS', 1e-6)
+    for result in [app.score_email(sample_emails[-1])] + app.score_emails(sample_emails[-1:]):
+        assert result['degraded']
+        assert result['degraded_reasons'] == [
+            'Time budget of 1e-06 ms exhausted; cut short: extract_domain_from_email, '
+            'phishing_language_patterns, suspicious_url_patterns, business_term_patterns']
+
+
+def test_in_budget_results_are_unchanged(models, monkeypatch, sample_emails, model_path_emails):
+    emails = sample_emails + model_path_emails
+    budgeted = [app.score_email(email_text) for email_text in emails]
+    assert budgeted == app.score_emails(emails)
+    monkeypatch.setattr(app, 'BUDGETED_SCANNING', False)
+    assert budgeted == [app.score_email(email_text) for email_text in emails]
+    assert budgeted == app.score_emails(emails)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the server-side verdict cache
+"""
+
+import json
+
+from app import VerdictCache
+
+VERDICT = {"prediction": "Safe Email", "phishing_confidence": 0.1, "reasons": ["Legitimate sender"]}
+
+
+def test_verdicts_are_keyed_by_normalized_content():
+    cache = VerdictCache(10, None, 'model-a')
+    cache.put_verdict('Hello\r\nthere\n', VERDICT)
+    cached = cache.get_verdict('  Hello\nthere')
+    assert cached == VERDICT
+    cached["reasons"].append('caller mutation')
+    assert cache.get_verdict('Hello\nthere') == VERDICT
+    assert cache.get_verdict('Hello there') is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_degraded_and_failed_verdicts_are_not_cached():
+    cache = VerdictCache(10, None, 'model-a')
+    cache.put_verdict('degraded', {**VERDICT, "degraded": True, "degraded_reasons": ["Time budget"]})
+    cache.put_verdict('failed', {**VERDICT, "error": "Prediction failed"})
+    assert len(cache) == 0
+    assert cache.get_verdict('degraded') is None and cache.get_verdict('failed') is None
+
+
+def test_verdicts_expire(clock):
+    cache = VerdictCache(10, 60, 'model-a')
+    cache.put_verdict('email', VERDICT)
+    clock.now += 60
+    assert cache.get_verdict('email') is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_new_fingerprint_drops_verdicts():
+    cache = VerdictCache(10, None, 'model-a')
+    cache.put_verdict('email', VERDICT)
+    cache.set_fingerprint('model-a')
+    assert cache.get_verdict('email') == VERDICT
+    cache.set_fingerprint('model-b')
+    assert len(cache) == 0 and cache.get_verdict('email') is None
+
+
+def test_persistence_round_trip(tmp_path, clock):
+    path = str(tmp_path / 'verdicts.json')
+    cache = VerdictCache(10, 60, 'model-a', path)
+    cache.put_verdict('stale', VERDICT)
+    clock.now += 30
+    cache.put_verdict('fresh', VERDICT)
+    cache.save()
+    assert not list(tmp_path.glob('*.tmp'))
+
+    clock.now += 45  # 'stale' has expired by now
+    reloaded = VerdictCache(10, 60, 'model-a', path)
+    reloaded.load()
+    assert len(reloaded) == 1
+    assert reloaded.items() == cache.items()[1:]
+    assert reloaded.get_verdict('fresh') == VERDICT
+    assert reloaded.get_verdict('stale') is None
+
+
+def test_file_of_another_model_is_ignored(tmp_path):
+    path = str(tmp_path / 'verdicts.json')
+    cache = VerdictCache(10, None, 'model-a', path)
+    cache.put_verdict('email', VERDICT)
+    cache.save()
+
+    reloaded = VerdictCache(10, None, 'model-b', path)
+    reloaded.load()
+    assert len(reloaded) == 0
+
+    with open(path, 'w') as cache_file:
+        cache_file.write('{"fingerprint": ')
+    unreadable = VerdictCache(10, None, 'model-a', path)
+    unreadable.load()
+    assert len(unreadable) == 0
+
+
+def test_nothing_is_written_without_a_path_or_fingerprint(tmp_path):
+    path = tmp_path / 'verdicts.json'
+    VerdictCache(10, None, None, str(path)).save()
+    VerdictCache(10, None, 'model-a').save()
+    assert not path.exists()
+    cache = VerdictCache(10, None, 'model-a', str(path))
+    cache.save()
+    assert json.loads(path.read_text()) == {"fingerprint": "model-a", "entries": []}
@@ -1,6 +1,4 @@
 import pandas as pd
-import numpy as np
-import re
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.ensemble import GradientBoostingClassifier
@@ -8,45 +6,13 @@ from sklearn.metrics import accuracy_score, classification_report
 import pickle
 from scipy.sparse import hstack
 import os
+import sys
 
-print("Starting model training process...")
+sys.path.append('backend')
+from app import extract_enhanced_email_features
+from model_artifacts import export_model_artifacts
 
-# Function to extract additional features from emails
-def extract_email_features(emails):
-    # Create empty arrays for features
-    num_links = np.zeros((len(emails), 1))
-    contains_urgent = np.zeros((len(emails), 1))
-    contains_money = np.zeros((len(emails), 1))
-    contains_suspicious_domains = np.zeros((len(emails), 1))
-    email_length = np.zeros((len(emails), 1))
-    
-    # Define patterns
-    url_pattern = re.compile(r'https?://\S+|www\.\S+')
-    urgent_pattern = re.compile(r'urgent|immediate|alert|attention|important|verify', re.IGNORECASE)
-    money_pattern = re.compile(r'money|cash|dollar|payment|bank|account|transfer|credit', re.IGNORECASE)
-    suspicious_domains = re.compile(r'\.xyz|\.info|\.top|\.club|\.online', re.IGNORECASE)
-    
-    # Extract features
-    for i, email in enumerate(emails):
-        # Count URLs
-        urls = url_pattern.findall(email)
-        num_links[i] = len(urls)
-        
-        # Check for urgent language
-        contains_urgent[i] = 1 if urgent_pattern.search(email) else 0
-        
-        # Check for money-related terms
-        contains_money[i] = 1 if money_pattern.search(email) else 0
-        
-        # Check for suspicious domains
-        contains_suspicious_domains[i] = 1 if suspicious_domains.search(email) else 0
-        
-        # Email length
-        email_length[i] = len(email)
-    
-    # Return all features as a single array
-    return np.hstack([num_links, contains_urgent, contains_money, 
-                     contains_suspicious_domains, email_length])
+print("Starting model training process...")
 
 # Load dataset
 print("Loading dataset...")
@@ -68,9 +34,9 @@ print("Performing text vectorization...")
 vectorizer = TfidfVectorizer(stop_words='english', max_features=5000)
 X_vectorized = vectorizer.fit_transform(X)
 
-# Extract additional features
+# Extract additional features, exactly as the API and the bulk scanner do
 print("Extracting additional features...")
-X_additional = extract_email_features(X_raw)
+X_additional = extract_enhanced_email_features(X_raw.tolist())
 
 # Combine TF-IDF features with additional features
 print("Combining features...")
@@ -144,7 +110,11 @@ with open('backend/vectorizer.pkl', 'wb') as vectorizer_file:
 
 # Save feature extraction function
 with open('backend/feature_extractor.pkl', 'wb') as extractor_file:
-    pickle.dump(extract_email_features, extractor_file)
+    pickle.dump(extract_enhanced_email_features, extractor_file)
+
+# Export the memory-mappable artifact format the API loads without unpickling
+manifest = export_model_artifacts(best_model, vectorizer, 'backend/model_artifacts')
+print(f"Model artifacts exported to backend/model_artifacts (checksum {manifest['checksum'][:16]})")
 
 print("Model and preprocessing components saved!")
 print("\nNow you can run the FastAPI application with 'uvicorn app:app --reload'")
\ No newline at end of file